@@ -0,0 +1,93 @@
+"""
+Measures the cost of resetting the proofs-of-work challenge of a mined block with many view heads and transactions,
+re-serializing the whole block versus keeping its content digest up to date with a block template
+Usage: python -m Benchmarks.BlockTemplateBenchmark (from the src directory)
+"""
+import hashlib
+import random
+import struct
+from timeit import default_timer
+
+from DataSturcutres.Block import Block
+from DataSturcutres.BlockTemplate import BlockTemplate
+from PoW.HashPowProtocol import HashPoWProtocol, HEADER_FORMAT
+from Transactions.Transaction import Transaction
+
+
+def get_full_header(pow_protocol, block):
+    """
+    Returns the challenge header of a block by hashing its whole encoding (how the header used to be computed)
+    :param pow_protocol:
+    :param block:
+    :return:
+    """
+    content_digest = hashlib.sha256(block.serialize(include_pow=False)).digest()
+    return struct.pack(HEADER_FORMAT, block.layerId, pow_protocol.difficulty, content_digest)
+
+
+def build_heads(rand, heads_count):
+    heads = []
+    for i in range(heads_count):
+        head = Block()
+        head.layerId = 1
+        head.minerPk = 'miner-%d' % i
+        head.pow = b'%d' % rand.getrandbits(64)
+        heads.append(head)
+
+    return heads
+
+
+def measure(heads_count, txs_count, resets, seed=0):
+    """
+    Returns the mean seconds per challenge reset after adding a transaction and after changing the view heads
+    for the full encoding and for the template
+    :param heads_count:
+    :param txs_count:
+    :param resets:
+    :param seed:
+    :return:
+    """
+    rand = random.Random(seed)
+    pow_protocol = HashPoWProtocol()
+    heads = build_heads(rand, heads_count)
+    txs = [Transaction(b'tx-%d-' % rand.getrandbits(64) + b'x' * 100) for i in range(txs_count + resets)]
+
+    template = BlockTemplate()
+    template.set_field('layerId', 2)
+    template.set_field('minerPk', 'miner')
+    template.set_field('viewHeads', heads)
+    template.set_txs(txs[:txs_count])
+    block = template.block
+    pow_protocol.set_challenge(template)
+
+    results = []
+    for name, get_header in (('full encoding', lambda: get_full_header(pow_protocol, block)),
+                             ('template', lambda: pow_protocol.get_block_header(template))):
+        start = default_timer()
+        for i in range(resets):
+            template.add_txs([txs[txs_count + i]])
+            get_header()
+        tx_seconds = (default_timer() - start) / resets
+        template.set_txs(txs[:txs_count])
+
+        start = default_timer()
+        for i in range(resets):
+            template.set_field('viewHeads', heads[i % 2:])
+            get_header()
+        heads_seconds = (default_timer() - start) / resets
+
+        results.append((name, tx_seconds, heads_seconds))
+
+    return results
+
+
+def run(resets=200):
+    print("%6s  %6s  %-14s  %14s  %14s" % ("heads", "txs", "challenge", "add tx(us)", "new heads(us)"))
+    for heads_count, txs_count in ((20, 100), (200, 1000), (200, 10000), (400, 1000)):
+        for name, tx_seconds, heads_seconds in measure(heads_count, txs_count, resets):
+            print("%6d  %6d  %-14s  %14.1f  %14.1f" % (heads_count, txs_count, name, 1e6 * tx_seconds,
+                                                       1e6 * heads_seconds))
+
+
+if __name__ == '__main__':
+    run()
@@ -0,0 +1,78 @@
+"""
+Feeds a miner a long run of layers and reports the memory it holds as layers accumulate,
+keeping every layer whole and compacting the layers beyond the retained ones
+Usage: python -m Benchmarks.CompactionBenchmark (from the src directory)
+"""
+import random
+import tracemalloc
+from timeit import default_timer
+
+from DataSturcutres.Block import Block
+from DataSturcutres.Mesh import Mesh
+from MeshcashMiner import MeshcashMiner
+from Simulation.SimulatedPowProtocol import SimulatedPoWProtocol
+from Transactions.Transaction import Transaction
+
+
+def run_miner(retained_layers, layer_count, tmin, blocks_per_layer, edges_per_block, txs_per_block, report_every,
+              seed=0):
+    """
+    Hands a miner layers of blocks pointing random blocks of the previous layer (along with new transactions)
+    Returns the miner's traced memory (in KB) and the seconds taken every report_every layers
+    :param retained_layers:
+    :param layer_count:
+    :param tmin:
+    :param blocks_per_layer:
+    :param edges_per_block:
+    :param txs_per_block:
+    :param report_every:
+    :param seed:
+    :return:
+    """
+    rand = random.Random(seed)
+    tracemalloc.start()
+    miner = MeshcashMiner('miner', Mesh(tmin=tmin), pow_protocol=SimulatedPoWProtocol(rand))
+    miner.retained_layers = retained_layers
+    miner.load_view()
+
+    reports = []
+    start = default_timer()
+    prev_layer_blocks = miner.mesh.layers[0].blocks
+    for layer_id in range(1, layer_count + 1):
+        layer_blocks = []
+        for i in range(blocks_per_layer):
+            block = Block()
+            block.layerId = layer_id
+            block.minerPk = 'miner-%d' % i
+            block.viewHeads = rand.sample(prev_layer_blocks, min(edges_per_block, len(prev_layer_blocks)))
+            block.txs = [Transaction(b'tx-%d' % rand.getrandbits(64)) for j in range(txs_per_block)]
+            block.pow = miner.pow_protocol.get_proof(None, None)
+            miner.handle_new_block(block)
+            layer_blocks.append(block)
+
+        prev_layer_blocks = layer_blocks
+        if layer_id % report_every == 0:
+            current_memory, peak_memory = tracemalloc.get_traced_memory()
+            reports.append((layer_id, current_memory / 1024.0, default_timer() - start))
+
+    tracemalloc.stop()
+    return reports
+
+
+def run(layer_count=600, tmin=6, blocks_per_layer=10, edges_per_block=8, txs_per_block=5, report_every=100):
+    print("%d blocks per layer (tmin %d), %d transactions per block" % (blocks_per_layer, tmin, txs_per_block))
+    results = [(retained_layers, run_miner(retained_layers, layer_count, tmin, blocks_per_layer, edges_per_block,
+                                           txs_per_block, report_every))
+               for retained_layers in (None, 52)]
+
+    print("%6s  %s" % ("layers", "  ".join("%14s" % ("keep all" if retained_layers is None else
+                                                      "retain %d" % retained_layers)
+                                           for retained_layers, reports in results)))
+    for index in range(len(results[0][1])):
+        layer_id = results[0][1][index][0]
+        print("%6d  %s" % (layer_id, "  ".join("%8.0f KB %3.0fs" % reports[index][1:]
+                                               for retained_layers, reports in results)))
+
+
+if __name__ == '__main__':
+    run()
@@ -0,0 +1,130 @@
+"""
+Replays gossiped blocks and transactions at a miner and reports the cost of dropping the duplicates
+along with the duplicate filters' false positive rates and memory, next to the memory of an exact set of the same ids
+Usage: python -m Benchmarks.DuplicateFilterBenchmark (from the src directory)
+"""
+import random
+import tracemalloc
+from timeit import default_timer
+
+from DataSturcutres.Block import Block
+from DataSturcutres.Mesh import Mesh
+from MeshcashMiner import MeshcashMiner
+from Metrics.MetricsRegistry import MetricsRegistry
+from Simulation.SimulatedPowProtocol import SimulatedPoWProtocol
+from Transactions.Transaction import Transaction
+from Transactions.TransactionListenerService import TransactionListenerService
+
+
+def get_set_size(item_ids):
+    """
+    Returns the traced memory (in bytes) of an exact set of copies of the ids
+    :param item_ids:
+    :return:
+    """
+    tracemalloc.start()
+    exact_set = set(bytes(bytearray(item_id)) for item_id in item_ids)
+    size, peak_size = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del exact_set
+    return size
+
+
+def run_blocks(layer_count, tmin, blocks_per_layer, edges_per_block, copies, seed=0):
+    """
+    Hands a miner layers of blocks, every block arriving copies times (as it would from several peers)
+    Returns the seconds spent on first arrivals and on the duplicates, and the miner's metrics snapshot
+    :param layer_count:
+    :param tmin:
+    :param blocks_per_layer:
+    :param edges_per_block:
+    :param copies:
+    :param seed:
+    :return:
+    """
+    rand = random.Random(seed)
+    metrics = MetricsRegistry()
+    miner = MeshcashMiner('miner', Mesh(tmin=tmin), pow_protocol=SimulatedPoWProtocol(rand), metrics=metrics)
+    miner.load_view()
+
+    new_seconds = 0.0
+    duplicate_seconds = 0.0
+    block_ids = []
+    prev_layer_blocks = miner.mesh.layers[0].blocks
+    for layer_id in range(1, layer_count + 1):
+        layer_blocks = []
+        for i in range(blocks_per_layer):
+            block = Block()
+            block.layerId = layer_id
+            block.minerPk = 'miner-%d' % i
+            block.viewHeads = rand.sample(prev_layer_blocks, min(edges_per_block, len(prev_layer_blocks)))
+            block.pow = miner.pow_protocol.get_proof(None, None)
+            block_ids.append(block.generate_block_id())
+
+            start = default_timer()
+            miner.handle_new_block(block)
+            new_seconds += default_timer() - start
+
+            start = default_timer()
+            for copy in range(copies - 1):
+                miner.handle_new_block(block)
+            duplicate_seconds += default_timer() - start
+            layer_blocks.append(block)
+
+        prev_layer_blocks = layer_blocks
+
+    return new_seconds, duplicate_seconds, len(block_ids), get_set_size(block_ids), metrics.snapshot()
+
+
+def run_txs(txs_count, copies, seed=0):
+    """
+    Filters a flood of transactions through a transaction listener, every transaction arriving copies times
+    Returns the seconds spent, the number of transactions passed on and the listener's filter
+    :param txs_count:
+    :param copies:
+    :param seed:
+    :return:
+    """
+    rand = random.Random(seed)
+    known_tx_ids = set()
+    tx_listener = TransactionListenerService(workers_count=0, is_known=known_tx_ids.__contains__)
+    txs = [Transaction(b'tx-%d' % rand.getrandbits(64)) for i in range(txs_count)]
+    flood = txs * copies
+    rand.shuffle(flood)
+
+    new_count = 0
+    start = default_timer()
+    for i in range(0, len(flood), tx_listener.max_batch_size):
+        new_txs = tx_listener.filter_new_transactions(flood[i:i + tx_listener.max_batch_size])
+        known_tx_ids.update(tx.generate_tx_id() for tx in new_txs)
+        new_count += len(new_txs)
+    seconds = default_timer() - start
+
+    return seconds, new_count, get_set_size([tx.generate_tx_id() for tx in txs]), tx_listener.tx_filter
+
+
+def run(layer_count=200, tmin=6, blocks_per_layer=10, edges_per_block=8, block_copies=4, txs_count=100000,
+        tx_copies=3):
+    new_seconds, duplicate_seconds, blocks_count, set_size, snapshot = run_blocks(
+        layer_count, tmin, blocks_per_layer, edges_per_block, block_copies)
+    duplicates_count = snapshot['counters'].get('duplicate_blocks', 0)
+    print("%d blocks, each arriving %d times:" % (blocks_count, block_copies))
+    print("  %-28s  %10.1f us" % ("new block", 1e6 * new_seconds / blocks_count))
+    print("  %-28s  %10.1f us (%d dropped)" % ("duplicate block", 1e6 * duplicate_seconds / max(duplicates_count, 1),
+                                              duplicates_count))
+    print("  %-28s  %10s" % ("false positive rate", snapshot['gauges']['block_filter_false_positive_rate']))
+    print("  %-28s  %10.1f KB (exact set %.1f KB)" % ("filter memory", snapshot['gauges']['block_filter_bytes'] / 1024.0,
+                                                     set_size / 1024.0))
+
+    seconds, new_count, set_size, tx_filter = run_txs(txs_count, tx_copies)
+    print("")
+    print("%d transactions, each arriving %d times:" % (txs_count, tx_copies))
+    print("  %-28s  %10.2f us" % ("filtered transaction", 1e6 * seconds / (txs_count * tx_copies)))
+    print("  %-28s  %10d" % ("passed on", new_count))
+    print("  %-28s  %10.6f" % ("false positive rate", tx_filter.get_false_positive_rate()))
+    print("  %-28s  %10.1f KB (exact set %.1f KB)" % ("filter memory", tx_filter.get_size() / 1024.0,
+                                                     set_size / 1024.0))
+
+
+if __name__ == '__main__':
+    run()
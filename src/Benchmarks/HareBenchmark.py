@@ -0,0 +1,57 @@
+"""
+Compares TrivialHareProtocol with the NumPy vote matrix of MatrixHareProtocol on synthetic meshes
+Measures rebuilding the opinions (set_block_opinions) and voting with the blocks of a new layer (get_valid_blocks)
+Usage: python -m Benchmarks.HareBenchmark (from the src directory)
+"""
+import random
+import struct
+from timeit import default_timer
+
+from Benchmarks.SyntheticMesh import build_synthetic_mesh
+from DataSturcutres.Block import Block
+from HareProtocols.MatrixHareProtocol import MatrixHareProtocol
+from HareProtocols.TrivialHareProtocol import TrivialHareProtocol
+
+
+def build_new_blocks(mesh, layer_id, blocks_count, edges_per_block, seed=1):
+    """
+    Returns blocks of a new layer pointing random blocks of the mesh's last layer
+    """
+    rand = random.Random(seed)
+    new_blocks = []
+    for i in range(blocks_count):
+        block = Block()
+        block.layerId = layer_id
+        block.viewHeads = rand.sample(mesh.layers[layer_id - 1].blocks, edges_per_block)
+        block.pow = struct.pack('>Q', rand.getrandbits(64))
+        new_blocks.append(block)
+
+    return new_blocks
+
+
+def measure(hare_protocol, mesh, new_blocks):
+    start = default_timer()
+    hare_protocol.set_block_opinions(mesh, len(mesh.layers) - 1)
+    bootstrap_seconds = default_timer() - start
+
+    start = default_timer()
+    for block in new_blocks:
+        valid_blocks = hare_protocol.get_valid_blocks(block)
+
+    return bootstrap_seconds, len(new_blocks) / (default_timer() - start), len(valid_blocks)
+
+
+def run(tmins=(200, 2000), layer_count=3, edges_ratio=0.75, new_blocks_count=200):
+    print("tmin  protocol  bootstrap(s)  votes/s  valid")
+    for tmin in tmins:
+        # Blocks point most of the previous layer, so the consensus interval's blocks have positive margins
+        edges_per_block = int(tmin * edges_ratio)
+        mesh = build_synthetic_mesh(layer_count, tmin, edges_per_block)
+        new_blocks = build_new_blocks(mesh, layer_count, new_blocks_count, edges_per_block)
+        for name, hare_protocol in (("trivial", TrivialHareProtocol()), ("matrix", MatrixHareProtocol())):
+            bootstrap_seconds, votes_rate, valid_count = measure(hare_protocol, mesh, new_blocks)
+            print("%4d  %8s  %12.3f  %7.1f  %5d" % (tmin, name, bootstrap_seconds, votes_rate, valid_count))
+
+
+if __name__ == '__main__':
+    run()
@@ -0,0 +1,75 @@
+"""
+Measures the memory used per block by free-standing blocks (each keeping its own fields)
+and by blocks packed into their layers' columns, on synthetic meshes
+Usage: python -m Benchmarks.MemoryBenchmark (from the src directory)
+"""
+import gc
+import random
+import struct
+import tracemalloc
+from datetime import datetime
+
+from DataSturcutres.Block import Block
+from DataSturcutres.Layer import Layer
+
+
+def build_layers(layer_count, blocks_per_layer, edges_per_block, packed, seed=0):
+    """
+    Builds layer_count + 1 layers in which every block points edges_per_block random blocks of the previous layer
+    :param layer_count:
+    :param blocks_per_layer:
+    :param edges_per_block:
+    :param packed: whether to pack the blocks into their layers or keep them free-standing
+    :param seed:
+    :return:
+    """
+    rand = random.Random(seed)
+    layers = []
+    for layer_id in range(layer_count + 1):
+        layer = Layer(layer_id=layer_id, start_layer_ts=datetime.now())
+        for i in range(blocks_per_layer):
+            block = Block()
+            block.layerId = layer_id
+            block.minerPk = b'miner'
+            block.weakCoinValue = True
+            block.beforeCoin = True
+            block.earlyBlock = False
+            if layer_id > 0:
+                block.viewHeads = rand.sample(layers[-1].blocks, edges_per_block)
+
+            block.pow = struct.pack('>Q', rand.getrandbits(64))
+            if packed:
+                layer.add_block(block)
+            else:
+                # Keep the block's id, as a packed block does
+                block.blockId = block.generate_block_id()
+                layer.blocks.append(block)
+
+        layers.append(layer)
+
+    return layers
+
+
+def bytes_per_block(layer_count, blocks_per_layer, edges_per_block, packed):
+    gc.collect()
+    tracemalloc.start()
+    layers = build_layers(layer_count, blocks_per_layer, edges_per_block, packed)
+    gc.collect()
+    used = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    return float(used) / ((layer_count + 1) * blocks_per_layer), layers
+
+
+def run(layer_counts=(100, 1000, 2000), blocks_per_layer=200, edges_per_block=4):
+    print("layers  blocks    free(B/block)  packed(B/block)  ratio")
+    for layer_count in layer_counts:
+        free, layers = bytes_per_block(layer_count, blocks_per_layer, edges_per_block, packed=False)
+        del layers
+        packed, layers = bytes_per_block(layer_count, blocks_per_layer, edges_per_block, packed=True)
+        del layers
+        print("%6d  %8d  %13.1f  %15.1f  %5.2f" % (layer_count, (layer_count + 1) * blocks_per_layer,
+                                                   free, packed, free / packed))
+
+
+if __name__ == '__main__':
+    run()
@@ -0,0 +1,68 @@
+"""
+Compares the miner's former transaction handling (a list of pending transactions in the mined block and a mapping of
+confirmed transactions scanned by its list of keys) with the Mempool
+Usage: python -m Benchmarks.MempoolBenchmark (from the src directory)
+"""
+import os
+from timeit import default_timer
+
+from Transactions.Mempool import Mempool
+from Transactions.Transaction import Transaction
+
+# Time budget for each measurement
+BUDGET_SECONDS = 2.0
+
+
+def rate(operation, items):
+    """
+    Applies the operation to the items until exhausted or until the time budget is over
+    """
+    start = default_timer()
+    done = 0
+    for item in items:
+        operation(item)
+        done += 1
+        if default_timer() - start > BUDGET_SECONDS:
+            break
+
+    return done / (default_timer() - start)
+
+
+def run(pending_counts=(1000, 10000, 100000), confirmed_count=10000, layer_txs_count=1000):
+    confirmed_txs = [Transaction(os.urandom(64)) for i in range(confirmed_count)]
+    print("pending  list admit(tx/s)  list confirm(tx/s)  mempool admit(tx/s)  mempool confirm(tx/s)")
+    for pending_count in pending_counts:
+        txs = [Transaction(os.urandom(64)) for i in range(pending_count)]
+        layer_txs = txs[-layer_txs_count:]
+
+        # The former path: "tx in confirmed.keys()" (a list on Python 2) and list.remove of every confirmed tx
+        confirmed = dict((tx, 0) for tx in confirmed_txs)
+        block_txs = []
+
+        def list_admit(tx):
+            if tx not in list(confirmed.keys()):
+                block_txs.append(tx)
+
+        def list_confirm(tx):
+            confirmed[tx] = 1
+            block_txs.remove(tx)
+
+        list_admit_rate = rate(list_admit, txs)
+        block_txs[:] = txs
+        list_confirm_rate = rate(list_confirm, layer_txs)
+
+        mempool = Mempool(max_pending=pending_count)
+        mempool.confirm_transactions(confirmed_txs, 0)
+        mempool_admit_rate = rate(lambda tx: mempool.add_transaction(tx, 1), txs)
+
+        start = default_timer()
+        mempool.confirm_transactions(layer_txs, 1)
+        mempool.get_block_txs(1000)
+        mempool_confirm_rate = len(layer_txs) / (default_timer() - start)
+
+        print("%7d  %16.1f  %18.1f  %19.1f  %21.1f" % (
+            pending_count, list_admit_rate, list_confirm_rate, mempool_admit_rate, mempool_confirm_rate))
+
+
+if __name__ == '__main__':
+    run()
@@ -0,0 +1,58 @@
+"""
+Runs a simulated network with and without miner metrics, reports the instrumentation overhead, the miners' hot path
+timings and (optionally) the functions a sampling profiler found the simulation spending its time in
+Usage: python -m Benchmarks.MetricsBenchmark [--profile] (from the src directory)
+"""
+import sys
+from timeit import default_timer
+
+from Metrics.MetricsRegistry import MetricsRegistry
+from Metrics.SamplingProfiler import SamplingProfiler
+from Simulation.NetworkSimulator import NetworkSimulator
+
+
+def run_network(metrics, miners_count, tmin, layers_count, profiler=None):
+    simulator = NetworkSimulator(miners_count=miners_count, tmin=tmin, blocks_per_second=2.0, metrics=metrics)
+    if profiler is not None:
+        profiler.start()
+
+    start = default_timer()
+    simulator.run(layers_count)
+    seconds = default_timer() - start
+
+    if profiler is not None:
+        profiler.stop()
+
+    return seconds
+
+
+def run(miners_count=20, tmin=10, layers_count=20, profile=False):
+    disabled_seconds = run_network(None, miners_count, tmin, layers_count)
+    metrics = MetricsRegistry()
+    profiler = SamplingProfiler() if profile else None
+    enabled_seconds = run_network(metrics, miners_count, tmin, layers_count, profiler)
+    print("%d miners, tmin %d, %d layers: %.2fs without metrics, %.2fs with metrics (%+.1f%%)" % (
+        miners_count, tmin, layers_count, disabled_seconds, enabled_seconds,
+        100 * (enabled_seconds / disabled_seconds - 1)))
+
+    snapshot = metrics.snapshot()
+    print("")
+    print("%-30s  %8s  %10s  %10s  %10s  %10s" % ("timer", "count", "total(ms)", "mean(us)", "p99(us)", "max(us)"))
+    for name, histogram in sorted(snapshot['histograms'].items()):
+        print("%-30s  %8d  %10.1f  %10.1f  %10.1f  %10.1f" % (
+            name, histogram['count'], 1e3 * histogram['total'], 1e6 * histogram['mean'], 1e6 * histogram['p99'],
+            1e6 * histogram['max']))
+
+    print("")
+    for name, count in sorted(snapshot['counters'].items()):
+        print("%-30s  %8d" % (name, count))
+
+    if profiler is not None:
+        print("")
+        print("%d samples, cumulative share:" % profiler.samples)
+        for share, file_name, line, function in profiler.get_top(15):
+            print("%6.2f%%  %s (%s:%d)" % (100 * share, function, file_name, line))
+
+
+if __name__ == '__main__':
+    run(profile='--profile' in sys.argv)
@@ -0,0 +1,23 @@
+"""
+Runs simulated networks of miners and reports block handling throughput and latency, memory and time to agreement
+Memory is the growth of the process's peak resident memory divided by the number of miners
+Usage: python -m Benchmarks.NetworkBenchmark (from the src directory)
+"""
+from Simulation.NetworkSimulator import NetworkSimulator
+
+
+def run(configurations=((10, 10), (50, 20), (100, 20)), layers_count=8, blocks_per_second=2.0, loss_rate=0.05):
+    print("miners  tmin  blocks/s  p50(ms)  p90(ms)  p99(ms)  peak RSS KB/miner  agreed  agreement p50(s)  max(s)")
+    for miners_count, tmin in configurations:
+        simulator = NetworkSimulator(miners_count=miners_count, tmin=tmin, blocks_per_second=blocks_per_second,
+                                     loss_rate=loss_rate)
+        stats = simulator.run(layers_count)
+        print("%6d  %4d  %8.1f  %7.3f  %7.3f  %7.3f  %17.1f  %3d/%-3d  %16.2f  %6.2f" % (
+            miners_count, tmin, stats['blocks_per_second'], stats['handle_ms_p50'], stats['handle_ms_p90'],
+            stats['handle_ms_p99'], stats['peak_rss_kb_per_miner'], stats['layers_agreed'],
+            stats['layers_agreed'] + stats['layers_disagreed'], stats['agreement_seconds_p50'],
+            stats['agreement_seconds_max']))
+
+
+if __name__ == '__main__':
+    run()
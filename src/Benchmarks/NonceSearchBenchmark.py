@@ -0,0 +1,53 @@
+"""
+Measures the hashrate of the parallel nonce search for growing numbers of workers
+and the time it takes the workers to abandon a replaced challenge
+Usage: python -m Benchmarks.NonceSearchBenchmark (from the src directory)
+"""
+import time
+from multiprocessing import cpu_count
+
+from DataSturcutres.Block import Block
+from PoW.HashPowProtocol import HashPoWProtocol
+from PoW.ParallelPowProtocol import ParallelPoWProtocol
+
+# Time each worker count searches for
+BUDGET_SECONDS = 3.0
+
+
+def measure(workers_count, batch_size):
+    # The difficulty is practically never met, so the workers search until the challenge is replaced
+    parallel_pow_protocol = ParallelPoWProtocol(HashPoWProtocol(difficulty=1 << 62),
+                                                workers_count=workers_count, batch_size=batch_size)
+
+    block = Block()
+    block.layerId = 1
+    parallel_pow_protocol.set_challenge(block)
+    time.sleep(BUDGET_SECONDS)
+    hashrate = parallel_pow_protocol.get_hashrate()
+
+    # Replace the challenge and collect the workers' abandonment reports
+    block.layerId = 2
+    parallel_pow_protocol.set_challenge(block)
+    deadline = time.time() + 1
+    while time.time() < deadline:
+        parallel_pow_protocol.try_single_nonce()
+
+    abandon_seconds = parallel_pow_protocol.abandon_seconds
+    parallel_pow_protocol.stop()
+    return hashrate, abandon_seconds
+
+
+def run(batch_size=10000):
+    print("workers  hashrate(n/s)  speedup  abandon(ms)")
+    base_hashrate = None
+    workers_count = 1
+    while workers_count <= cpu_count():
+        hashrate, abandon_seconds = measure(workers_count, batch_size)
+        base_hashrate = base_hashrate or hashrate
+        print("%7d  %13.0f  %7.2f  %11.1f" % (workers_count, hashrate, hashrate / base_hashrate,
+                                              1000 * (abandon_seconds or 0)))
+        workers_count *= 2
+
+
+if __name__ == '__main__':
+    run()
@@ -0,0 +1,74 @@
+"""
+Compares the recursive Block.has_in_view walk with the mesh's reachability index on synthetic meshes
+Usage: python -m Benchmarks.ReachabilityBenchmark (from the src directory)
+"""
+import random
+from timeit import default_timer
+
+from Benchmarks.SyntheticMesh import build_synthetic_mesh
+
+# Time budget for each measurement
+BUDGET_SECONDS = 2.0
+
+# The recursive walk is exponential in the layer distance, a single query beyond this distance never returns
+MAX_RECURSIVE_DISTANCE = 8
+
+
+def recursive_has_in_view(block, other_block):
+    """
+    The original Block.has_in_view algorithm, kept as a baseline
+    """
+    if other_block.layerId >= block.layerId:
+        return False
+
+    pointed_blocks = set(block.viewHeads).union(set(block.validRecentBlocks))
+    if other_block in pointed_blocks:
+        return True
+
+    return max([recursive_has_in_view(pointed_block, other_block) for pointed_block in pointed_blocks])
+
+
+def queries_per_second(has_in_view, queries):
+    """
+    Runs queries until exhausted or until the time budget is over
+    """
+    start = default_timer()
+    done = 0
+    for block, other_block in queries:
+        has_in_view(block, other_block)
+        done += 1
+        if default_timer() - start > BUDGET_SECONDS:
+            break
+
+    return done / (default_timer() - start), done
+
+
+def run(layer_counts=(10, 100, 1000), blocks_per_layer=20, edges_per_block=4, query_count=2000):
+    rand = random.Random(1)
+    print("layers  build(s)  distance  recursive(q/s)  indexed(q/s)")
+    for layer_count in layer_counts:
+        start = default_timer()
+        mesh = build_synthetic_mesh(layer_count, blocks_per_layer, edges_per_block)
+        build_seconds = default_timer() - start
+
+        tip_blocks = mesh.layers[layer_count].blocks
+        for distance in sorted(set([2, 5, MAX_RECURSIVE_DISTANCE, layer_count])):
+            if distance > layer_count:
+                continue
+
+            target_blocks = mesh.layers[layer_count - distance].blocks
+            queries = [(rand.choice(tip_blocks), rand.choice(target_blocks)) for i in range(query_count)]
+
+            indexed_rate, indexed_done = queries_per_second(mesh.reachability.has_in_view, queries)
+            if distance > MAX_RECURSIVE_DISTANCE:
+                print("%6d  %8.2f  %8d  %14s  %12.1f" % (layer_count, build_seconds, distance, "-", indexed_rate))
+                continue
+
+            recursive_rate, recursive_done = queries_per_second(recursive_has_in_view, queries)
+            print("%6d  %8.2f  %8d  %14.1f  %12.1f%s" % (
+                layer_count, build_seconds, distance, recursive_rate, indexed_rate,
+                "" if recursive_done == len(queries) else "  (recursive walk cut after %d queries)" % recursive_done))
+
+
+if __name__ == '__main__':
+    run()
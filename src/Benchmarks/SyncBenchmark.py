@@ -0,0 +1,87 @@
+"""
+Compares catching up with a history of layers block by block (as a live miner handles arriving blocks)
+with bulk syncing it, on the syncing process and on a pool of validation processes
+Usage: python -m Benchmarks.SyncBenchmark (from the src directory)
+"""
+import logging
+from multiprocessing import cpu_count
+from timeit import default_timer
+
+from DataSturcutres.Block import Block
+from DataSturcutres.BlockView import BlockView
+from DataSturcutres.Mesh import Mesh
+from Ingestion.MeshSync import MeshSync, get_mesh_layers
+from MeshcashMiner import MeshcashMiner
+from PoW.HashPowProtocol import HashPoWProtocol
+from tests.conftest import build_history
+
+
+def sync_one_by_one(layers, tmin):
+    """
+    Hands the history's blocks to a miner one at a time, dropping blocks that point unknown (rejected) blocks
+    Returns the miner's mesh and the seconds it took to add the blocks to it
+    :param layers:
+    :param tmin:
+    :return:
+    """
+    miner = MeshcashMiner('syncing', Mesh(tmin=tmin), pow_protocol=HashPoWProtocol(difficulty=4))
+    miner.retained_layers = None
+    miner.load_view()
+    start = default_timer()
+    for layer_id, datas in layers:
+        for data in datas:
+            view = BlockView(data)
+            if all(block_id.tobytes() in miner.mesh.blocks
+                   for block_id in view.get_view_head_ids() + view.get_valid_recent_block_ids()):
+                miner.handle_new_block(Block.deserialize(data, miner.mesh.blocks))
+
+    return miner.mesh, default_timer() - start
+
+
+def sync_in_bulk(layers, tmin, workers_count):
+    """
+    Syncs the history into a mesh and loads a miner's view of it
+    Returns the mesh and the seconds it took to add the blocks to it
+    :param layers:
+    :param tmin:
+    :param workers_count:
+    :return:
+    """
+    mesh = Mesh(tmin=tmin)
+    start = default_timer()
+    MeshSync(mesh, HashPoWProtocol(difficulty=4), workers_count=workers_count).sync(layers)
+    sync_seconds = default_timer() - start
+    miner = MeshcashMiner('syncing', mesh, pow_protocol=HashPoWProtocol(difficulty=4))
+    miner.retained_layers = None
+    miner.load_view()
+    return mesh, sync_seconds
+
+
+def run(layer_count=200, blocks_per_layer=30, tmin=20, invalid_ratio=0.05):
+    # Forged blocks are expected, don't log them
+    logging.disable(logging.WARNING)
+    history = build_history(layer_count, blocks_per_layer, tmin, invalid_ratio)
+    layers = list(get_mesh_layers(history))
+    print("%d layers of %d blocks (tmin %d), %d cores" % (layer_count, blocks_per_layer, tmin, cpu_count()))
+    print("Adding the blocks one by one also counts the tortoise votes, bulk syncing counts them after")
+    print("All layers are kept whole, so the synced meshes can be compared")
+    print("%-24s  %8s  %9s  %10s  %8s" % ("sync", "total(s)", "blocks(s)", "blocks/s", "blocks"))
+
+    expected_blocks = None
+    for name, sync in (("one by one", lambda: sync_one_by_one(layers, tmin)),
+                       ("bulk, no workers", lambda: sync_in_bulk(layers, tmin, 0)),
+                       ("bulk, %d workers" % cpu_count(), lambda: sync_in_bulk(layers, tmin, cpu_count()))):
+        start = default_timer()
+        mesh, sync_seconds = sync()
+        seconds = default_timer() - start
+
+        blocks = set(block_id for block_id, block in mesh.blocks.items() if block.layerId > 0)
+        if expected_blocks is None:
+            expected_blocks = blocks
+        assert blocks == expected_blocks, "%s sync disagrees with syncing one by one" % name
+
+        print("%-24s  %8.2f  %9.2f  %10.0f  %8d" % (name, seconds, sync_seconds, len(blocks) / seconds, len(blocks)))
+
+
+if __name__ == '__main__':
+    run()
@@ -0,0 +1,29 @@
+import random
+import struct
+
+from DataSturcutres.Block import Block
+from DataSturcutres.Mesh import Mesh
+
+
+def build_synthetic_mesh(layer_count, blocks_per_layer, edges_per_block, seed=0):
+    """
+    Builds a mesh of layer_count layers (on top of genesis) in which every block points
+    edges_per_block random blocks of the previous layer
+    :param layer_count:
+    :param blocks_per_layer:
+    :param edges_per_block:
+    :param seed:
+    :return:
+    """
+    rand = random.Random(seed)
+    mesh = Mesh(tmin=blocks_per_layer)
+    for layer_id in range(1, layer_count + 1):
+        prev_layer_blocks = mesh.layers[layer_id - 1].blocks
+        for i in range(blocks_per_layer):
+            block = Block()
+            block.layerId = layer_id
+            block.viewHeads = rand.sample(prev_layer_blocks, edges_per_block)
+            block.pow = struct.pack('>Q', rand.getrandbits(64))
+            mesh.add_block(block)
+
+    return mesh
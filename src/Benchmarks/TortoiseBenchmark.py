@@ -0,0 +1,48 @@
+"""
+Compares recounting the tortoise margins of all closed layers' blocks whenever a layer closes
+with the incremental per-layer tallies of TortoiseProtocol, on synthetic meshes
+Usage: python -m Benchmarks.TortoiseBenchmark (from the src directory)
+"""
+from timeit import default_timer
+
+from Benchmarks.SyntheticMesh import build_synthetic_mesh
+from TortoiseProtocols.TortoiseProtocol import TortoiseProtocol
+
+
+def recount_margins(mesh, current_layer):
+    """
+    Recounts the margins of the blocks of the layers preceding current_layer from all of their descendants
+    """
+    margins = {}
+    for layer in mesh.layers[:current_layer]:
+        for block in layer.blocks:
+            voters = [voter for later_layer in mesh.layers[layer.id + 1:current_layer]
+                      for voter in later_layer.blocks]
+            votes_for = sum([mesh.reachability.has_in_view(voter, block) for voter in voters])
+            margins[block] = 2 * votes_for - len(voters)
+
+    return margins
+
+
+def run(layer_counts=(10, 20, 40), blocks_per_layer=50, edges_per_block=30):
+    print("layers  recount per layer(s)  incremental per layer(s)")
+    for layer_count in layer_counts:
+        mesh = build_synthetic_mesh(layer_count, blocks_per_layer, edges_per_block)
+
+        start = default_timer()
+        margins = recount_margins(mesh, layer_count + 1)
+        recount_seconds = default_timer() - start
+
+        tortoise_protocol = TortoiseProtocol(horizon=layer_count + 1)
+        start = default_timer()
+        tortoise_protocol.set_block_opinions(mesh, layer_count + 1)
+        incremental_seconds = (default_timer() - start) / (layer_count + 1)
+
+        if any(tortoise_protocol.get_margin(block) != margin for block, margin in margins.items()):
+            raise AssertionError("Incremental margins differ from the recounted margins")
+
+        print("%6d  %20.4f  %24.4f" % (layer_count, recount_seconds, incremental_seconds))
+
+
+if __name__ == '__main__':
+    run()
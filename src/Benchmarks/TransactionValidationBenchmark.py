@@ -0,0 +1,55 @@
+"""
+Measures the throughput of the transaction listener (transactions per second) by the number of validation workers
+Validation is simulated with a fixed amount of hashing per transaction, standing in for a signature check
+Usage: python -m Benchmarks.TransactionValidationBenchmark (from the src directory)
+"""
+import hashlib
+import os
+import threading
+from multiprocessing import cpu_count
+from timeit import default_timer
+
+from Transactions.Transaction import Transaction
+from Transactions.TransactionListenerService import TransactionListenerService
+
+# Hash iterations per transaction, roughly the cost of verifying a signature
+SIGNATURE_CHECK_ITERATIONS = 200
+
+
+def validate_signed_transactions(payloads):
+    return [len(hashlib.pbkdf2_hmac('sha256', payload, b'', SIGNATURE_CHECK_ITERATIONS)) > 0 for payload in payloads]
+
+
+def measure(workers_count, txs):
+    delivered = []
+    done = threading.Event()
+    unique_count = len(set(txs))
+
+    def handle_new_transactions(new_txs):
+        delivered.extend(new_txs)
+        if len(delivered) == unique_count:
+            done.set()
+
+    listener = TransactionListenerService(workers_count=workers_count, validate_func=validate_signed_transactions)
+    listener.register_for_new_arriving_transactions(handle_new_transactions)
+
+    start = default_timer()
+    for tx in txs:
+        listener.submit_transaction(tx)
+
+    done.wait()
+    seconds = default_timer() - start
+    listener.stop()
+    return len(txs) / seconds
+
+
+def run(tx_count=50000, duplicates_ratio=0.2):
+    unique_txs = [Transaction(os.urandom(100)) for i in range(int(tx_count * (1 - duplicates_ratio)))]
+    txs = unique_txs + unique_txs[:tx_count - len(unique_txs)]
+    print("workers  tx/s")
+    for workers_count in sorted(set([0, 1, 2, 4, cpu_count()])):
+        print("%7d  %8.1f" % (workers_count, measure(workers_count, txs)))
+
+
+if __name__ == '__main__':
+    run()
@@ -1,9 +1,101 @@
-class Block:
+import hashlib
+from itertools import chain
+
+from DataSturcutres.BlockView import BlockView, BLOCK_HEADER, BLOCK_ID_SIZE, TX_SIZE, get_content_digest
+from DataSturcutres.MerkleTree import MerkleTree
+from Transactions.Transaction import Transaction
+
+# Encoding of the optional boolean flags (2 bits each)
+FLAG_VALUES = {None: 0, False: 1, True: 2}
+FLAGS = [None, False, True]
+
+
+# Readers of the fields of the block at a position from the columns of its layer (see Layer.add_block)
+def get_packed_view_heads(layer, position):
+    return layer.parents[layer.parent_offsets[2 * position]:layer.parent_offsets[2 * position + 1]]
+
+
+def get_packed_valid_recent_blocks(layer, position):
+    return layer.parents[layer.parent_offsets[2 * position + 1]:layer.parent_offsets[2 * position + 2]]
+
+
+def get_packed_pow(layer, position):
+    return bytes(layer.pows[layer.pow_offsets[position]:layer.pow_offsets[position + 1]]) or None
+
+
+def get_packed_block_id(layer, position):
+    return bytes(layer.block_ids[position * BLOCK_ID_SIZE:(position + 1) * BLOCK_ID_SIZE])
+
+
+def get_packed_miner_pk(layer, position):
+    return layer.miner_pks[position]
+
+
+def get_packed_txs(layer, position):
+    return layer.txs[position]
+
+
+def get_packed_weak_coin_value(layer, position):
+    return FLAGS[layer.flags[position] & 3]
+
+
+def get_packed_before_coin(layer, position):
+    return FLAGS[layer.flags[position] >> 2 & 3]
+
+
+def get_packed_early_block(layer, position):
+    return FLAGS[layer.flags[position] >> 4 & 3]
+
+
+def block_field(name, get_packed):
+    """
+    Returns a property of a block field
+    The field is kept by the block until it's added to a layer, from then on it's read from the layer's columns
+    :param name:
+    :param get_packed: reads the field of the block at a position from the columns of a layer
+    :return:
+    """
+    def get_field(self):
+        if self.layer is None:
+            return self._fields[name]
+
+        return get_packed(self.layer, self.position)
+
+    def set_field(self, value):
+        if self.layer is not None:
+            raise AttributeError("Block %s can't change after it was added to a layer" % name)
+
+        self._fields[name] = value
+
+    return property(get_field, set_field)
+
+
+class Block(object):
     """
     A block is the smallest unit of data in Meshcash
     A block includes a list of transactions and knowledge regarding the view of the creating miner
+    Once added to a layer, the block's data is packed into the layer's columns and the block can't change
     """
+    __slots__ = ('layerId', 'layer', 'position', '_fields')
+
+    minerPk = block_field('minerPk', get_packed_miner_pk)
+    weakCoinValue = block_field('weakCoinValue', get_packed_weak_coin_value)
+    viewHeads = block_field('viewHeads', get_packed_view_heads)
+    validRecentBlocks = block_field('validRecentBlocks', get_packed_valid_recent_blocks)
+    beforeCoin = block_field('beforeCoin', get_packed_before_coin)
+    earlyBlock = block_field('earlyBlock', get_packed_early_block)
+    txs = block_field('txs', get_packed_txs)
+    pow = block_field('pow', get_packed_pow)
+    blockId = block_field('blockId', get_packed_block_id)
+
     def __init__(self):
+        # The layer holding the block's data and the block's position in it (None until the block is added to a layer)
+        self.layer = None
+        self.position = None
+
+        # The block's fields, while it's not in a layer
+        self._fields = {}
+
         # The layer of which this block belongs to
         self.layerId = None
 
@@ -36,51 +128,233 @@ class Block:
         # This serves as a digital signature to assure data was not changed since finding the proofs of work
         self.pow = None
 
-    def has_in_view(self, other_block):
+        # The id of the block, kept once the block has proofs-of-work (and therefore can't change)
+        self.blockId = None
+
+    def has_in_view(self, other_block, reachability=None):
         """
         Returns true if current block points otherBlock
         :param other_block:
+        :param reachability: an optional ReachabilityIndex of the mesh to answer the query from
         :return:
         """
         if other_block.layerId >= self.layerId:
             return False
 
-        pointed_blocks = set(self.viewHeads).union(set(self.validRecentBlocks))
-        if other_block in pointed_blocks:
-            return True
+        if reachability is not None:
+            return reachability.has_in_view(self, other_block)
+
+        # Without an index, walk the view visiting every pointed block at most once
+        visited = set()
+        pending = [self]
+        while pending:
+            block = pending.pop()
+            for pointed_block in chain(block.viewHeads, block.validRecentBlocks):
+                if pointed_block is other_block:
+                    return True
 
-        # Very inefficient algorithm
-        return max([pointedBlock.has_in_view(other_block) for pointedBlock in pointed_blocks])
+                if pointed_block.layerId > other_block.layerId and pointed_block not in visited:
+                    visited.add(pointed_block)
+                    pending.append(pointed_block)
 
-    def is_syntactically_valid(self, pow_protocol, tmin):
+        return False
+
+    def is_syntactically_valid(self, pow_protocol, tmin, validity=None, mesh=None):
         """
         Returns True if the block syntactically valid, that is:
         1. recursive: points to TMIN syntactically valid blocks in previous layer AND
         2. has a valid proofs-of-work w.r.t. challenge and difficulty AND
         3. all of its transactions are syntactically valid
+        The proofs-of-work must be for the block's own content, at the difficulty of the block's layer
+        Blocks of the mesh's compacted layers can't be added to it anymore, so they're never valid
+        and the blocks they hold are valid (they were added to the mesh) without walking them
+        :param pow_protocol:
+        :param tmin:
+        :param validity: an optional mapping of block id to a previously computed verdict (e.g. the mesh's)
+         verdicts computed along the way are stored in it (invalid ones through mesh.add_invalid_block if it's the mesh's)
+        :param mesh: the mesh the block is validated for, setting the difficulty of its layers
         :return:
         """
+        compacted_layer_count = mesh.compacted_layer_count if mesh is not None else 0
+        if self.layerId < compacted_layer_count:
+            return False
+
         if self.layerId == 0:
             # Genesis layer's blocks are always syntactically valid
             return True
 
-        if not pow_protocol.verify_pow(self.pow):
-            return False
+        if validity is None:
+            validity = {}
+
+        def set_invalid(block):
+            if mesh is not None and validity is mesh.validity:
+                # The verdict is dropped once the block's layer is compacted
+                mesh.add_invalid_block(block.generate_block_id(), block.layerId)
+            else:
+                validity[block.generate_block_id()] = False
+
+        def get_prev_block_verdict(prev_block):
+            if prev_block.layerId == 0:
+                return True
+
+            if prev_block.layerId < compacted_layer_count:
+                return mesh.has_compacted_block(prev_block)
+
+            return validity[prev_block.generate_block_id()]
+
+        # Blocks of earlier layers are decided without walking them (genesis and compacted layers)
+        first_walked_layer_id = max(compacted_layer_count, 1)
+
+        # Walk the previous layer edges down to known verdicts, deciding every block after its pointed blocks
+        # A block is expanded once its proofs-of-work was verified and its unknown pointed blocks were pushed
+        expanded = set()
+        pending = [self]
+        while pending:
+            block = pending[-1]
+            block_id = block.generate_block_id()
+            if block_id in validity:
+                pending.pop()
+                continue
+
+            if block not in expanded:
+                if not pow_protocol.verify_pow(block.pow, block,
+                                               pow_protocol.get_layer_difficulty(mesh, block.layerId)):
+                    pending.pop()
+                    set_invalid(block)
+                    continue
+
+                expanded.add(block)
+                unknown_blocks = [prev_block for prev_block in block.get_prev_layer_blocks()
+                                  if prev_block.layerId >= first_walked_layer_id and
+                                  prev_block.generate_block_id() not in validity]
+                if unknown_blocks:
+                    pending.extend(unknown_blocks)
+                    continue
+
+            pending.pop()
+            prev_layer_valid_blocks = sum([get_prev_block_verdict(prev_block)
+                                           for prev_block in block.get_prev_layer_blocks()])
 
-        prev_layer_blocks = filter(lambda x: x.layerId + 1 == self.layerId, self.viewHeads)
-        prev_layer_valid_blocks = sum([block.is_syntactically_valid(pow_protocol) for block in prev_layer_blocks])
-        if prev_layer_valid_blocks < tmin:
             # Block must point to at least tmin syntactically valid previous layer's blocks
-            return False
+            if prev_layer_valid_blocks >= tmin:
+                validity[block_id] = True
+            else:
+                set_invalid(block)
 
-        return True
+        return validity[self.generate_block_id()]
+
+    def get_prev_layer_blocks(self):
+        """
+        Returns the blocks of the previous layer pointed by the block's view heads
+        :return:
+        """
+        return [block for block in self.viewHeads if block.layerId + 1 == self.layerId]
 
     def generate_block_id(self):
         """
         Return the block's id based on all of its content
         :return:
         """
+        if self.blockId is not None:
+            return self.blockId
+
+        block_id = hashlib.sha256(self.serialize()).digest()
+        if self.pow is not None:
+            self.blockId = block_id
+
+        return block_id
+
+    def get_content_digest(self):
+        """
+        Returns the digest of the block's content, which its proofs-of-work commit to:
+        its fields (without the proofs-of-work) and the Merkle root of its transaction ids
+        A block being mined keeps it up to date as the block changes (see BlockTemplate)
+        :return:
+        """
+        return get_content_digest(self.serialize(include_pow=False, include_txs=False), len(self.txs),
+                                  MerkleTree([tx.generate_tx_id() for tx in self.txs]).get_root())
+
+    def serialize(self, include_pow=True, include_txs=True, edge_ids=None):
+        """
+        Returns the canonical binary encoding of the block (see BlockView for the layout)
+        Pointed blocks are referenced by their ids
+        :param include_pow: set to False to encode the content covered by the proofs-of-work
+        :param include_txs: set to False to encode the block's fields without its transactions
+        :param edge_ids: the sorted distinct ids of the view heads and of the valid recent blocks, if they're known
+         (see BlockTemplate)
+        :return:
+        """
+        pow_bytes = self.pow if include_pow and self.pow is not None else b''
+        miner_pk = self.minerPk if self.minerPk is not None else b''
+        if not isinstance(miner_pk, bytes):
+            miner_pk = miner_pk.encode('utf-8')
+
+        flags = self.get_flags()
+        if edge_ids is None:
+            view_head_ids = sorted(set([block.generate_block_id() for block in self.viewHeads]))
+            valid_recent_block_ids = sorted(set([block.generate_block_id() for block in self.validRecentBlocks]))
+        else:
+            view_head_ids, valid_recent_block_ids = edge_ids
+
+        txs = [tx.serialize() for tx in self.txs] if include_txs else []
+
+        parts = [BLOCK_HEADER.pack(self.layerId, flags, len(view_head_ids), len(valid_recent_block_ids), len(txs),
+                                   len(miner_pk), len(pow_bytes)),
+                 pow_bytes, miner_pk]
+        parts.extend(view_head_ids)
+        parts.extend(valid_recent_block_ids)
+        for tx in txs:
+            parts.append(TX_SIZE.pack(len(tx)))
+            parts.append(tx)
+
+        return b''.join(parts)
+
+    @staticmethod
+    def deserialize(data, blocks):
+        """
+        Returns the block encoded in data
+        :param data: bytes (or a memoryview over them)
+        :param blocks: mapping of block id to the previously decoded blocks, all pointed blocks must be in it
+        :return:
+        """
+        view = BlockView(data)
+
+        block = Block()
+        block.layerId = view.layer_id
+        block.weakCoinValue = FLAGS[view.flags & 3]
+        block.beforeCoin = FLAGS[view.flags >> 2 & 3]
+        block.earlyBlock = FLAGS[view.flags >> 4 & 3]
+        block.minerPk = view.get_miner_pk().tobytes() or None
+        block.pow = view.get_pow().tobytes() or None
+        block.viewHeads = [blocks[block_id.tobytes()] for block_id in view.get_view_head_ids()]
+        block.validRecentBlocks = [blocks[block_id.tobytes()] for block_id in view.get_valid_recent_block_ids()]
+        block.txs = [Transaction.deserialize(tx) for tx in view.get_txs()]
+        return block
+
+    def get_flags(self):
+        """
+        Returns the weak coin value, before coin and early block flags packed into a byte (2 bits each)
+        :return:
+        """
+        if self.layer is not None:
+            return self.layer.flags[self.position]
+
+        return FLAG_VALUES[self._get_flag(self.weakCoinValue)] | \
+            FLAG_VALUES[self._get_flag(self.beforeCoin)] << 2 | \
+            FLAG_VALUES[self._get_flag(self.earlyBlock)] << 4
+
+    def pack(self, layer, position):
+        """
+        Releases the block's own fields once they were packed into the layer's columns
+        :param layer:
+        :param position:
+        :return:
+        """
+        self.layer = layer
+        self.position = position
+        self._fields = None
 
-        # Use the proofs-of-work as the block's id
-        return self.pow
+    @staticmethod
+    def _get_flag(value):
+        return None if value is None else bool(value)
 
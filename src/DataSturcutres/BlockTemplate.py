@@ -0,0 +1,140 @@
+from bisect import bisect_left, insort
+
+from DataSturcutres.Block import Block
+from DataSturcutres.BlockView import get_content_digest
+from DataSturcutres.MerkleTree import MerkleTree
+
+# The fields pointing other blocks, encoded by the sorted ids of the pointed blocks
+EDGE_FIELDS = ('viewHeads', 'validRecentBlocks')
+
+
+class BlockTemplate:
+    """
+    The block being mined, assembled incrementally as the miner's view changes
+    The content digest its proofs-of-work commit to (see Block.get_content_digest) is kept in two parts:
+    the encoding of the block's fields, re-encoded only after a field changed,
+    and a Merkle tree of its transaction ids, to which added transactions are appended (rehashing O(log n) nodes)
+    so resetting the challenge doesn't re-serialize the block
+    The sorted ids of the pointed blocks are kept as well, and a changed edge only inserts or removes the ids that changed
+    (re-encoding the fields joins the ids, but doesn't collect and sort them again)
+    Changes go through the template, the block's fields must not be changed directly
+    """
+
+    def __init__(self, block=None):
+        # The block being built
+        self.block = block or Block()
+
+        # The Merkle tree of the block's transaction ids
+        self.tx_tree = MerkleTree([tx.generate_tx_id() for tx in self.block.txs])
+
+        # The encoding of the block's fields (None if a field changed since it was encoded)
+        self.fields_encoding = None
+
+        # Per edge field, the pointed blocks, the sorted distinct ids of these and the number of blocks with each id
+        self.edge_blocks = {}
+        self.edge_ids = {}
+        self.edge_id_counts = {}
+        for name in EDGE_FIELDS:
+            self.edge_blocks[name] = set()
+            self.edge_ids[name] = []
+            self.edge_id_counts[name] = {}
+            self.update_edge_ids(name, getattr(self.block, name))
+
+    def set_field(self, name, value):
+        """
+        Sets a field of the block (other than its transactions)
+        Returns True if the field changed
+        :param name:
+        :param value:
+        :return:
+        """
+        current_value = getattr(self.block, name)
+        if current_value is value or (type(current_value) is type(value) and current_value == value):
+            return False
+
+        setattr(self.block, name, value)
+        if name in EDGE_FIELDS:
+            self.update_edge_ids(name, value)
+
+        self.fields_encoding = None
+        return True
+
+    def update_edge_ids(self, name, blocks):
+        """
+        Updates the sorted ids of an edge field to those of the given blocks, inserting and removing the changed ids
+        :param name:
+        :param blocks:
+        :return:
+        """
+        prev_blocks = self.edge_blocks[name]
+        blocks = set(blocks)
+        ids = self.edge_ids[name]
+        id_counts = self.edge_id_counts[name]
+        for block in prev_blocks - blocks:
+            block_id = block.generate_block_id()
+            id_counts[block_id] -= 1
+            if not id_counts[block_id]:
+                del id_counts[block_id]
+                del ids[bisect_left(ids, block_id)]
+
+        for block in blocks - prev_blocks:
+            block_id = block.generate_block_id()
+            id_counts[block_id] = id_counts.get(block_id, 0) + 1
+            if id_counts[block_id] == 1:
+                insort(ids, block_id)
+
+        self.edge_blocks[name] = blocks
+
+    def add_txs(self, txs):
+        """
+        Appends transactions to the block
+        Returns True if any transaction was added
+        :param txs:
+        :return:
+        """
+        for tx in txs:
+            self.block.txs.append(tx)
+            self.tx_tree.add(tx.generate_tx_id())
+
+        return len(txs) > 0
+
+    def set_txs(self, txs):
+        """
+        Replaces the block's transactions
+        :param txs:
+        :return:
+        """
+        self.block.txs = list(txs)
+        self.tx_tree = MerkleTree([tx.generate_tx_id() for tx in self.block.txs])
+
+    @property
+    def layerId(self):
+        return self.block.layerId
+
+    def get_content_digest(self):
+        """
+        Returns the digest of the block's content, equal to the block's own Block.get_content_digest
+        :return:
+        """
+        if self.fields_encoding is None:
+            self.fields_encoding = self.block.serialize(include_pow=False, include_txs=False, edge_ids=(
+                self.edge_ids['viewHeads'], self.edge_ids['validRecentBlocks']))
+
+        return get_content_digest(self.fields_encoding, len(self.tx_tree), self.tx_tree.get_root())
+
+    def snapshot(self):
+        """
+        Returns a copy of the block as it currently is, which later changes to the template don't affect
+        (e.g. to publish the block once a proofs-of-work was found for its content)
+        :return:
+        """
+        block = Block()
+        block.layerId = self.block.layerId
+        block.minerPk = self.block.minerPk
+        block.weakCoinValue = self.block.weakCoinValue
+        block.viewHeads = list(self.block.viewHeads)
+        block.validRecentBlocks = list(self.block.validRecentBlocks)
+        block.beforeCoin = self.block.beforeCoin
+        block.earlyBlock = self.block.earlyBlock
+        block.txs = list(self.block.txs)
+        return block
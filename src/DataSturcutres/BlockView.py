@@ -0,0 +1,100 @@
+import hashlib
+import struct
+
+from DataSturcutres.MerkleTree import MerkleTree
+
+# Encoded block layout:
+# 1. header - layer id, flags, number of view heads, number of valid recent blocks, number of transactions,
+#    size of the miner's public key and size of the proofs-of-work
+# 2. proofs-of-work
+# 3. miner's public key
+# 4. ids of the view heads followed by ids of the valid recent blocks (each group sorted)
+# 5. transactions, each prefixed by its size
+BLOCK_HEADER = struct.Struct('>QBHHIHH')
+
+# Blocks are referenced by the SHA-256 of their encoding
+BLOCK_ID_SIZE = 32
+
+TX_SIZE = struct.Struct('>I')
+
+
+def get_content_digest(fields_encoding, txs_count, txs_root):
+    """
+    Returns the digest of a block's content, which its proofs-of-work commit to
+    :param fields_encoding: the block's encoding without its proofs-of-work and transactions
+    :param txs_count:
+    :param txs_root: the root of the Merkle tree of the block's transaction ids
+    :return:
+    """
+    return hashlib.sha256(fields_encoding + TX_SIZE.pack(txs_count) + txs_root).digest()
+
+
+class BlockView:
+    """
+    A read-only view over an encoded block
+    Fields are decoded on access and byte fields are returned as memoryview slices of the encoding (without copying)
+    """
+
+    def __init__(self, data):
+        self.data = memoryview(data)
+
+        (self.layer_id, self.flags, self.view_heads_count, self.valid_recent_blocks_count, self.txs_count,
+         miner_pk_size, pow_size) = BLOCK_HEADER.unpack_from(self.data)
+
+        # Offsets of the variable sized fields
+        self.pow_offset = BLOCK_HEADER.size
+        self.miner_pk_offset = self.pow_offset + pow_size
+        self.parent_ids_offset = self.miner_pk_offset + miner_pk_size
+        self.txs_offset = self.parent_ids_offset + \
+            (self.view_heads_count + self.valid_recent_blocks_count) * BLOCK_ID_SIZE
+
+    def get_pow(self):
+        return self.data[self.pow_offset:self.miner_pk_offset]
+
+    def get_miner_pk(self):
+        return self.data[self.miner_pk_offset:self.parent_ids_offset]
+
+    def get_view_head_ids(self):
+        return self._get_ids(self.parent_ids_offset, self.view_heads_count)
+
+    def get_valid_recent_block_ids(self):
+        return self._get_ids(self.parent_ids_offset + self.view_heads_count * BLOCK_ID_SIZE,
+                             self.valid_recent_blocks_count)
+
+    def get_txs(self):
+        """
+        Returns the encoded transactions
+        :return:
+        """
+        txs = []
+        offset = self.txs_offset
+        for i in range(self.txs_count):
+            tx_size, = TX_SIZE.unpack_from(self.data, offset)
+            offset += TX_SIZE.size
+            txs.append(self.data[offset:offset + tx_size])
+            offset += tx_size
+
+        return txs
+
+    def generate_block_id(self):
+        return hashlib.sha256(self.data).digest()
+
+    @property
+    def layerId(self):
+        # Named as the block's attribute, so proofs-of-work are checked against views as they are against blocks
+        return self.layer_id
+
+    def get_content_digest(self):
+        """
+        Returns the digest of the block's content (see Block.get_content_digest) without decoding the block
+        :return:
+        """
+        fields_encoding = BLOCK_HEADER.pack(self.layer_id, self.flags, self.view_heads_count,
+                                            self.valid_recent_blocks_count, 0,
+                                            self.parent_ids_offset - self.miner_pk_offset, 0) + \
+            self.data[self.miner_pk_offset:self.txs_offset].tobytes()
+        tx_ids = [hashlib.sha256(tx.tobytes()).digest() for tx in self.get_txs()]
+        return get_content_digest(fields_encoding, self.txs_count, MerkleTree(tx_ids).get_root())
+
+    def _get_ids(self, offset, count):
+        return [self.data[offset + i * BLOCK_ID_SIZE:offset + (i + 1) * BLOCK_ID_SIZE] for i in range(count)]
@@ -0,0 +1,108 @@
+from itertools import chain
+
+
+class HeadSet:
+    """
+    The heads of a view, i.e. its blocks with in-degree 0 (not pointed by any other block in the view)
+    Every block in the view has a count of the blocks pointing it, so adding a block costs the number of its edges
+    Heads can also be taken from the part of the view below a layer (e.g. for a block mined in that layer),
+    in which a block pointed only by blocks of that layer or later ones is still a head
+    Blocks pointed by a block of an earlier layer than the queried one are dropped for good, so queried layers must not
+    decrease, and the list of heads is rebuilt only when it's requested after a change
+    """
+
+    def __init__(self):
+        # Mapping of block id to the number of blocks in the view pointing it
+        self.child_counts = {}
+
+        # Mapping of block id to the blocks which may still be heads below the queried layer
+        self.open_blocks = {}
+
+        # Mapping of an open block's id to the lowest layer of a block pointing it (None while no block points it)
+        self.min_child_layers = {}
+
+        # The layer of the last query (None for a query over the whole view) and its list of heads
+        # The list is None if the heads changed since it was built
+        self.heads_layer = None
+        self.heads_list = []
+
+    def add_block(self, block):
+        """
+        Adds a block to the view, the blocks it points are no longer heads below the layers after its own
+        :param block:
+        :return:
+        """
+        block_id = block.generate_block_id()
+        if block_id in self.child_counts:
+            return
+
+        for pointed_block in set(chain(block.viewHeads, block.validRecentBlocks)):
+            pointed_block_id = pointed_block.generate_block_id()
+            self.child_counts[pointed_block_id] = self.child_counts.get(pointed_block_id, 0) + 1
+
+            min_child_layer = self.min_child_layers.get(pointed_block_id)
+            if pointed_block_id in self.open_blocks and (min_child_layer is None or block.layerId < min_child_layer):
+                self.min_child_layers[pointed_block_id] = block.layerId
+                if self.heads_layer is None or block.layerId < self.heads_layer:
+                    self.heads_list = None
+
+        self.child_counts[block_id] = 0
+        self.open_blocks[block_id] = block
+        self.min_child_layers[block_id] = None
+        if self.heads_layer is None or block.layerId < self.heads_layer:
+            self.heads_list = None
+
+    def forget_blocks(self, block_ids):
+        """
+        Drops blocks from the view (e.g. blocks compacted out of the mesh), they're no longer heads
+        :param block_ids:
+        :return:
+        """
+        for block_id in block_ids:
+            self.child_counts.pop(block_id, None)
+            if self.open_blocks.pop(block_id, None) is not None:
+                del self.min_child_layers[block_id]
+                self.heads_list = None
+
+    def get_child_count(self, block):
+        return self.child_counts.get(block.generate_block_id(), 0)
+
+    def get_heads(self, below_layer=None):
+        """
+        Returns the list of head blocks of the view below a layer (of the whole view if below_layer is None)
+        The list is shared until the heads change, so it must not be modified
+        :param below_layer:
+        :return:
+        """
+        if below_layer != self.heads_layer:
+            self.heads_layer = below_layer
+            self.heads_list = None
+            if below_layer is not None:
+                self.drop_covered_blocks(below_layer)
+
+        if self.heads_list is None:
+            self.heads_list = [block for block_id, block in self.open_blocks.items()
+                               if self.is_head(block, self.min_child_layers[block_id], below_layer)]
+
+        return self.heads_list
+
+    def drop_covered_blocks(self, layer_id):
+        """
+        Forgets the open blocks pointed by a block of a layer before layer_id, they're no longer heads of later queries
+        :param layer_id:
+        :return:
+        """
+        for block_id in [block_id for block_id, min_child_layer in self.min_child_layers.items()
+                         if min_child_layer is not None and min_child_layer < layer_id]:
+            del self.open_blocks[block_id]
+            del self.min_child_layers[block_id]
+
+    @staticmethod
+    def is_head(block, min_child_layer, below_layer):
+        if below_layer is None:
+            return min_child_layer is None
+
+        return block.layerId < below_layer and (min_child_layer is None or min_child_layer >= below_layer)
+
+    def __len__(self):
+        return len(self.get_heads(self.heads_layer))
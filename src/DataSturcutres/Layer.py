@@ -1,3 +1,13 @@
+import struct
+import time
+from array import array
+from datetime import datetime
+
+
+# Encoded layer layout: layer id, start timestamp and number of blocks, followed by the (sorted) ids of its blocks
+LAYER_HEADER = struct.Struct('>QdI')
+
+
 class Layer:
     """
     A layer is a collection of blocks corresponding to a sequential id
@@ -12,3 +22,70 @@ class Layer:
 
         # The list of blocks claiming their layer to be the current layer
         self.blocks = []
+
+        # Columns of the data of the blocks added to the layer, by their position in it
+        # Ids and proofs-of-work are concatenated (proofs are delimited by pow_offsets)
+        self.block_ids = bytearray()
+        self.flags = bytearray()
+        self.pows = bytearray()
+        self.pow_offsets = array('L', [0])
+        self.miner_pks = []
+        self.txs = []
+
+        # Pointed blocks of all blocks, the view heads of the block at position i are
+        # parents[parent_offsets[2 * i]:parent_offsets[2 * i + 1]] followed by its valid recent blocks
+        # up to parent_offsets[2 * i + 2]
+        self.parents = []
+        self.parent_offsets = array('L', [0])
+
+    def add_block(self, block):
+        """
+        Adds a block to the layer, packing its data into the layer's columns
+        :param block:
+        :return:
+        """
+        self.block_ids += block.generate_block_id()
+        self.flags.append(block.get_flags())
+        self.pows += block.pow or b''
+        self.pow_offsets.append(len(self.pows))
+        self.miner_pks.append(block.minerPk)
+        self.txs.append(tuple(block.txs))
+
+        self.parents.extend(block.viewHeads)
+        self.parent_offsets.append(len(self.parents))
+        self.parents.extend(block.validRecentBlocks)
+        self.parent_offsets.append(len(self.parents))
+
+        block.pack(self, len(self.blocks))
+        self.blocks.append(block)
+
+    def drop_bodies(self):
+        """
+        Drops the blocks' edges, transactions, proofs-of-work and miner keys, keeping only their ids and flags
+        Blocks of a compacted layer may still be pointed by later blocks, this keeps them from holding older layers
+        :return:
+        """
+        block_count = len(self.blocks)
+        self.pows = bytearray()
+        self.pow_offsets = array('L', [0]) * (block_count + 1)
+        self.miner_pks = [None] * block_count
+        self.txs = [()] * block_count
+        self.parents = []
+        self.parent_offsets = array('L', [0]) * (2 * block_count + 1)
+        self.blocks = []
+
+    def get_block_count(self):
+        return len(self.blocks)
+
+    def serialize(self):
+        """
+        Returns the canonical binary encoding of the layer
+        Blocks are referenced by their ids (and encoded separately)
+        :return:
+        """
+        start_layer_ts = self.start_layer_ts
+        if isinstance(start_layer_ts, datetime):
+            start_layer_ts = time.mktime(start_layer_ts.timetuple()) + start_layer_ts.microsecond / 1e6
+
+        block_ids = sorted([block.generate_block_id() for block in self.blocks])
+        return LAYER_HEADER.pack(self.id, start_layer_ts, len(block_ids)) + b''.join(block_ids)
@@ -0,0 +1,52 @@
+from DataSturcutres.BlockView import BLOCK_ID_SIZE
+
+
+class LayerSummary:
+    """
+    What the mesh keeps of a layer once it's compacted (beyond the tortoise protocol's horizon, so nothing changes in it)
+    The ids of its blocks (concatenated, by position) and their final validity
+    The ids of the transactions of its valid blocks are rolled into the mesh's TxIdArchive
+    The blocks themselves are dropped, their full encodings (and proofs-of-work) remain in the mesh's store
+    """
+
+    # A summary has no blocks in memory
+    blocks = ()
+
+    def __init__(self, layer_id, start_layer_ts, block_ids, valid_flags, pointed_block_count=0):
+        # Layer id and start timestamp, as in the summarized layer
+        self.id = layer_id
+        self.start_layer_ts = start_layer_ts
+
+        # The ids of the layer's blocks (concatenated, by their position in the layer)
+        self.block_ids = bytes(block_ids)
+
+        # Per block position, 1 if the block was decided valid (confirmed by the tortoise protocol), 0 otherwise
+        self.valid_flags = bytearray(valid_flags)
+
+        # The number of the layer's blocks pointed by the blocks of the next layer (see Mesh.get_pointed_block_count)
+        self.pointed_block_count = pointed_block_count
+
+    @staticmethod
+    def from_layer(layer, valid_blocks=None, pointed_block_count=0):
+        """
+        Returns the summary of a layer
+        :param layer:
+        :param valid_blocks: the set of the layer's blocks decided valid (all of them if None)
+        :param pointed_block_count:
+        :return:
+        """
+        valid_flags = [valid_blocks is None or block in valid_blocks for block in layer.blocks]
+        return LayerSummary(layer.id, layer.start_layer_ts, layer.block_ids, valid_flags, pointed_block_count)
+
+    def get_block_count(self):
+        return len(self.valid_flags)
+
+    def get_block_ids(self):
+        return [self.block_ids[position * BLOCK_ID_SIZE:(position + 1) * BLOCK_ID_SIZE]
+                for position in range(self.get_block_count())]
+
+    def has_block_id(self, block_id):
+        return block_id in self.get_block_ids()
+
+    def get_valid_block_ids(self):
+        return [block_id for block_id, valid in zip(self.get_block_ids(), self.valid_flags) if valid]
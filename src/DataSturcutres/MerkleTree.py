@@ -0,0 +1,66 @@
+import hashlib
+
+# The root of a tree without leaves
+EMPTY_ROOT = hashlib.sha256(b'').digest()
+
+
+class MerkleTree:
+    """
+    A Merkle tree over leaves which are hashes (e.g. transaction ids), built as leaves are appended
+    Every level keeps its nodes, a node hashes the concatenation of its two children and a node without a right child
+    is promoted as is, so appending a leaf only rehashes the nodes on its path to the root (O(log n))
+    """
+
+    def __init__(self, leaves=()):
+        # The nodes of every level, from the leaves up to the root (the last level always holds a single node)
+        self.levels = [list(leaves)]
+        while len(self.levels[-1]) > 1:
+            nodes = self.levels[-1]
+            self.levels.append([self.get_parent(nodes, index) for index in range(0, len(nodes), 2)])
+
+    @staticmethod
+    def get_parent(nodes, left_index):
+        """
+        Returns the parent of the node at left_index and of its right sibling (if there is one)
+        :param nodes:
+        :param left_index:
+        :return:
+        """
+        if left_index + 1 == len(nodes):
+            return nodes[left_index]
+
+        return hashlib.sha256(nodes[left_index] + nodes[left_index + 1]).digest()
+
+    def add(self, leaf):
+        """
+        Appends a leaf and rehashes its path to the root
+        :param leaf:
+        :return:
+        """
+        self.levels[0].append(leaf)
+        index = len(self.levels[0]) - 1
+        level = 0
+        while len(self.levels[level]) > 1:
+            if level + 1 == len(self.levels):
+                self.levels.append([])
+
+            nodes = self.levels[level]
+            parents = self.levels[level + 1]
+            parent_index = index // 2
+            parent = self.get_parent(nodes, parent_index * 2)
+            if parent_index == len(parents):
+                parents.append(parent)
+            else:
+                parents[parent_index] = parent
+
+            index = parent_index
+            level += 1
+
+    def get_root(self):
+        if not self.levels[0]:
+            return EMPTY_ROOT
+
+        return self.levels[-1][0]
+
+    def __len__(self):
+        return len(self.levels[0])
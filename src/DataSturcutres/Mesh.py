@@ -1,5 +1,13 @@
 from DataSturcutres.Block import Block
+from DataSturcutres.BlockView import BlockView
 from DataSturcutres.Layer import Layer
+from DataSturcutres.LayerSummary import LayerSummary
+from DataSturcutres.ReachabilityIndex import ReachabilityIndex
+from DataSturcutres.TxIdArchive import TxIdArchive
+from Ingestion.BlockIngestionPipeline import BlockIngestionPipeline
+from Scheduling.SystemClock import SystemClock
+import hashlib
+import struct
 from datetime import datetime
 
 
@@ -8,41 +16,350 @@ class Mesh:
     The Mesh object is layered DAG composed of sequential layers
     """
 
-    def __init__(self):
+    def __init__(self, tmin=200, store=None, clock=None):
         # Minimal number of blocks in a layer
-        self.tmin = 200
+        self.tmin = tmin
+
+        # An optional MeshStore persisting the mesh's blocks (genesis blocks aren't stored as they're always the same)
+        # The mesh is loaded from it on initialize
+        self.store = store
+
+        # The clock timing the layers' starts (the wall clock by default)
+        self.clock = clock if clock is not None else SystemClock()
+
+        # An index of the blocks' views used to answer "has in view" queries without walking the DAG
+        self.reachability = ReachabilityIndex()
+
+        # Mapping of block id to its syntactic validity verdict
+        # Verdicts never change, so a block is validated once and its descendants only look up its verdict
+        self.validity = {}
+
+        # Mapping of layer id to the ids of its blocks found invalid (see add_invalid_block)
+        # Their verdicts are dropped along with the layer's valid blocks once it's compacted
+        self.invalid_block_ids = {}
+
+        # Mapping of block id to block for every block in the mesh (including staged blocks)
+        self.blocks = {}
+
+        # Mapping of future layer ids to their blocks which arrived before the layers preceding them were complete
+        # These blocks are added to the mesh once their layer follows the last valid layer
+        self.staged_blocks = {}
+
+        # The id of the last layer such that it and all layers before it have at least tmin blocks
+        self.last_valid_layer = -1
+
+        # Layers below this id were compacted into LayerSummary objects (see compact_layers)
+        self.compacted_layer_count = 0
+
+        # The ids of the transactions included in the valid blocks of compacted layers
+        self.compacted_txs = TxIdArchive()
+
+        # Delivers blocks arriving from the network to the subscribers, in batches
+        self.arriving_blocks = BlockIngestionPipeline()
 
         # Create a genesis block
-        genesis_layer = Layer(layer_id=0, start_layer_ts=datetime.now())
+        genesis_layer = Layer(layer_id=0, start_layer_ts=datetime.fromtimestamp(self.clock.time()))
         self.layers = [genesis_layer]
         for i in range(self.tmin):
             genesis_block = Block()
             genesis_block.layerId = 0
-            genesis_layer.blocks.append(genesis_block)
+
+            # Genesis blocks have no proofs-of-work, their index tells their ids apart
+            genesis_block.pow = struct.pack('>I', i)
+            self.add_block(genesis_block)
+
+    def add_block(self, block):
+        """
+        Adds a block to its layer (creating the layer if needed) and indexes its view
+        The block's edges must point to blocks previously added to the mesh
+        Blocks of layers beyond the one following the last valid layer are staged instead
+        Returns True if the block was added to its layer
+        :param block:
+        :return:
+        """
+        block_id = block.generate_block_id()
+        if block.layerId > self.last_valid_layer + 1:
+            self.staged_blocks.setdefault(block.layerId, []).append(block)
+            self.blocks[block_id] = block
+            return False
+
+        while len(self.layers) <= block.layerId:
+            self.layers.append(Layer(layer_id=len(self.layers),
+                                     start_layer_ts=datetime.fromtimestamp(self.clock.time())))
+
+        self.layers[block.layerId].add_block(block)
+        self.blocks[block_id] = block
+        self.reachability.add_block(block)
+
+        if self.store is not None and block.layerId > 0:
+            self.store.append_block(block)
+
+        self.update_last_valid_layer()
+        return True
+
+    def update_last_valid_layer(self):
+        """
+        Advances the last valid layer over the layers which became complete, adding the staged blocks of the layer
+        following it
+        :return:
+        """
+        while self.get_layer_block_count(self.last_valid_layer + 1) >= self.tmin:
+            self.last_valid_layer += 1
+            for block in self.staged_blocks.pop(self.last_valid_layer + 1, []):
+                self.add_block(block)
 
     def get_last_valid_layer(self):
         """
-        Returns the last layer valid layer
+        Returns the id of the last layer valid layer
+        :return:
+        """
+        return self.last_valid_layer
+
+    def get_block(self, block_id):
+        """
+        Returns the block with the given id, None if it's not in the mesh
+        :param block_id:
+        :return:
+        """
+        return self.blocks.get(block_id)
+
+    def get_layer(self, layer_id):
+        """
+        Returns the layer with the given id, None if it wasn't created yet
+        :param layer_id:
+        :return:
+        """
+        if 0 <= layer_id < len(self.layers):
+            return self.layers[layer_id]
+
+        return None
+
+    def get_layer_block_count(self, layer_id):
+        """
+        Returns the number of blocks added to a layer (0 for layers that weren't created yet)
+        :param layer_id:
+        :return:
+        """
+        layer = self.get_layer(layer_id)
+        return layer.get_block_count() if layer is not None else 0
+
+    def get_pointed_block_count(self, layer_id):
+        """
+        Returns the number of a layer's blocks pointed by the blocks of the next layer
+        Blocks arriving after the next layer's blocks were mined aren't pointed by them,
+        so unlike the layer's block count it doesn't depend on when the layer's blocks arrived
+        :param layer_id:
+        :return:
+        """
+        layer = self.get_layer(layer_id)
+        if isinstance(layer, LayerSummary):
+            return layer.pointed_block_count
+
+        next_layer = self.get_layer(layer_id + 1)
+        if layer is None or next_layer is None:
+            return 0
+
+        return len(set([block for next_block in next_layer.blocks for block in next_block.viewHeads
+                        if block.layerId == layer_id]))
+
+    def get_staged_block_count(self, layer_id):
+        return len(self.staged_blocks.get(layer_id, []))
+
+    def compact_layers(self, layer_id, get_valid_blocks=None):
+        """
+        Replaces the complete layers below layer_id with their summaries, dropping their blocks from memory
+        (from the mapping of blocks, the validity table and the reachability index)
+        The transactions of the valid blocks are added to the compacted transactions
+        Compacted blocks can no longer be pointed by added blocks, so layer_id must be below any layer still voted about
+        The verdicts of the compacted layers' invalid blocks are dropped as well, other layers' verdicts are kept
+        Returns the new summaries
+        :param layer_id:
+        :param get_valid_blocks: an optional function returning the blocks of a layer decided valid
+         (e.g. confirmed by the tortoise protocol), all blocks are valid if None
+        :return:
+        """
+        layer_id = min(layer_id, self.last_valid_layer + 1)
+        summaries = []
+        for compacted_layer_id in range(self.compacted_layer_count, layer_id):
+            layer = self.layers[compacted_layer_id]
+            valid_blocks = set(get_valid_blocks(compacted_layer_id)) if get_valid_blocks is not None else None
+            summary = LayerSummary.from_layer(layer, valid_blocks, self.get_pointed_block_count(compacted_layer_id))
+            self.compacted_txs.add_tx_ids([tx.generate_tx_id() for block in layer.blocks
+                                           if valid_blocks is None or block in valid_blocks for tx in block.txs])
+            for block in layer.blocks:
+                block_id = block.generate_block_id()
+                del self.blocks[block_id]
+                self.validity.pop(block_id, None)
+
+            for block_id in self.invalid_block_ids.pop(compacted_layer_id, ()):
+                self.validity.pop(block_id, None)
+
+            self.reachability.remove_layer(compacted_layer_id)
+            layer.drop_bodies()
+            self.layers[compacted_layer_id] = summary
+            summaries.append(summary)
+
+        if summaries:
+            self.compacted_layer_count = layer_id
+
+        return summaries
+
+    def add_invalid_block(self, block_id, layer_id):
+        """
+        Records a block's verdict as invalid, until its layer is compacted
+        :param block_id:
+        :param layer_id:
         :return:
         """
-        return self.layers[:-1]
+        self.validity[block_id] = False
+        self.invalid_block_ids.setdefault(layer_id, []).append(block_id)
+
+    def has_compacted_block(self, block):
+        """
+        Returns True if a block is in the summary of its (compacted) layer
+        :param block:
+        :return:
+        """
+        layer = self.get_layer(block.layerId)
+        return isinstance(layer, LayerSummary) and layer.has_block_id(block.generate_block_id())
+
+    def verify_compacted_block(self, block_id, pow_protocol):
+        """
+        Returns True if a compacted block's stored encoding matches its id and has a valid proofs-of-work for its content
+        Returns None if the block isn't stored (e.g. a genesis block, or a mesh without a store)
+        :param block_id:
+        :param pow_protocol:
+        :return:
+        """
+        if self.store is None:
+            return None
+
+        self.store.open()
+        if block_id not in self.store.entries:
+            return None
+
+        view = BlockView(self.store.get_block_data(block_id))
+        return view.generate_block_id() == block_id and pow_protocol.verify_pow(view.get_pow().tobytes(), view)
 
     def register_for_new_arriving_blocks(self, callback_func):
         """
         Call callback_func upon new arriving blocks
+        callback_func is called (from the ingestion thread) with a list of the blocks that arrived together
         :param callback_func:
         :return:
         """
+        self.arriving_blocks.register(callback_func)
 
-        # Remains unimplemented at the moment
-        pass
+    def receive_block(self, block):
+        """
+        Queues a block received from the network for the subscribers
+        Waits while the subscribers are too far behind
+        :param block:
+        :return:
+        """
+        self.arriving_blocks.submit_block(block)
 
-    def initialize(self):
+    def initialize(self, retained_layers=None):
         """
         Initialize the mesh contents based on file checkpoints and the gossip network
+        :param retained_layers: number of recent stored layers to decode into blocks (all of them if None),
+         older layers are loaded as summaries
+        :return:
+        """
+        if self.store is not None:
+            self.load_store(retained_layers)
+
+        # Syncing from the gossip network remains unimplemented at the moment
+
+    def load_store(self, retained_layers=None):
+        """
+        Opens the store and adds its blocks to the mesh, layer by layer
+        Blocks are decoded from their stored encoding, without validating them again
+        (only valid blocks are stored, so they're recorded as valid)
+        Only the last retained_layers layers (and the one before them) are decoded, older layers are loaded
+        as summaries (see load_summaries), so the blocks in memory don't grow with the stored history
+        :param retained_layers: number of recent layers to decode (all of them if None)
+        :return:
+        """
+        self.store.open()
+        layer_count = self.store.get_layer_count()
+        first_layer_id = 1 if retained_layers is None else max(layer_count - retained_layers - 1, 1)
+        self.load_summaries(first_layer_id)
+
+        # Blocks of summarized layers pointed by decoded blocks
+        compacted_blocks = {}
+        for layer_id in range(first_layer_id, layer_count):
+            for block_id in self.store.get_layer_block_ids(layer_id):
+                if block_id not in self.blocks:
+                    self.add_block(self.decode_stored_block(block_id, compacted_blocks))
+                    self.validity[block_id] = True
+
+    def load_summaries(self, layer_id):
+        """
+        Loads the stored layers below layer_id as summaries (as if they were compacted, see compact_layers)
+        The summaries take their block ids from the store's index and the ids of their transactions are archived
+        from the stored encodings, which are paged out a segment at a time
+        All their blocks are taken as valid, as the tortoise protocol's decisions about them aren't stored
+        :param layer_id:
         :return:
         """
+        if layer_id <= 1:
+            return
 
-        # Remains unimplemented at the moment
-        pass
+        self.compact_layers(1)
+        for summarized_layer_id in range(1, layer_id):
+            block_ids = self.store.get_layer_block_ids(summarized_layer_id)
+            pointed_block_ids = set([view_head_id.tobytes()
+                                     for next_block_id in self.store.get_layer_block_ids(summarized_layer_id + 1)
+                                     for view_head_id in BlockView(self.store.get_block_data(next_block_id))
+                                     .get_view_head_ids()])
+            self.layers.append(LayerSummary(summarized_layer_id, datetime.fromtimestamp(self.clock.time()),
+                                            b''.join(block_ids), [1] * len(block_ids),
+                                            len(pointed_block_ids.intersection(block_ids))))
+            self.compacted_txs.add_tx_ids([hashlib.sha256(tx.tobytes()).digest() for block_id in block_ids
+                                           for tx in BlockView(self.store.get_block_data(block_id)).get_txs()])
+            self.reachability.remove_layer(summarized_layer_id)
+            self.store.page_out(summarized_layer_id + 1)
+            if self.last_valid_layer + 1 == summarized_layer_id and len(block_ids) >= self.tmin:
+                self.last_valid_layer = summarized_layer_id
+
+        self.compacted_layer_count = layer_id
+
+    def decode_stored_block(self, block_id, compacted_blocks):
+        """
+        Returns a stored block, decoded
+        The blocks it points in summarized layers are stand-ins holding only their layer id and block id
+        (as the blocks of compacted layers do)
+        :param block_id:
+        :param compacted_blocks: mapping of block id to the stand-ins made so far, new ones are added to it
+        :return:
+        """
+        data = self.store.get_block_data(block_id)
+        view = BlockView(data)
+        pointed_blocks = {}
+        for pointed_block_id in view.get_view_head_ids() + view.get_valid_recent_block_ids():
+            pointed_block_id = pointed_block_id.tobytes()
+            pointed_block = self.blocks.get(pointed_block_id) or compacted_blocks.get(pointed_block_id)
+            if pointed_block is None:
+                # Genesis blocks aren't stored
+                pointed_block = Block()
+                pointed_block.layerId = self.store.entries[pointed_block_id][0] \
+                    if pointed_block_id in self.store.entries else 0
+                pointed_block.blockId = pointed_block_id
+                compacted_blocks[pointed_block_id] = pointed_block
+
+            pointed_blocks[pointed_block_id] = pointed_block
+
+        block = Block.deserialize(data, pointed_blocks)
+        block.blockId = block_id
+        return block
+
+    def page_out_layers(self, layer_id):
+        """
+        Releases the memory mapped for stored layers older than layer_id
+        :param layer_id:
+        :return:
+        """
+        if self.store is not None and self.store.is_open():
+            self.store.page_out(layer_id)
 
@@ -0,0 +1,197 @@
+import mmap
+import os
+import struct
+
+from DataSturcutres.BlockView import BLOCK_ID_SIZE
+
+# Index entry: block id, layer id, offset of the encoded block in its segment and its size
+INDEX_ENTRY = struct.Struct('>%dsQQI' % BLOCK_ID_SIZE)
+
+INDEX_FILE_NAME = 'index.dat'
+SEGMENT_FILE_NAME = 'segment-%08d.dat'
+
+
+class MeshStore:
+    """
+    A persistent, append-only store of encoded blocks
+    Blocks are appended to segment files, each holding the blocks of layers_per_segment consecutive layers,
+    and are read through read-only memory maps of the segments (mapped on first access)
+    An index file lists every stored block, it's read on open to map block ids to their location and layers to their blocks
+    Segments of old layers can be paged out (unmapped) and are mapped again only if accessed
+    """
+
+    def __init__(self, directory, layers_per_segment=64):
+        # The directory holding the index and segment files
+        self.directory = directory
+
+        # Number of layers in each segment file (must not change between runs)
+        self.layers_per_segment = layers_per_segment
+
+        # Mapping of block id to its (layer id, offset, size)
+        self.entries = None
+
+        # Mapping of layer id to the ids of its stored blocks (in the order they were stored)
+        self.layer_block_ids = None
+
+        # Mapping of segment id to its memory map (of mapped segments only)
+        self.segment_maps = {}
+
+        # Mapping of segment id to its size
+        self.segment_sizes = {}
+
+        # The index file, opened for appending
+        self.index_file = None
+
+    def is_open(self):
+        return self.entries is not None
+
+    def open(self):
+        """
+        Reads the index, creating the store if it doesn't exist
+        Index entries of blocks whose data wasn't fully written (e.g. when a write was interrupted) are discarded
+        :return:
+        """
+        if self.is_open():
+            return
+
+        if not os.path.isdir(self.directory):
+            os.makedirs(self.directory)
+
+        self.entries = {}
+        self.layer_block_ids = {}
+
+        index_path = os.path.join(self.directory, INDEX_FILE_NAME)
+        index_size = 0
+        if os.path.exists(index_path):
+            with open(index_path, 'rb') as index_file:
+                index_data = index_file.read()
+
+            for offset in range(0, len(index_data) - INDEX_ENTRY.size + 1, INDEX_ENTRY.size):
+                block_id, layer_id, block_offset, block_size = INDEX_ENTRY.unpack_from(index_data, offset)
+                if block_offset + block_size > self._get_segment_size(self.get_segment_id(layer_id)):
+                    break
+
+                self._add_entry(block_id, layer_id, block_offset, block_size)
+                index_size = offset + INDEX_ENTRY.size
+
+        self.index_file = open(index_path, 'ab')
+        self.index_file.truncate(index_size)
+
+    def close(self):
+        if not self.is_open():
+            return
+
+        self.page_out(None)
+        self.index_file.close()
+        self.index_file = None
+        self.entries = None
+        self.layer_block_ids = None
+        self.segment_sizes = {}
+
+    def append_block(self, block):
+        """
+        Appends the encoded block to the store (blocks which were already stored are ignored)
+        :param block:
+        :return:
+        """
+        self.open()
+
+        block_id = block.generate_block_id()
+        if block_id in self.entries:
+            return
+
+        data = block.serialize()
+        segment_id = self.get_segment_id(block.layerId)
+        block_offset = self._get_segment_size(segment_id)
+        with open(self._get_segment_path(segment_id), 'ab') as segment_file:
+            segment_file.write(data)
+
+        # The index entry is written after the data, so an indexed block is always complete
+        self.segment_sizes[segment_id] = block_offset + len(data)
+        self.index_file.write(INDEX_ENTRY.pack(block_id, block.layerId, block_offset, len(data)))
+        self.index_file.flush()
+
+        self._add_entry(block_id, block.layerId, block_offset, len(data))
+
+    def get_block_data(self, block_id):
+        """
+        Returns a memoryview over the encoding of a stored block
+        The view must be released before the block's segment is paged out
+        :param block_id:
+        :return:
+        """
+        layer_id, block_offset, block_size = self.entries[block_id]
+        segment_map = self._get_segment_map(self.get_segment_id(layer_id), block_offset + block_size)
+        return memoryview(segment_map)[block_offset:block_offset + block_size]
+
+    def get_layer_block_ids(self, layer_id):
+        return self.layer_block_ids.get(layer_id, [])
+
+    def get_layers(self, first_layer_id=1):
+        """
+        Yields the (layer id, encoded blocks) of the stored layers from first_layer_id on
+        The encodings are copied out of the memory maps, so the segments of yielded layers can be paged out
+        :param first_layer_id:
+        :return:
+        """
+        self.open()
+        for layer_id in range(first_layer_id, self.get_layer_count()):
+            yield layer_id, [self.get_block_data(block_id).tobytes() for block_id in self.get_layer_block_ids(layer_id)]
+            self.page_out(layer_id)
+
+    def get_layer_count(self):
+        """
+        Returns the number of layers up to the last stored one (including the genesis layer)
+        :return:
+        """
+        return max(self.layer_block_ids) + 1 if self.layer_block_ids else 1
+
+    def page_out(self, layer_id):
+        """
+        Unmaps segments holding only layers older than layer_id (all segments if layer_id is None)
+        Segments with views still exported over them remain mapped
+        :param layer_id:
+        :return:
+        """
+        for segment_id in list(self.segment_maps.keys()):
+            if layer_id is None or (segment_id + 1) * self.layers_per_segment <= layer_id:
+                try:
+                    self.segment_maps[segment_id].close()
+                except BufferError:
+                    continue
+
+                del self.segment_maps[segment_id]
+
+    def get_segment_id(self, layer_id):
+        return layer_id // self.layers_per_segment
+
+    def _add_entry(self, block_id, layer_id, block_offset, block_size):
+        self.entries[block_id] = (layer_id, block_offset, block_size)
+        self.layer_block_ids.setdefault(layer_id, []).append(block_id)
+
+    def _get_segment_path(self, segment_id):
+        return os.path.join(self.directory, SEGMENT_FILE_NAME % segment_id)
+
+    def _get_segment_size(self, segment_id):
+        if segment_id not in self.segment_sizes:
+            segment_path = self._get_segment_path(segment_id)
+            self.segment_sizes[segment_id] = os.path.getsize(segment_path) if os.path.exists(segment_path) else 0
+
+        return self.segment_sizes[segment_id]
+
+    def _get_segment_map(self, segment_id, min_size):
+        """
+        Returns a memory map of the segment covering at least min_size bytes (remapping it if it has grown)
+        :param segment_id:
+        :param min_size:
+        :return:
+        """
+        segment_map = self.segment_maps.get(segment_id)
+        if segment_map is None or len(segment_map) < min_size:
+            with open(self._get_segment_path(segment_id), 'rb') as segment_file:
+                segment_map = mmap.mmap(segment_file.fileno(), 0, access=mmap.ACCESS_READ)
+
+            # A previous (smaller) map is left to be collected, views may still be exported over it
+            self.segment_maps[segment_id] = segment_map
+
+        return segment_map
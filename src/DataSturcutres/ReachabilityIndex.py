@@ -0,0 +1,242 @@
+from itertools import chain
+
+
+class ReachabilityIndex:
+    """
+    An incremental index answering whether a block has another block in its view
+
+    Every indexed block holds layer-bounded ancestor bitsets:
+    1. window - for each of the `horizon` + 1 layers below the block, the positions (within that layer)
+       of all the blocks in the block's view
+    2. skips - edges in the block's view spanning more than a single layer whose source is inside the window
+    Both are computed once from the block's direct edges when the block is added, so a query inside the window
+    is a single bit test. Every path leaving the window passes either through the window's bottom layer or
+    through a skip edge, so a deeper query hops through these "exits" (one hop per `horizon` layers).
+    """
+
+    def __init__(self, horizon=8):
+        # Number of layers below a block fully covered by its window bitsets (the window holds an extra exit layer)
+        self.horizon = horizon
+
+        # Mapping of indexed blocks to their position inside their layer
+        self.positions = {}
+
+        # Mapping of layer id to the list of indexed blocks in it (ordered by position)
+        self.layer_blocks = {}
+
+        # Mapping of indexed blocks to their window bitsets (layer id -> bitset)
+        self.windows = {}
+
+        # Mapping of indexed blocks to their skip edges (target layer id -> [targets bitset, highest source layer])
+        self.skips = {}
+
+        # Memoized bitsets for queries reaching below the window (layer id -> block -> bitset)
+        self.deep_views = {}
+
+        # Blocks of layers below this one were removed from the index (see remove_layer)
+        self.first_layer = 0
+
+    def add_block(self, block):
+        """
+        Index the block's view
+        Blocks are considered immutable once indexed and their edges must point to previously indexed blocks
+        :param block:
+        :return:
+        """
+        if block in self.positions:
+            return
+
+        self.windows[block], self.skips[block] = self.compute_view(block)
+
+        layer_blocks = self.layer_blocks.setdefault(block.layerId, [])
+        self.positions[block] = len(layer_blocks)
+        layer_blocks.append(block)
+
+    def remove_layer(self, layer_id):
+        """
+        Drops a layer's blocks from the index (along with the memoized views into the layer)
+        Layers are removed oldest first, and blocks pointing removed blocks don't see them
+        :param layer_id:
+        :return:
+        """
+        for block in self.layer_blocks.pop(layer_id, []):
+            del self.positions[block]
+            del self.windows[block]
+            del self.skips[block]
+
+        # Memoized views are keyed by blocks above their layer, so the removed blocks only key views into removed layers
+        self.deep_views.pop(layer_id, None)
+        self.first_layer = max(self.first_layer, layer_id + 1)
+
+    def compute_view(self, block):
+        """
+        Returns the window and skip bitsets of a block based on its direct edges
+        :param block:
+        :return:
+        """
+        window = {}
+        skips = {}
+        window_start = block.layerId - self.horizon
+
+        for pointed_block in set(chain(block.viewHeads, block.validRecentBlocks)):
+            if pointed_block.layerId < self.first_layer:
+                continue
+
+            if pointed_block in self.positions:
+                bit = 1 << self.positions[pointed_block]
+                if pointed_block.layerId >= window_start - 1:
+                    self._merge_bits(window, pointed_block.layerId, bit)
+
+                if pointed_block.layerId < block.layerId - 1:
+                    self._merge_skip(skips, pointed_block.layerId, bit, block.layerId)
+
+                if pointed_block.layerId < window_start - 1:
+                    # The pointed block is an exit by itself, there's no need to look further
+                    continue
+
+                pointed_window = self.windows[pointed_block]
+                pointed_skips = self.skips[pointed_block]
+                source_layer_bound = window_start
+            else:
+                # A block which is not part of the mesh (e.g. a block that is still being mined)
+                # can't be pointed by a bit, so its view is merged instead
+                pointed_window, pointed_skips = self.compute_view(pointed_block)
+                if pointed_block.layerId >= window_start - 1:
+                    source_layer_bound = window_start
+                else:
+                    # Keep every block in its view as a potential exit
+                    for layer_id, bits in pointed_window.items():
+                        self._merge_skip(skips, layer_id, bits, block.layerId)
+                    source_layer_bound = None
+
+            for layer_id, bits in pointed_window.items():
+                if layer_id >= window_start - 1:
+                    self._merge_bits(window, layer_id, bits)
+
+            for layer_id, (bits, source_layer) in pointed_skips.items():
+                if source_layer_bound is None:
+                    self._merge_skip(skips, layer_id, bits, block.layerId)
+                elif source_layer >= source_layer_bound:
+                    self._merge_skip(skips, layer_id, bits, source_layer)
+
+        return window, skips
+
+    def has_in_view(self, block, other_block):
+        """
+        Returns True if block points other_block (directly or indirectly)
+        :param block:
+        :param other_block:
+        :return:
+        """
+        if other_block.layerId >= block.layerId:
+            return False
+
+        if other_block not in self.positions:
+            # Not indexed, walk the view instead
+            return block.has_in_view(other_block)
+
+        return bool(self.reachable_in_layer(block, other_block.layerId) & (1 << self.positions[other_block]))
+
+    def reachable_in_layer(self, block, layer_id):
+        """
+        Returns the bitset of positions of layer_id's blocks that are in the block's view (0 for removed layers)
+        :param block:
+        :param layer_id:
+        :return:
+        """
+        if layer_id >= block.layerId or layer_id < self.first_layer:
+            return 0
+
+        if block not in self.positions:
+            window, skips = self.compute_view(block)
+            if block.layerId - layer_id <= self.horizon + 1:
+                return window.get(layer_id, 0)
+
+            self.deep_views.setdefault(layer_id, {})
+            self._resolve_deep_views(list(self._exit_blocks(block, window, skips, layer_id)), layer_id)
+            return self._combine_exits(block, window, skips, layer_id)
+
+        if block.layerId - layer_id <= self.horizon + 1:
+            return self.windows[block].get(layer_id, 0)
+
+        reachable = self.deep_views.setdefault(layer_id, {})
+        if block not in reachable:
+            self._resolve_deep_views([block], layer_id)
+
+        return reachable[block]
+
+    def _resolve_deep_views(self, pending, layer_id):
+        """
+        Memoizes the bitsets of layer_id's blocks in the view of the pending (indexed) blocks
+        These are combined from the blocks' exits, and never need invalidation
+        as indexed blocks only point to previously indexed blocks
+        :param pending:
+        :param layer_id:
+        :return:
+        """
+        reachable = self.deep_views[layer_id]
+        while pending:
+            block = pending[-1]
+            if block in reachable or block.layerId - layer_id <= self.horizon + 1:
+                pending.pop()
+                continue
+
+            window, skips = self.windows[block], self.skips[block]
+            missing = [exit_block for exit_block in self._exit_blocks(block, window, skips, layer_id)
+                       if exit_block.layerId - layer_id > self.horizon + 1 and exit_block not in reachable]
+            if missing:
+                pending.extend(missing)
+                continue
+
+            pending.pop()
+            reachable[block] = self._combine_exits(block, window, skips, layer_id)
+
+    def _combine_exits(self, block, window, skips, layer_id):
+        reachable = self.deep_views[layer_id]
+        bits = 0
+        for skip_layer_id, (skip_bits, source_layer) in skips.items():
+            if skip_layer_id == layer_id and source_layer >= block.layerId - self.horizon:
+                bits |= skip_bits
+
+        for exit_block in self._exit_blocks(block, window, skips, layer_id):
+            if exit_block.layerId - layer_id > self.horizon + 1:
+                bits |= reachable[exit_block]
+            else:
+                bits |= self.windows[exit_block].get(layer_id, 0)
+
+        return bits
+
+    def _exit_blocks(self, block, window, skips, layer_id):
+        """
+        Yields the blocks through which the view of the block continues below its window (down to layer_id)
+        :param block:
+        :param window:
+        :param skips:
+        :param layer_id:
+        :return:
+        """
+        window_bottom = block.layerId - self.horizon - 1
+        exits = {window_bottom: window.get(window_bottom, 0)}
+        for skip_layer_id, (bits, source_layer) in skips.items():
+            if layer_id < skip_layer_id < window_bottom and source_layer >= block.layerId - self.horizon:
+                self._merge_bits(exits, skip_layer_id, bits)
+
+        for exit_layer_id, bits in exits.items():
+            layer_blocks = self.layer_blocks.get(exit_layer_id, [])
+            while bits:
+                lowest_bit = bits & -bits
+                bits ^= lowest_bit
+                yield layer_blocks[lowest_bit.bit_length() - 1]
+
+    @staticmethod
+    def _merge_bits(bitsets, layer_id, bits):
+        bitsets[layer_id] = bitsets.get(layer_id, 0) | bits
+
+    @staticmethod
+    def _merge_skip(skips, layer_id, bits, source_layer):
+        if layer_id in skips:
+            entry = skips[layer_id]
+            entry[0] |= bits
+            entry[1] = max(entry[1], source_layer)
+        else:
+            skips[layer_id] = [bits, source_layer]
@@ -0,0 +1,42 @@
+import struct
+from array import array
+from bisect import bisect_left
+
+# Archived transactions are kept by the first 8 bytes of their ids
+TX_ID_PREFIX = struct.Struct('>Q')
+
+
+class TxIdArchive:
+    """
+    A compact set of the ids of transactions confirmed in compacted layers
+    Ids are kept as 64-bit prefixes (8 bytes per transaction, a false match is as likely as a 64-bit hash collision)
+    in sorted runs: a new run is merged with the runs before it while they're no larger than it
+    so every prefix is merged O(log n) times and a lookup is a binary search in each of the O(log n) runs
+    """
+
+    def __init__(self):
+        # Sorted arrays of prefixes, from the largest (oldest) to the smallest
+        self.runs = []
+
+    def add_tx_ids(self, tx_ids):
+        prefixes = sorted(set(TX_ID_PREFIX.unpack_from(tx_id)[0] for tx_id in tx_ids))
+        if not prefixes:
+            return
+
+        run = array('Q', prefixes)
+        while self.runs and len(self.runs[-1]) <= len(run):
+            run = array('Q', sorted(set(self.runs.pop()) | set(run)))
+
+        self.runs.append(run)
+
+    def contains(self, tx_id):
+        prefix = TX_ID_PREFIX.unpack_from(tx_id)[0]
+        for run in self.runs:
+            index = bisect_left(run, prefix)
+            if index < len(run) and run[index] == prefix:
+                return True
+
+        return False
+
+    def __len__(self):
+        return sum(len(run) for run in self.runs)
@@ -1,8 +1,5 @@
 class HareProtocol:
     def __init__(self):
-        # Mapping of recent blocks to their margins (sum of votes for and against)
-        self.recentBlocksOpinions = {}
-
         # The layer in which consensus interval starts (difference from the current layer)
         self.consensusIntervalStart = 2
 
@@ -0,0 +1,72 @@
+class LayerTally:
+    """
+    Running majority votes about the blocks of a single layer in the consensus interval
+    Every voter votes for the blocks in its view and against the rest, so instead of updating all margins on every vote
+    each block keeps a score (twice its votes for, plus the number of voters before it became a candidate)
+    and its margin is its score minus the number of voters
+    Blocks are bucketed by score so only the blocks whose margin crosses zero are visited when a voter is added
+    """
+
+    def __init__(self, layer_id):
+        self.layerId = layer_id
+
+        # Number of blocks that voted about this layer's blocks
+        self.voters = 0
+
+        # Mapping of candidate blocks to their scores
+        self.scores = {}
+
+        # Mapping of a score to the candidate blocks with it
+        self.buckets = {}
+
+        # Candidate blocks with a positive margin
+        self.valid_blocks = set()
+
+    def add_candidate(self, block):
+        """
+        Adds a block to vote about, with a margin of 0
+        :param block:
+        :return:
+        """
+        if block in self.scores:
+            return
+
+        self.scores[block] = self.voters
+        self.buckets.setdefault(self.voters, set()).add(block)
+
+    def add_voter(self):
+        """
+        Counts a vote against all candidates (votes for the blocks in the voter's view are then added by vote_for)
+        :return:
+        """
+        self.voters += 1
+
+        # Blocks with a margin of 1 drop to 0
+        for block in self.buckets.get(self.voters, ()):
+            self.valid_blocks.discard(block)
+
+    def vote_for(self, block):
+        """
+        Turns the last voter's vote about the block into a vote for it
+        :param block:
+        :return:
+        """
+        score = self.scores[block]
+        bucket = self.buckets[score]
+        bucket.discard(block)
+        if not bucket:
+            del self.buckets[score]
+
+        score += 2
+        self.scores[block] = score
+        self.buckets.setdefault(score, set()).add(block)
+        if score > self.voters:
+            self.valid_blocks.add(block)
+
+    def get_margin(self, block):
+        """
+        Returns the sum of votes for and against the block
+        :param block:
+        :return:
+        """
+        return self.scores[block] - self.voters
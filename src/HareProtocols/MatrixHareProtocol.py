@@ -0,0 +1,234 @@
+import numpy as np
+
+from HareProtocols.HareProtocol import HareProtocol
+
+
+class MatrixHareProtocol(HareProtocol):
+    """
+    A majority vote hare protocol (same opinions as TrivialHareProtocol) keeping the votes as a dense int8 matrix
+    Rows are voters and columns are the candidate blocks of the consensus interval (+1 for a vote for, -1 against
+    and 0 for no vote, as a block only votes about the layers preceding its own)
+    Margins are column sums, so opinions are rebuilt by array operations instead of per block has_in_view queries
+    Requires NumPy
+    """
+
+    def __init__(self):
+        HareProtocol.__init__(self)
+
+        # The layer in which consensus interval starts (difference from the current layer)
+        self.consensusIntervalStart = 2
+
+        # The layer in which consensus interval ends (difference from the current layer)
+        self.consensusIntervalEnd = 1
+
+        # The mesh the opinions are about, used to add the blocks of layers entering the consensus interval
+        self.mesh = None
+
+        # The mesh's reachability index, used to find the candidates in a voter's view
+        self.reachability = None
+
+        # The candidate blocks (matrix columns), their layer ids and the first voter (row) counted for them
+        self.candidates = []
+        self.candidateLayers = np.zeros(0, dtype=np.int64)
+        self.candidateFirstVoters = np.zeros(0, dtype=np.int64)
+
+        # The candidates' positions in the reachability index (-1 for candidates that weren't indexed yet)
+        self.candidatePositions = np.zeros(0, dtype=np.int64)
+
+        # Mapping of candidate blocks to their column
+        self.columns = {}
+
+        # The vote matrix, allocated with spare rows (only the first voterCount rows are used)
+        self.votes = np.zeros((0, 0), dtype=np.int8)
+        self.voterCount = 0
+
+        # Column sums of the vote matrix
+        self.margins = np.zeros(0, dtype=np.int64)
+
+    def get_valid_blocks(self, new_block):
+        """
+        Adds new_block's votes as a row of the matrix and returns the candidates with a positive margin
+        :param new_block:
+        :return:
+        """
+        row = self.get_votes(new_block)
+        self.add_voters(row[np.newaxis, :])
+
+        if new_block.layerId in self.get_layer_ids():
+            # A late block of a layer in the consensus interval
+            self.add_candidates([new_block])
+
+        # Return a majority vote over recent blocks
+        return [self.candidates[column] for column in np.flatnonzero(self.margins > 0)]
+
+    def get_votes(self, block):
+        """
+        Returns the votes of the block about the candidates (a row of the matrix)
+        :param block:
+        :return:
+        """
+        row = np.zeros(len(self.candidates), dtype=np.int8)
+        for layer_id in self.get_layer_ids():
+            if layer_id < block.layerId:
+                layer_columns = np.flatnonzero(self.candidateLayers == layer_id)
+                in_view = self.get_in_view([block], layer_id, layer_columns)
+                row[layer_columns] = np.where(in_view[0], 1, -1)
+
+        return row
+
+    def get_in_view(self, blocks, layer_id, layer_columns):
+        """
+        Returns a boolean matrix of whether each of a layer's candidates (columns) is in each block's view (rows)
+        The blocks' reachability bitsets are unpacked together into a matrix of the layer's positions
+        :param blocks:
+        :param layer_id:
+        :param layer_columns: the matrix columns of the layer's candidates
+        :return:
+        """
+        if self.reachability is None:
+            return np.array([[block.has_in_view(self.candidates[column]) for column in layer_columns]
+                             for block in blocks], dtype=bool).reshape(len(blocks), len(layer_columns))
+
+        for column in layer_columns[self.candidatePositions[layer_columns] < 0]:
+            self.candidatePositions[column] = self.reachability.positions.get(self.candidates[column], -1)
+
+        # Candidates missing from the index get the extra position, which is never set
+        layer_size = len(self.reachability.layer_blocks.get(layer_id, []))
+        positions = self.candidatePositions[layer_columns]
+        positions = np.where(positions < 0, layer_size, positions)
+
+        row_size = layer_size // 8 + 1
+        bitsets = b''.join([self.reachability.reachable_in_layer(block, layer_id).to_bytes(row_size, 'little')
+                            for block in blocks])
+        bit_matrix = np.unpackbits(np.frombuffer(bitsets, dtype=np.uint8).reshape(len(blocks), row_size),
+                                   axis=1, bitorder='little')
+        return bit_matrix[:, positions].astype(bool)
+
+    def add_voters(self, rows):
+        """
+        Appends rows of votes to the matrix
+        :param rows:
+        :return:
+        """
+        required_rows = self.voterCount + len(rows)
+        if required_rows > self.votes.shape[0]:
+            votes = np.zeros((max(required_rows, 2 * self.votes.shape[0]), len(self.candidates)), dtype=np.int8)
+            votes[:self.voterCount] = self.votes[:self.voterCount]
+            self.votes = votes
+
+        self.votes[self.voterCount:required_rows] = rows
+        self.voterCount = required_rows
+        self.margins += rows.sum(axis=0, dtype=np.int64)
+
+    def add_candidates(self, blocks):
+        """
+        Adds columns for new candidates, with no votes (a margin of 0)
+        :param blocks:
+        :return:
+        """
+        blocks = [block for block in blocks if block not in self.columns]
+        if not blocks:
+            return
+
+        for block in blocks:
+            self.columns[block] = len(self.candidates)
+            self.candidates.append(block)
+
+        self.candidateLayers = np.append(self.candidateLayers, [block.layerId for block in blocks])
+        self.candidateFirstVoters = np.append(self.candidateFirstVoters, [self.voterCount] * len(blocks))
+        self.candidatePositions = np.append(self.candidatePositions, [-1] * len(blocks))
+        self.votes = np.hstack([self.votes, np.zeros((self.votes.shape[0], len(blocks)), dtype=np.int8)])
+        self.margins = np.append(self.margins, np.zeros(len(blocks), dtype=np.int64))
+
+    def get_layer_ids(self):
+        return np.unique(self.candidateLayers).tolist()
+
+    def get_margin(self, block):
+        """
+        Returns the sum of votes for and against a recent block
+        :param block:
+        :return:
+        """
+        return int(self.margins[self.columns[block]])
+
+    def set_block_opinions(self, mesh, current_layer):
+        """
+        Rebuilds the vote matrix from the mesh
+        Every block in a later layer votes about the interval's earlier layers
+        :param mesh:
+        :param current_layer:
+        :return:
+        """
+        self.mesh = mesh
+        self.reachability = mesh.reachability
+        self.candidates = []
+        self.candidateLayers = np.zeros(0, dtype=np.int64)
+        self.candidateFirstVoters = np.zeros(0, dtype=np.int64)
+        self.candidatePositions = np.zeros(0, dtype=np.int64)
+        self.columns = {}
+        self.votes = np.zeros((0, 0), dtype=np.int8)
+        self.voterCount = 0
+        self.margins = np.zeros(0, dtype=np.int64)
+
+        first_layer_id = max(current_layer - self.consensusIntervalStart, 0)
+        last_layer_id = min(current_layer - self.consensusIntervalEnd, len(mesh.layers) - 1)
+        for layer_id in range(first_layer_id, last_layer_id + 1):
+            self.add_candidates(mesh.layers[layer_id].blocks)
+
+        voters = [block for layer in mesh.layers[first_layer_id + 1:] for block in layer.blocks]
+        voter_layers = np.array([voter.layerId for voter in voters], dtype=np.int64)
+        rows = np.zeros((len(voters), len(self.candidates)), dtype=np.int8)
+        for layer_id in range(first_layer_id, last_layer_id + 1):
+            # Blocks of the same layer don't vote about it
+            layer_voters = np.flatnonzero(voter_layers > layer_id)
+            layer_columns = np.flatnonzero(self.candidateLayers == layer_id)
+            in_view = self.get_in_view([voters[row] for row in layer_voters], layer_id, layer_columns)
+            rows[np.ix_(layer_voters, layer_columns)] = np.where(in_view, 1, -1)
+
+        self.add_voters(rows)
+
+    def remove_oldest_layer_from_opinions(self, current_layer):
+        """
+        Remove blocks from the oldest consensus interval layer
+        This will be called upon layer incrementation in which the last consensus interval layer
+        transition from the hare protocol to the tortoise
+        The consensus interval is kept at [current_layer - consensusIntervalStart, current_layer - consensusIntervalEnd]
+        so the layer that just closed is added instead
+        :param current_layer:
+        :return:
+        """
+        keep = self.candidateLayers != current_layer - self.consensusIntervalStart - 1
+        if not keep.all():
+            self.candidates = [block for block, kept in zip(self.candidates, keep) if kept]
+            self.columns = dict((block, column) for column, block in enumerate(self.candidates))
+            self.candidateLayers = self.candidateLayers[keep]
+            self.candidateFirstVoters = self.candidateFirstVoters[keep]
+            self.candidatePositions = self.candidatePositions[keep]
+            self.margins = self.margins[keep]
+
+            # Voters preceding all remaining candidates have no votes left in the matrix
+            first_voter = int(self.candidateFirstVoters.min()) if len(self.candidates) else self.voterCount
+            self.votes = self.votes[first_voter:, keep]
+            self.voterCount -= first_voter
+            self.candidateFirstVoters -= first_voter
+
+        layer_id = current_layer - self.consensusIntervalEnd
+        if self.mesh is not None and layer_id < len(self.mesh.layers) and layer_id not in self.get_layer_ids():
+            self.add_candidates(self.mesh.layers[layer_id].blocks)
+            self.add_existing_voters(layer_id)
+
+    def add_existing_voters(self, layer_id):
+        """
+        Adds the votes about a layer entering the consensus interval of the blocks of later layers already in the mesh
+        (as if they arrived after it entered), as rows voting about its candidates only
+        :param layer_id:
+        :return:
+        """
+        voters = [block for layer in self.mesh.layers[layer_id + 1:] for block in layer.blocks]
+        if not voters:
+            return
+
+        layer_columns = np.flatnonzero(self.candidateLayers == layer_id)
+        rows = np.zeros((len(voters), len(self.candidates)), dtype=np.int8)
+        rows[:, layer_columns] = np.where(self.get_in_view(voters, layer_id, layer_columns), 1, -1)
+        self.add_voters(rows)
@@ -1,11 +1,12 @@
+from itertools import chain
+
 from HareProtocols.HareProtocol import HareProtocol
+from HareProtocols.LayerTally import LayerTally
 
 
 class TrivialHareProtocol(HareProtocol):
     def __init__(self):
-        # Mapping of recent blocks to their margins (sum of votes for and against)
         HareProtocol.__init__(self)
-        self.recentBlocksOpinions = {}
 
         # The layer in which consensus interval starts (difference from the current layer)
         self.consensusIntervalStart = 2
@@ -13,32 +14,151 @@ class TrivialHareProtocol(HareProtocol):
         # The layer in which consensus interval ends (difference from the current layer)
         self.consensusIntervalEnd = 1
 
+        # Mapping of the consensus interval's layer ids to the votes about their blocks
+        # This replaces the mapping of recent blocks to their margins, which had to be updated entirely on every vote
+        self.layerTallies = {}
+
+        # The mesh the opinions are about, used to add the blocks of layers entering the consensus interval
+        self.mesh = None
+
+        # The mesh's reachability index, used to answer whether a new block has a recent block in its view
+        self.reachability = None
+
     def get_valid_blocks(self, new_block):
         """
         Update opinions about recent blocks
+        A block votes about the layers preceding its own, whether it arrived before or after they entered
+        the consensus interval (see add_layer), so a rebuilt view has the same opinions as one that was kept up to date
+        Only the votes for blocks in new_block's view are updated (the votes against are counted per layer)
         :param new_block:
         :return:
         """
-        for block in self.recentBlocksOpinions.keys():
-            if new_block.has_in_view(block):
-                self.recentBlocksOpinions[block] += 1
-            else:
-                self.recentBlocksOpinions[block] -= 1
+        for layer_id, tally in self.layerTallies.items():
+            if layer_id < new_block.layerId:
+                tally.add_voter()
+
+        for block in self.get_pointed_recent_blocks(new_block):
+            self.layerTallies[block.layerId].vote_for(block)
+
+        if new_block.layerId in self.layerTallies:
+            # A late block of a layer in the consensus interval
+            self.layerTallies[new_block.layerId].add_candidate(new_block)
 
         # Return a majority vote over recent blocks
-        return [k for k, v in self.recentBlocksOpinions.iteritems() if v > 0]
+        return list(chain.from_iterable(tally.valid_blocks for tally in self.layerTallies.values()))
+
+    def get_pointed_recent_blocks(self, block):
+        """
+        Returns the recent blocks (candidates of the consensus interval) in the view of the block
+        :param block:
+        :return:
+        """
+        pointed_blocks = []
+        if self.reachability is not None:
+            for layer_id, tally in self.layerTallies.items():
+                if layer_id < block.layerId:
+                    pointed_blocks.extend(self.get_pointed_layer_blocks(block, tally))
+
+            return pointed_blocks
+
+        # Without an index, walk the block's edges down to the oldest layer of the consensus interval
+        oldest_layer_id = min(self.layerTallies) if self.layerTallies else block.layerId
+        visited = set()
+        pending = [block]
+        while pending:
+            current_block = pending.pop()
+            for pointed_block in chain(current_block.viewHeads, current_block.validRecentBlocks):
+                if pointed_block.layerId < oldest_layer_id or pointed_block in visited:
+                    continue
+
+                visited.add(pointed_block)
+                pending.append(pointed_block)
+                tally = self.layerTallies.get(pointed_block.layerId)
+                if tally is not None and pointed_block in tally.scores:
+                    pointed_blocks.append(pointed_block)
+
+        return pointed_blocks
+
+    def get_pointed_layer_blocks(self, block, tally):
+        """
+        Returns the candidates of a single layer in the view of the block
+        :param block:
+        :param tally: the layer's tally
+        :return:
+        """
+        if self.reachability is None:
+            return [pointed_block for pointed_block in self.get_pointed_recent_blocks(block)
+                    if pointed_block.layerId == tally.layerId]
+
+        pointed_blocks = []
+        layer_blocks = self.reachability.layer_blocks.get(tally.layerId, [])
+        bits = self.reachability.reachable_in_layer(block, tally.layerId)
+        while bits:
+            lowest_bit = bits & -bits
+            bits ^= lowest_bit
+            pointed_block = layer_blocks[lowest_bit.bit_length() - 1]
+            if pointed_block in tally.scores:
+                pointed_blocks.append(pointed_block)
+
+        return pointed_blocks
+
+    def get_margin(self, block):
+        """
+        Returns the sum of votes for and against a recent block
+        :param block:
+        :return:
+        """
+        return self.layerTallies[block.layerId].get_margin(block)
 
     def set_block_opinions(self, mesh, current_layer):
-        pass
+        """
+        Builds the opinions about the consensus interval's blocks from the mesh
+        Every block in a later layer votes about the interval's earlier layers (see add_layer)
+        :param mesh:
+        :param current_layer:
+        :return:
+        """
+        self.mesh = mesh
+        self.reachability = mesh.reachability
+        self.layerTallies = {}
+
+        first_layer_id = max(current_layer - self.consensusIntervalStart, 0)
+        for layer_id in range(first_layer_id, min(current_layer - self.consensusIntervalEnd + 1, len(mesh.layers))):
+            self.add_layer(layer_id)
+
+    def add_layer(self, layer_id):
+        """
+        Starts voting about the blocks of a layer entering the consensus interval
+        The blocks of later layers which are already in the mesh vote about it, as if they arrived after it entered
+        :param layer_id:
+        :return:
+        """
+        if layer_id in self.layerTallies:
+            return
+
+        tally = LayerTally(layer_id)
+        self.layerTallies[layer_id] = tally
+        if self.mesh is None or layer_id >= len(self.mesh.layers):
+            return
+
+        for block in self.mesh.layers[layer_id].blocks:
+            tally.add_candidate(block)
+
+        for layer in self.mesh.layers[layer_id + 1:]:
+            for block in layer.blocks:
+                tally.add_voter()
+                for pointed_block in self.get_pointed_layer_blocks(block, tally):
+                    tally.vote_for(pointed_block)
 
     def remove_oldest_layer_from_opinions(self, current_layer):
         """
         Remove blocks from the oldest consensus interval layer
         This will be called upon layer incrementation in which the last consensus interval layer
         transition from the hare protocol to the tortoise
+        The consensus interval is kept at [current_layer - consensusIntervalStart, current_layer - consensusIntervalEnd]
+        so the layer that just closed is added instead
         :param current_layer:
         :return:
         """
-        for block in self.recentBlocksOpinions.keys():
-            if block.layerId == current_layer - self.consensusIntervalStart:
-                del self.recentBlocksOpinions[block]
+        self.layerTallies.pop(current_layer - self.consensusIntervalStart - 1, None)
+        self.add_layer(current_layer - self.consensusIntervalEnd)
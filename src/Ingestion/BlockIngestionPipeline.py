@@ -0,0 +1,124 @@
+import threading
+import time
+
+try:
+    from queue import Queue, Empty, Full
+except ImportError:
+    from Queue import Queue, Empty, Full
+
+
+class BlockIngestionPipeline:
+    """
+    Delivers arriving blocks to the subscribers from a single thread, through a bounded queue
+    Blocks that arrive together are delivered as a single batch
+    When the queue is full, submitting blocks waits (backpressure on the network side) instead of growing without bound
+    """
+
+    def __init__(self, max_pending_blocks=1000, max_batch_size=256):
+        # Arriving blocks waiting to be delivered, along with their arrival time
+        self.pending_blocks = Queue(maxsize=max_pending_blocks)
+
+        # Maximal number of blocks delivered in a single batch
+        self.max_batch_size = max_batch_size
+
+        # Functions called with every batch of arriving blocks
+        self.subscribers = []
+
+        # The delivering thread, started with the first subscriber
+        self.thread = None
+
+        # Seconds the oldest block of the last delivered batch waited in the queue
+        self.last_batch_latency = None
+
+    def register(self, callback_func, start_thread=True):
+        """
+        Adds callback_func to the subscribers list
+         so that it'll be called back with every batch (list) of new arriving blocks
+        :param callback_func:
+        :param start_thread: if False, blocks are only delivered by deliver_pending_blocks (e.g. in a simulation
+         running on a single thread)
+        :return:
+        """
+        self.subscribers.append(callback_func)
+        if start_thread and self.thread is None:
+            self.thread = threading.Thread(target=self.deliver_blocks)
+            self.thread.daemon = True
+            self.thread.start()
+
+    def submit_block(self, block, timeout=None):
+        """
+        Queues an arriving block, waiting up to timeout seconds (forever if None) while the queue is full
+        Returns False if the block wasn't queued
+        :param block:
+        :param timeout:
+        :return:
+        """
+        try:
+            self.pending_blocks.put((time.time(), block), timeout=timeout)
+        except Full:
+            return False
+
+        return True
+
+    def stop(self):
+        """
+        Stops the delivering thread once the already queued blocks are delivered
+        :return:
+        """
+        if self.thread is not None:
+            self.pending_blocks.put((time.time(), None))
+            self.thread.join()
+            self.thread = None
+
+    def deliver_blocks(self):
+        """
+        The main loop of the delivering thread
+        Waits for a block to arrive, then takes along the rest of the queued blocks (up to the maximal batch size)
+        :return:
+        """
+        while True:
+            arrival_ts, block = self.pending_blocks.get()
+            if block is None or not self.deliver_batch(arrival_ts, block):
+                return
+
+    def deliver_pending_blocks(self):
+        """
+        Delivers the queued blocks on the calling thread, in batches
+        :return:
+        """
+        while True:
+            try:
+                arrival_ts, block = self.pending_blocks.get_nowait()
+            except Empty:
+                return
+
+            if block is None or not self.deliver_batch(arrival_ts, block):
+                return
+
+    def deliver_batch(self, arrival_ts, block):
+        """
+        Delivers a block along with the rest of the queued blocks (up to the maximal batch size)
+        Returns False if the pipeline was stopped
+        :param arrival_ts:
+        :param block:
+        :return:
+        """
+        batch = [block]
+        stop = False
+        while len(batch) < self.max_batch_size:
+            try:
+                next_arrival_ts, next_block = self.pending_blocks.get_nowait()
+            except Empty:
+                break
+
+            if next_block is None:
+                stop = True
+                break
+
+            batch.append(next_block)
+
+        self.last_batch_latency = time.time() - arrival_ts
+        for callback_func in self.subscribers:
+            callback_func(batch)
+
+        return not stop
@@ -0,0 +1,49 @@
+import math
+import struct
+
+# Item ids are hashes (e.g. SHA-256 digests), their first 16 bytes seed the filter's hash functions
+ID_HALVES = struct.Struct('>QQ')
+
+
+class BloomFilter:
+    """
+    A Bloom filter over ids which are already uniformly distributed hashes (block and transaction ids)
+    The k bit positions of an id are derived from its first 16 bytes by double hashing, so nothing is rehashed
+    Sized for a capacity and a false positive rate, adding more items only raises the false positive rate
+    """
+
+    def __init__(self, capacity, false_positive_rate=0.001):
+        # Number of bits and of bit positions per item, optimal for the capacity and the false positive rate
+        self.bits_count = max(int(math.ceil(-capacity * math.log(false_positive_rate) / math.log(2) ** 2)), 8)
+        self.hashes_count = max(int(round(self.bits_count / float(capacity) * math.log(2))), 1)
+
+        self.bits = bytearray((self.bits_count + 7) // 8)
+
+        # Number of items added
+        self.count = 0
+
+    def get_positions(self, item_id):
+        first_hash, second_hash = ID_HALVES.unpack_from(item_id)
+        second_hash |= 1
+        return [(first_hash + i * second_hash) % self.bits_count for i in range(self.hashes_count)]
+
+    def add(self, item_id):
+        for position in self.get_positions(item_id):
+            self.bits[position >> 3] |= 1 << (position & 7)
+
+        self.count += 1
+
+    def __contains__(self, item_id):
+        bits = self.bits
+        for position in self.get_positions(item_id):
+            if not bits[position >> 3] & (1 << (position & 7)):
+                return False
+
+        return True
+
+    def get_size(self):
+        """
+        Returns the size of the filter's bits in bytes
+        :return:
+        """
+        return len(self.bits)
@@ -0,0 +1,92 @@
+from collections import deque
+
+from Ingestion.BloomFilter import BloomFilter
+
+
+class DuplicateFilter:
+    """
+    A front door dropping items (blocks or transactions) that were already handled, before any work is done on them
+    Recently seen ids are kept in a rotating series of Bloom filters, one per window of layers_per_generation layers,
+    so memory is bounded and old ids age out with their generation
+    An id missing from the filters was not seen within the window, so the item is new
+    A positive is confirmed by the exact index (e.g. the mesh or the mempool) before the item is dropped,
+    so an item is never dropped because of a false positive, it's only checked against the exact index
+    """
+
+    def __init__(self, is_known, capacity_per_generation=100000, false_positive_rate=0.001, generations=4,
+                 layers_per_generation=16):
+        # A function returning True for ids of items that were handled (the exact index)
+        self.is_known = is_known
+
+        # Capacity and false positive rate of every generation's filter
+        self.capacity_per_generation = capacity_per_generation
+        self.false_positive_rate = false_positive_rate
+
+        # The filters of the last generations (the newest last), ids are added to the newest
+        self.filters = deque([BloomFilter(capacity_per_generation, false_positive_rate)], maxlen=generations)
+
+        # Number of layers each generation covers and the first layer of the newest generation
+        self.layers_per_generation = layers_per_generation
+        self.generation_layer = 0
+
+        # Number of ids checked, of positives of the filters and of positives which the exact index didn't confirm
+        self.checked_count = 0
+        self.positive_count = 0
+        self.false_positive_count = 0
+
+    def is_duplicate(self, item_id):
+        """
+        Returns True if the item was already handled, otherwise adds it to the newest filter
+        :param item_id:
+        :return:
+        """
+        self.checked_count += 1
+        filters = self.filters
+        for bloom_filter in reversed(filters):
+            if item_id in bloom_filter:
+                self.positive_count += 1
+                if self.is_known(item_id):
+                    return True
+
+                # Seen but not handled (e.g. rejected or still in flight), or a false positive
+                self.false_positive_count += 1
+                break
+
+        filters[-1].add(item_id)
+        return False
+
+    def add(self, item_id):
+        """
+        Adds an item that was handled without passing through the filter (e.g. loaded from a store)
+        :param item_id:
+        :return:
+        """
+        self.filters[-1].add(item_id)
+
+    def rotate(self, layer_id):
+        """
+        Starts a new generation (dropping the oldest one) once the newest generation covers layers_per_generation layers
+        :param layer_id: the current layer
+        :return:
+        """
+        if layer_id - self.generation_layer >= self.layers_per_generation:
+            # The filters are replaced rather than changed, as another thread may be checking ids against them
+            filters = deque(self.filters, maxlen=self.filters.maxlen)
+            filters.append(BloomFilter(self.capacity_per_generation, self.false_positive_rate))
+            self.filters = filters
+            self.generation_layer = layer_id
+
+    def get_false_positive_rate(self):
+        """
+        Returns the share of the checked ids that the filters reported but the exact index didn't confirm
+        (None before any id was checked)
+        :return:
+        """
+        return self.false_positive_count / float(self.checked_count) if self.checked_count else None
+
+    def get_size(self):
+        """
+        Returns the size of the filters in bytes
+        :return:
+        """
+        return sum(bloom_filter.get_size() for bloom_filter in self.filters)
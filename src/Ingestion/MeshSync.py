@@ -0,0 +1,217 @@
+import struct
+from multiprocessing import Pool, cpu_count
+
+from DataSturcutres.Block import Block
+from DataSturcutres.BlockView import BlockView
+
+# The proofs-of-work protocol of a validation worker (set once, when the worker starts)
+worker_pow_protocol = None
+
+
+def init_check_worker(pow_protocol):
+    global worker_pow_protocol
+    worker_pow_protocol = pow_protocol
+
+
+def decode_block(data):
+    """
+    Returns a view over an encoded block, None if the encoding is malformed or isn't the block's canonical encoding
+    (another encoding of a block would give it an id Block.serialize never produces)
+    :param data:
+    :return:
+    """
+    try:
+        view = BlockView(data)
+
+        # Pointed blocks are only encoded by their ids
+        pointed_blocks = {}
+        for block_id in view.get_view_head_ids() + view.get_valid_recent_block_ids():
+            pointed_block = Block()
+            pointed_block.blockId = block_id.tobytes()
+            pointed_blocks[pointed_block.blockId] = pointed_block
+
+        if Block.deserialize(data, pointed_blocks).serialize() != bytes(data):
+            return None
+    except (struct.error, IndexError):
+        return None
+
+    return view
+
+
+def check_blocks(datas, pow_protocol=None):
+    """
+    Returns, for each of the encoded blocks, its id, layer id, whether its proofs-of-work is valid (for its content),
+    the difficulty of its proofs-of-work and the ids of its view heads and of its valid recent blocks
+    or None if the block is invalid regardless of the rest of the mesh (see decode_block)
+    (runs on the validation workers)
+    These depend on the block alone, the rest of its validation is left to the mesh's process
+    :param datas:
+    :param pow_protocol: the protocol verifying the proofs (the worker's own if None)
+    :return:
+    """
+    pow_protocol = pow_protocol or worker_pow_protocol
+    views = [decode_block(data) for data in datas]
+    decoded_views = [view for view in views if view is not None]
+    proofs = [view.get_pow().tobytes() for view in decoded_views]
+    pow_results = iter(zip(proofs, pow_protocol.verify_pows(proofs, decoded_views)))
+
+    results = []
+    for view in views:
+        if view is None:
+            results.append(None)
+            continue
+
+        proof, pow_valid = next(pow_results)
+        results.append((view.generate_block_id(), view.layer_id, pow_valid, pow_protocol.get_proof_difficulty(proof),
+                        [block_id.tobytes() for block_id in view.get_view_head_ids()],
+                        [block_id.tobytes() for block_id in view.get_valid_recent_block_ids()]))
+
+    return results
+
+
+def get_mesh_layers(mesh, first_layer_id=1):
+    """
+    Yields the (layer id, encoded blocks) of a mesh's layers from first_layer_id on
+    A stand-in for a peer serving its history
+    :param mesh:
+    :param first_layer_id:
+    :return:
+    """
+    for layer in mesh.layers[first_layer_id:]:
+        yield layer.id, [block.serialize() for block in layer.blocks]
+
+
+class MeshSync:
+    """
+    Catches a mesh up with a history of layers in bulk (e.g. a joining miner's mesh, before it starts mining)
+    A block's id and proofs-of-work depend on the block alone, so they're checked for many layers at once
+    by a pool of worker processes; the rest of syntactic validation (pointing tmin valid blocks of the previous layer)
+    is a lookup of the previous layers' verdicts, done in layer order as the workers' results arrive
+    Valid blocks are added to the mesh (indexing them) in a single pass and their verdicts are kept in its validity table,
+    the verdicts agree with validating the blocks one by one as they arrive
+    """
+
+    def __init__(self, mesh, pow_protocol, workers_count=None, batch_size=4096):
+        # The synced mesh
+        self.mesh = mesh
+
+        # The protocol verifying the blocks' proofs-of-work, a copy of it lives in each worker
+        self.pow_protocol = pow_protocol
+
+        # Number of validation processes (one per core by default, 0 checks on the syncing process)
+        self.workers_count = cpu_count() if workers_count is None else workers_count
+
+        # Number of blocks checked together (split evenly across the workers)
+        self.batch_size = batch_size
+
+        # Number of blocks added to the mesh and number of rejected blocks
+        # (invalid ones and ones pointing blocks that aren't in the mesh)
+        self.added_count = 0
+        self.rejected_count = 0
+
+    def sync(self, layers):
+        """
+        Adds the valid blocks of a history of layers to the mesh
+        Layers must be given in order, layers which are already in the mesh are skipped block by block
+        (compacted layers are skipped entirely)
+        :param layers: an iterable of (layer id, list of encoded blocks), e.g. get_mesh_layers of a peer's mesh
+         or MeshStore.get_layers of a copied store
+        :return:
+        """
+        pool = Pool(self.workers_count, initializer=init_check_worker,
+                    initargs=(self.pow_protocol,)) if self.workers_count > 0 else None
+        try:
+            for batch in self.get_batches(layers):
+                for data, result in zip(batch, self.check_batch(pool, batch)):
+                    if result is None:
+                        # A malformed or non-canonical encoding, which has no layer to record its verdict in
+                        self.rejected_count += 1
+                        continue
+
+                    self.add_checked_block(data, *result)
+        finally:
+            if pool is not None:
+                pool.close()
+                pool.join()
+
+    def get_batches(self, layers):
+        """
+        Yields batches of (at least batch_size, unless it's the last one) encoded blocks, in layer order
+        :param layers:
+        :return:
+        """
+        batch = []
+        for layer_id, datas in layers:
+            batch.extend(datas)
+            if len(batch) >= self.batch_size:
+                yield batch
+                batch = []
+
+        if batch:
+            yield batch
+
+    def check_batch(self, pool, batch):
+        if pool is None:
+            return check_blocks(batch, self.pow_protocol)
+
+        chunk_size = -(-len(batch) // self.workers_count)
+        results = []
+        for chunk_results in pool.map(check_blocks, [batch[i:i + chunk_size]
+                                                     for i in range(0, len(batch), chunk_size)]):
+            results.extend(chunk_results)
+
+        return results
+
+    def add_checked_block(self, data, block_id, layer_id, pow_valid, pow_difficulty, view_head_ids,
+                          valid_recent_block_ids):
+        """
+        Decides the validity of a block whose proofs-of-work was checked and adds it to the mesh if it's valid
+        The verdicts of its previous layer's blocks are already known, as blocks come in layer order
+        :param data:
+        :param block_id:
+        :param layer_id:
+        :param pow_valid:
+        :param pow_difficulty: the difficulty the proofs-of-work claims (None if the protocol's proofs don't tell)
+        :param view_head_ids:
+        :param valid_recent_block_ids:
+        :return:
+        """
+        if block_id in self.mesh.blocks or layer_id < self.mesh.compacted_layer_count:
+            # The block is already in the mesh, or its layer is compacted (e.g. loaded from the store as a summary)
+            # and can no longer change
+            return
+
+        # The layer's difficulty depends on the earlier layers, so it's only known once they were added
+        layer_difficulty = self.pow_protocol.get_layer_difficulty(self.mesh, layer_id)
+        if layer_difficulty is not None and (pow_difficulty is None or pow_difficulty < layer_difficulty):
+            pow_valid = False
+
+        blocks = self.mesh.blocks
+        if not pow_valid or any(pointed_block_id not in blocks
+                                for pointed_block_id in view_head_ids + valid_recent_block_ids):
+            # A block pointing a rejected block can't be decoded (and isn't delivered to live miners either)
+            self.mesh.add_invalid_block(block_id, layer_id)
+            self.rejected_count += 1
+            return
+
+        # Only valid blocks are added to the mesh, blocks which were already in it (e.g. loaded from its store)
+        # may have no verdict in the validity table
+        prev_layer_valid_blocks = 0
+        for pointed_block_id in view_head_ids:
+            pointed_block = blocks[pointed_block_id]
+            if pointed_block.layerId + 1 == layer_id and \
+                    (pointed_block.layerId == 0 or self.mesh.validity.get(pointed_block_id, True)):
+                prev_layer_valid_blocks += 1
+
+        if prev_layer_valid_blocks < self.mesh.tmin:
+            self.mesh.add_invalid_block(block_id, layer_id)
+            self.rejected_count += 1
+            return
+
+        self.mesh.validity[block_id] = True
+
+        # The encoding is canonical (see decode_block), so its id is the id of the decoded block
+        block = Block.deserialize(data, blocks)
+        block.blockId = block_id
+        self.mesh.add_block(block)
+        self.added_count += 1
@@ -1,14 +1,23 @@
 import logging
-from threading import Timer
+from threading import Condition, Lock
 
+from DataSturcutres.BlockTemplate import BlockTemplate
+from DataSturcutres.HeadSet import HeadSet
 from HareProtocols.TrivialHareProtocol import TrivialHareProtocol
-from PoW.NaivePoWProtocol import NaivePoWProtocol
+from Ingestion.DuplicateFilter import DuplicateFilter
+from Ingestion.MeshSync import MeshSync
+from Metrics.NullMetrics import NullMetrics
+from PoW.HashPowProtocol import HashPoWProtocol
+from PoW.ParallelPowProtocol import ParallelPoWProtocol
+from Scheduling.TimerScheduler import TimerScheduler
+from TortoiseProtocols.TortoiseProtocol import TortoiseProtocol
 from WeakCoin.MeshcashWeakCoinProtocol import MeshcashWeakCoinProtocol
+from Transactions.Mempool import Mempool
 from Transactions.TransactionListenerService import TransactionListenerService
 
 
 class MeshcashMiner:
-    def __init__(self, pk, mesh):
+    def __init__(self, pk, mesh, pow_protocol=None, scheduler=None, metrics=None):
         # The ID of the miner
         # Similarly to Bitcoin, each miner is assigned with a unique public key for identification.
         # Each block contain its miner public key thus entitling him of Coinbase reward.
@@ -26,19 +35,31 @@ class MeshcashMiner:
         # The block object will contain the miner's view and will update with new arriving blocks
         self.current_mined_block = None
 
+        # Assembles the actively mined block (a BlockTemplate), all changes to the block go through it
+        # It keeps the digest the proofs-of-work commit to up to date, so a challenge reset doesn't re-serialize the block
+        self.block_template = None
+
         # A Proofs-of-Work interface
         # This is interchangeable and is used to generate and validate PoW solutions.
-        self.pow_protocol = NaivePoWProtocol()
+        # The nonce search is split across a process per core (unless another protocol is given)
+        self.pow_protocol = pow_protocol or ParallelPoWProtocol(HashPoWProtocol())
 
         # A flag to indicate whether the block changed since it was last hashed
         # When set, the proofs-of-work interface will restart a solution search over the new block's contents
         self.current_block_changed_flag = False
 
+        # Arriving blocks are handled on the mesh's ingestion thread while the main loop searches for a nonce
+        # This lock guards the currently mined block (and its changed flag) between the two
+        self.current_block_lock = Lock()
+
+        # Notified whenever the layer counter is incremented
+        self.layer_changed = Condition()
+
         # A list of blocks in the miner's view that cannot be reached by existing edges
         # (i.e. blocks with in-degree of 0)
         # This list will be used to recursively "reconstruct" the miner's view
         # for the hare protocol and block validation
-        self.current_heads = []
+        self.current_heads = HeadSet()
 
         # A subset of the blocks in the miner's view that the miner votes for
         # These blocks are selected by the hare protocol
@@ -49,7 +70,7 @@ class MeshcashMiner:
         self.weak_coin_protocol = MeshcashWeakCoinProtocol()
 
         # A list of blocks generated since last layer incrementation
-        # In Meshcash, this is used for the weak coin protocol
+        # In Meshcash, this is used for the weak coin protocol (which also observes them as they arrive)
         self.fresh_blocks = []
 
         # A (possibly faulty) but quick consensus protocol interface
@@ -57,28 +78,48 @@ class MeshcashMiner:
         # For ease of read, we use the simpler (majority vote) of two Hare protocols presented in the article.
         self.hare_protocol = TrivialHareProtocol()
 
+        # A slow but safe consensus protocol interface, deciding the blocks of layers older than the hare's
+        # Its votes are counted as layers close, so the margin of an old block is always at hand
+        self.tortoise_protocol = TortoiseProtocol()
+
         # Length of early block interval in seconds.
         # A bound on the network delay to set this value.
         self.delta_seconds = 30
 
-        # Timer object to decide on whether currently mined block is early
-        # This timer will be triggered on every layer, delta seconds after its start
-        self.early_block_timer = Timer(self.delta_seconds, self.set_early_block, args=[False])
+        # Owns the miner's per-layer deadlines, on the wall clock unless another scheduler (and clock) is given
+        # A simulation shares a single scheduler on a simulated clock between all of its miners
+        self.scheduler = scheduler or TimerScheduler()
+
+        # Handle of the scheduled decision on whether currently mined block is early
+        # This will be scheduled on every layer, delta seconds after its start
+        self.early_block_timer = None
 
         # Length of interval in which weak coin is determined.
         self.delta_coin_seconds = 120
 
-        # Timer object to decide on whether currently mined block was created before coin was determined
-        # This timer will be triggered on every layer, delta coin seconds after its start
-        self.before_coin_timer = Timer(self.delta_coin_seconds, self.set_before_coin)
+        # Handle of the scheduled decision on whether currently mined block was created before coin was determined
+        # This will be scheduled on every layer, delta coin seconds after its start
+        self.before_coin_timer = None
+
+        # Pending transactions and the first layer id in which confirmed transactions were included
+        # This is used to avoid including redeemed transactions and to pick the mined block's transactions
+        self.mempool = Mempool()
+        self.mempool.is_archived = self.mesh.compacted_txs.contains
+
+        # Number of layers a transaction is kept pending for, older ones are evicted on every layer change
+        self.pending_tx_layers = 10
 
         # A transaction publish-subscribe service
-        # The miner can register for new transactions
-        self.tx_listener = TransactionListenerService()
+        # The miner can register for new transactions, which are deduplicated and validated on worker processes
+        self.tx_listener = TransactionListenerService(is_known=self.mempool.contains_id)
 
-        # Mapping of transaction to first layer id in which they were included
-        # This is used to avoid including redeemed transactions
-        self.confirmed_txs = {}
+        # Ids of recently received blocks, so blocks arriving again are dropped before they're validated
+        # Positives are confirmed by the mesh (which keeps the valid blocks and the verdicts of invalid ones)
+        # Every generation covers 16 layers of up to 1024 blocks
+        self.block_filter = DuplicateFilter(self.is_known_block, capacity_per_generation=16 * 1024)
+
+        # Maximal number of transactions included in the mined block
+        self.max_block_txs = 1000
 
         # Transactions that appear in blocks that were received in the current layer
         # This is used to update the mapping of confirmed transactions whenever a layer ends
@@ -87,66 +128,183 @@ class MeshcashMiner:
         # will include "ancient" unconfirmed transaction based on the Tortoise protocol
         self.newly_confirmed_txs = []
 
-    def mine(self):
+        # Counters, histograms and timers of the miner's hot paths (a MetricsRegistry)
+        # Without one, the instrumentation is a no-op
+        self.metrics = metrics or NullMetrics()
+        self.metrics.set_gauge('layer_counter', lambda: self.layer_counter)
+        self.metrics.set_gauge('difficulty', lambda: self.pow_protocol.difficulty)
+        self.metrics.set_gauge('nonce_rate', self.pow_protocol.get_hashrate)
+        self.metrics.set_gauge('pending_txs', lambda: len(self.mempool.pending))
+        self.metrics.set_gauge('block_filter_false_positive_rate', self.block_filter.get_false_positive_rate)
+        self.metrics.set_gauge('block_filter_bytes', self.block_filter.get_size)
+        self.metrics.set_gauge('tx_filter_false_positive_rate', self.tx_listener.tx_filter.get_false_positive_rate)
+        self.metrics.set_gauge('tx_filter_bytes', self.tx_listener.tx_filter.get_size)
+
+        # An optional SamplingProfiler, started along with the mining loop
+        self.profiler = None
+
+        # Number of recent layers kept whole in memory, older layers are compacted into summaries
+        # (None keeps all layers) and the transactions confirmed in them are only kept by the mesh's archive
+        # Compacted layers must be beyond the tortoise protocol's horizon, as their votes and tallies are final
+        self.retained_layers = self.tortoise_protocol.horizon + self.hare_protocol.consensusIntervalStart
+
+    def mine(self, sync_layers=None):
         """
         The main loop of the miner and the entry point for the miner.
         The goal of this method is to attempt mining a block while considering newly arriving blocks
          affecting the currently mined block content.
         In an optimized implementation, this would run in on another thread.
+        :param sync_layers: an optional history of layers to catch up with before mining (see load_view)
         :return:
         """
+        self.load_view(sync_layers)
 
-        # Read the existing mesh
-        logging.info("Updating to the latest mesh...")
-        self.mesh.initialize()
-
-        # Set the layer counter according to the Mesh last valid layer
-        self.layer_counter = self.mesh.get_last_valid_layer()
-        logging.info("Setting layer counter to %s", self.layer_counter)
+        if self.profiler is not None:
+            logging.info("Starting the sampling profiler")
+            self.profiler.start()
 
-        # Initialize hare protocol opinions about recent blocks
-        logging.info("Setting hare protocol opinions about recent layers' blocks")
-        self.hare_protocol.set_block_opinions(self.mesh, self.layer_counter)
+        # Start running the per-layer deadlines
+        logging.info("Starting the scheduler")
+        self.scheduler.start()
 
         # Register for "new arriving blocks" event
-        # When a new block arrives, the handle_new_block function will be called
+        # When new blocks arrive, the handle_arriving_blocks function will be called
         # to update currently mined block's content
         logging.info("Registering for newly arriving blocks")
-        self.mesh.register_for_new_arriving_blocks(self.handle_new_block)
+        self.mesh.register_for_new_arriving_blocks(self.handle_arriving_blocks)
 
         # Register for "new arriving transactions" event
-        # When a new transaction arrives the handle_new_transaction_function will be called
+        # When new transactions arrive the handle_new_transactions function will be called
         # the update currently mined block's content
         logging.info("Registering for newly arriving transactions")
-        self.tx_listener.register_for_new_arriving_transactions(self.handle_new_transaction)
+        self.tx_listener.register_for_new_arriving_transactions(self.handle_new_transactions)
 
         # Wait until the start of the next layer to start mining
         # in an optimized implementation, we can start immediately but we would need to handle some special cases
         # (e.g. recognizing freshly-generated blocks when we haven't been around since the start of the layer)
         logging.info("Waiting for the next layer to start mining...")
-        current_layer_counter = self.layer_counter
-        while self.layer_counter <= current_layer_counter:
-            pass
+        self.wait_for_layer(self.layer_counter + 1)
 
         # Main mining loop
+        # The nonce search itself runs on the proofs-of-work protocol's workers, this loop only waits for its results
         logging.info("Starting to mine...")
         while True:
+            self.reset_challenge()
+
+            success, proof = self.pow_protocol.try_single_nonce()
+            if success:
+                mined_block = self.get_mined_block(proof)
+                if mined_block is None:
+                    continue
+
+                # Publish the mined block through the mesh, which also delivers it to this miner's own view
+                # (outside of the lock, as the ingestion thread needs it to make room in a full queue)
+                logging.info("Publishing the mined block to the rest of the network")
+                self.mesh.receive_block(mined_block)
+
+    def reset_challenge(self):
+        """
+        Resets the proofs-of-work challenge if the currently mined block changed since it was last set
+        :return:
+        """
+        with self.current_block_lock:
             if self.current_block_changed_flag:
                 # Compute new PoW challenge
-                self.pow_protocol.set_challenge(self.current_mined_block)
+                with self.metrics.timer('challenge_reset_seconds'):
+                    self.pow_protocol.set_challenge(self.block_template)
+                self.metrics.add('challenge_resets')
 
                 # Challenge is now up-to-date with latest mesh
                 self.current_block_changed_flag = False
 
-            success, proof = self.pow_protocol.try_single_nonce()
-            if success:
-                # Setting the successful proofs-of-work to the currently mined block
-                logging.info("Found a successful proofs-of-work for currently mined block!")
-                self.current_mined_block.pow = proof
+    def get_mined_block(self, proof):
+        """
+        Returns a copy of the currently mined block along with a successful proofs-of-work found for it
+        Returns None if the block changed while the proof was searched (the proof is then no longer valid)
+        :param proof:
+        :return:
+        """
+        with self.current_block_lock:
+            if self.current_block_changed_flag:
+                return None
 
-                # Publish currently mined block
-                logging.info("Publishing the mined block to the rest of the network")
-                self.current_mined_block.publish()
+            # Setting the successful proofs-of-work to a copy of the currently mined block
+            # (which keeps changing with the miner's view)
+            logging.info("Found a successful proofs-of-work for currently mined block!")
+            mined_block = self.block_template.snapshot()
+            mined_block.pow = proof
+            self.metrics.add('blocks_mined')
+            return mined_block
+
+    def load_view(self, sync_layers=None):
+        """
+        Builds the miner's view (and the currently mined block) from the existing mesh
+        :param sync_layers: an optional iterable of (layer id, encoded blocks) of historical layers (e.g. from a peer)
+         these are validated and added to the mesh in bulk, rather than handled one block at a time
+        :return:
+        """
+
+        # Read the existing mesh
+        logging.info("Updating to the latest mesh...")
+        self.mesh.initialize(self.retained_layers)
+
+        if sync_layers is not None:
+            logging.info("Catching up with the history of layers...")
+            mesh_sync = MeshSync(self.mesh, self.pow_protocol)
+            with self.metrics.timer('sync_seconds'):
+                mesh_sync.sync(sync_layers)
+            logging.info("Added %d blocks, rejected %d blocks", mesh_sync.added_count, mesh_sync.rejected_count)
+
+        # Find the heads of the existing mesh, its blocks are no longer new when they arrive again
+        for layer in self.mesh.layers:
+            for block in layer.blocks:
+                self.current_heads.add_block(block)
+                self.block_filter.add(block.generate_block_id())
+
+        # Set the layer counter to the layer following the Mesh last valid layer
+        self.layer_counter = self.mesh.get_last_valid_layer() + 1
+        logging.info("Setting layer counter to %s", self.layer_counter)
+
+        # Initialize hare protocol opinions about recent blocks
+        logging.info("Setting hare protocol opinions about recent layers' blocks")
+        self.hare_protocol.set_block_opinions(self.mesh, self.layer_counter)
+
+        # Count the tortoise protocol votes of the closed layers
+        logging.info("Counting tortoise protocol votes about closed layers' blocks")
+        self.tortoise_protocol.set_block_opinions(self.mesh, self.layer_counter)
+
+        # Keep only the recent layers whole
+        self.compact_layers()
+
+        # Start with an empty block in the current layer
+        self.block_template = BlockTemplate()
+        self.current_mined_block = self.block_template.block
+        self.update_current_block()
+
+    def wait_for_layer(self, layer_id):
+        """
+        Blocks until the layer counter reaches layer_id
+        :param layer_id:
+        :return:
+        """
+        with self.layer_changed:
+            while self.layer_counter < layer_id:
+                self.layer_changed.wait()
+
+    def increment_layer_counter(self):
+        with self.layer_changed:
+            self.layer_counter += 1
+            self.layer_changed.notify_all()
+
+    def handle_arriving_blocks(self, new_received_blocks):
+        """
+        Receives a batch of blocks that arrived together (called from the mesh's ingestion thread)
+        :param new_received_blocks:
+        :return:
+        """
+        with self.current_block_lock:
+            with self.metrics.timer('handle_blocks_seconds'):
+                self.handle_new_blocks(new_received_blocks)
 
     def handle_new_block(self, new_received_block):
         """
@@ -155,68 +313,166 @@ class MeshcashMiner:
         :param new_received_block:
         :return:
         """
+        self.handle_new_blocks([new_received_block])
+
+    def handle_new_blocks(self, new_received_blocks):
+        """
+        receives a batch of new blocks and updates all relevant data structures.
+        Every block is validated and applied to the miner's view in order, but the currently mined block
+        (and thus the proofs-of-work challenge) is updated once, ending in the same state as handling them one by one
+        :param new_received_blocks:
+        :return:
+        """
+        self.metrics.add('blocks_received', len(new_received_blocks))
+        last_valid_block = None
+        for new_received_block in new_received_blocks:
+            if self.block_filter.is_duplicate(new_received_block.generate_block_id()):
+                self.metrics.add('duplicate_blocks')
+                continue
+
+            if self.apply_new_block(new_received_block):
+                last_valid_block = new_received_block
+
+        if last_valid_block is None:
+            return
+
+        logging.debug("Adjusting proofs-of-work difficulty setting")
+        with self.metrics.timer('difficulty_adjustment_seconds'):
+            self.pow_protocol.adjust_difficulty(self.mesh)
+
+        logging.debug("Updating the current block content based on miner's view")
+        with self.metrics.timer('block_update_seconds'):
+            changed = self.update_current_block()
+
+        # Setting this flag to alert the proofs-of-work protocol about
+        # a change requiring a challenge reset
+        if changed:
+            self.current_block_changed_flag = True
+
+    def apply_new_block(self, new_received_block):
+        """
+        Validates a new block and applies it to the miner's view (without updating the currently mined block)
+        Returns False if the block is syntactically invalid
+        :param new_received_block:
+        :return:
+        """
         block_id = new_received_block.generate_block_id()
         logging.debug("Block %s arrived", block_id)
 
-        if not new_received_block.is_syntactically_validity(self.pow_protocol, self.mesh.tmin):
-            logging.warning("Block % is syntactically invalid", block_id)
-            return
+        with self.metrics.timer('block_validation_seconds'):
+            valid = new_received_block.is_syntactically_valid(self.pow_protocol, self.mesh.tmin, self.mesh.validity,
+                                                              self.mesh)
+
+        if not valid:
+            # The verdict was recorded by the validation (unless the block's layer was compacted)
+            logging.warning("Block %s is syntactically invalid", block_id)
+            self.metrics.add('invalid_blocks')
+            return False
 
         logging.debug("Recomputing valid recent blocks using the hare protocol")
-        self.voting_edges = self.hare_protocol.get_valid_blocks(new_received_block)
+        with self.metrics.timer('hare_update_seconds'):
+            self.voting_edges = self.hare_protocol.get_valid_blocks(new_received_block)
 
         logging.debug("Updating current heads (i.e. blocks with in-degree 0)")
-        self.current_heads = self.update_heads(new_received_block)
+        with self.metrics.timer('heads_update_seconds'):
+            self.update_heads(new_received_block)
 
-        logging.debug("Adding % to the list of `fresh` blocks", block_id)
+        logging.debug("Adding %s to the list of `fresh` blocks", block_id)
         self.fresh_blocks.append(new_received_block)
+        with self.metrics.timer('weak_coin_seconds'):
+            self.weak_coin_protocol.observe_block(new_received_block)
+        self.newly_confirmed_txs.extend(new_received_block.txs)
+
+        logging.debug("Adding %s to the mesh", block_id)
+        with self.metrics.timer('mesh_add_seconds'):
+            self.mesh.add_block(new_received_block)
 
         if self.should_update_layer_counter():
+            self.metrics.add('layers')
             logging.debug("Incrementing layer counter to %s", self.layer_counter + 1)
-            self.layer_counter += 1
+            self.increment_layer_counter()
 
             logging.debug("Resetting fresh blocks")
             self.fresh_blocks = []
+            self.weak_coin_protocol.reset()
 
             logging.debug("Set currently mined block 'early block' flag")
             self.set_early_block(True)
 
             logging.debug("Setting early block timer to change %s seconds from now", self.delta_seconds)
-            self.early_block_timer.start()
+            self.early_block_timer = self.scheduler.reschedule(self.early_block_timer, self.delta_seconds,
+                                                               self.end_interval, self.set_early_block)
 
             logging.debug("Set currently mined block 'before coin' flag")
             self.set_before_coin(True)
 
-            logging.debug("Setting before coin timer to change flag % seconds from now", self.delta_coin_seconds)
-            self.before_coin_timer.start()
+            logging.debug("Setting before coin timer to change flag %s seconds from now", self.delta_coin_seconds)
+            self.before_coin_timer = self.scheduler.reschedule(self.before_coin_timer, self.delta_coin_seconds,
+                                                               self.end_interval, self.set_before_coin)
 
             # Upon layer incrementation, the last "hare" layer becomes a "tortoise" layer
             # thus its blocks should be removed from hare's blocks' opinions
             logging.debug("Removing opinions about blocks in the last hare protocol layer")
             self.hare_protocol.remove_oldest_layer_from_opinions(self.layer_counter)
 
-            # Remove confirmed transactions from the list of mined transactions
-            for newlyConfirmedTransaction in self.newly_confirmed_txs:
-                self.confirmed_txs[newlyConfirmedTransaction] = self.layer_counter - 1
-                self.current_mined_block.txs.remove(newlyConfirmedTransaction)
+            logging.debug("Counting the tortoise protocol votes of the closed layer")
+            self.tortoise_protocol.close_layer(self.layer_counter - 1)
 
-        logging.debug("Adjusting proofs-of-work difficulty setting")
-        self.pow_protocol.adjust_difficulty(self.mesh)
+            logging.debug("Paging out stored layers older than the hare protocol layers")
+            self.mesh.page_out_layers(self.layer_counter - self.hare_protocol.consensusIntervalStart)
 
-        print "Updating the current block content based on miner's view"
-        self.update_current_block(new_received_block)
+            logging.debug("Compacting the layers beyond the retained layers")
+            with self.metrics.timer('compaction_seconds'):
+                self.compact_layers()
 
-        # Setting this flag to alert the proofs-of-work protocol about
-        # a change requiring a challenge reset
-        self.current_block_changed_flag = True
+            logging.debug("Rotating the duplicate filters")
+            self.block_filter.rotate(self.layer_counter)
+            self.tx_listener.tx_filter.rotate(self.layer_counter)
+
+            # Remove confirmed transactions from the pending transactions and refill the mined transactions
+            logging.debug("Evicting the transactions confirmed in the last layer from the mempool")
+            self.mempool.confirm_transactions(self.newly_confirmed_txs, self.layer_counter - 1)
+            self.newly_confirmed_txs = []
+            self.mempool.evict_expired(self.layer_counter - self.pending_tx_layers)
+            self.block_template.set_txs(self.mempool.get_block_txs(self.max_block_txs))
+            self.current_block_changed_flag = True
+
+        return True
+
+    def compact_layers(self):
+        """
+        Compacts the layers older than the retained layers, forgetting their blocks and transactions
+        :return:
+        """
+        if self.retained_layers is None:
+            return
+
+        layer_id = self.layer_counter - self.retained_layers
+        summaries = self.mesh.compact_layers(
+            layer_id, lambda compacted_layer_id: self.tortoise_protocol.get_confirmed_blocks(compacted_layer_id, 1))
+        for summary in summaries:
+            self.current_heads.forget_blocks(summary.get_block_ids())
+
+        self.tortoise_protocol.forget_layers(self.mesh.compacted_layer_count)
+        self.mempool.forget_confirmed(self.mesh.compacted_layer_count)
+
+    def end_interval(self, set_flag):
+        """
+        Turns off a flag of the currently mined block once its interval is over (called by the scheduler)
+        :param set_flag:
+        :return:
+        """
+        with self.current_block_lock:
+            set_flag(False)
+            self.current_block_changed_flag = True
 
     def set_early_block(self, val):
-        print "Setting `early block`={}".format(val)
-        self.current_mined_block.earlyBlock = val
+        logging.debug("Setting `early block`=%s", val)
+        self.block_template.set_field('earlyBlock', val)
 
     def set_before_coin(self, val):
-        print "Setting `before coin`={}".format(val)
-        self.current_mined_block.beforeCoin = val
+        logging.debug("Setting `before coin`=%s", val)
+        self.block_template.set_field('beforeCoin', val)
 
     def update_heads(self, block):
         """
@@ -224,8 +480,7 @@ class MeshcashMiner:
         :param block:
         :return:
         """
-        self.current_heads.append(block)
-        return filter(lambda x: x in block.validRecentBlocks, self.current_heads)
+        self.current_heads.add_block(block)
 
     def should_update_layer_counter(self):
         """
@@ -234,33 +489,41 @@ class MeshcashMiner:
         """
 
         # Check if given the newly added block there are at least TMIN blocks
-        current_layer_block_count = len(self.mesh.layers[self.layer_counter].blocks) + 1
+        current_layer_block_count = self.mesh.get_layer_block_count(self.layer_counter)
         return current_layer_block_count >= self.mesh.tmin
 
-    def update_current_block(self, new_received_block):
+    def update_current_block(self):
         """
-        Update the content of the currently mined block according to the miner's view and arriving block
-        :param new_received_block:
+        Update the content of the currently mined block according to the miner's view
+        Returns True if the block changed
         :return:
         """
+        changed = False
 
         # Set miner's public key
         # NOTE: shouldn't be done on each update but concentrating all hashed values in
         # a single function makes it easier to follow the block's contents
-        self.current_mined_block.minerPk = self.pk
+        changed |= self.block_template.set_field('minerPk', self.pk)
 
         # Set the layer id of the currently mined block by current layer
-        self.current_mined_block.layerId = self.layer_counter
+        changed |= self.block_template.set_field('layerId', self.layer_counter)
 
-        # If the newly arrived block is pointing to a subset of "head block"
-        # we remove them from the list of heads (because they are reachable throughout the added block's view)
-        self.current_mined_block.viewHeads = set(self.current_heads) - set(new_received_block.validRecentBlocks)
+        # Blocks pointed by newly arrived blocks (of earlier layers) were already removed from the heads
+        # (because they are reachable throughout the added block's view)
+        changed |= self.block_template.set_field('viewHeads', self.current_heads.get_heads(self.layer_counter))
 
         # Set voting edges according to the hare protocol's output
-        self.current_mined_block.votingEdges = self.voting_edges
+        changed |= self.block_template.set_field('validRecentBlocks', self.voting_edges)
 
         # Update the latest value of the weak coin according to the weak coin protocol
-        self.current_mined_block.weakCoinValue = self.weak_coin_protocol.output_coin(self.fresh_blocks)
+        # (there's no value until a fresh block of the current layer arrives)
+        changed |= self.block_template.set_field(
+            'weakCoinValue', self.weak_coin_protocol.get_coin() if self.fresh_blocks else None)
+
+        return changed
+
+    def is_known_block(self, block_id):
+        return block_id in self.mesh.blocks or block_id in self.mesh.validity
 
     def handle_new_transaction(self, tx):
         """
@@ -268,13 +531,31 @@ class MeshcashMiner:
         :param tx:
         :return:
         """
-        # If this transaction was previously confirmed, there's nothing to do
-        if tx in self.confirmed_txs.keys():
+        # If this transaction was seen and previously confirmed (or is already pending), there's nothing to do
+        # (transactions that weren't seen recently are checked by the mempool once they're valid)
+        if self.tx_listener.tx_filter.is_duplicate(tx.generate_tx_id()):
             return
 
         # If this transaction is syntactically invalid, ignore it
         if not tx.is_syntactically_valid():
             return
 
-        # Add the current list of mined transactions
-        self.current_mined_block.txs.append(tx)
+        self.handle_new_transactions([tx])
+
+    def handle_new_transactions(self, txs):
+        """
+        Handle a chunk of upcoming transactions, which were already validated by the transaction listener
+        :param txs:
+        :return:
+        """
+        # The mempool is shared with the ingestion thread, which confirms the transactions of arriving blocks
+        with self.current_block_lock:
+            new_txs = [tx for tx in txs if self.mempool.add_transaction(tx, self.layer_counter)]
+            self.metrics.add('txs_received', len(txs))
+            self.metrics.add('txs_admitted', len(new_txs))
+
+            # Add the current list of mined transactions, as long as it's not full
+            room = self.max_block_txs - len(self.current_mined_block.txs)
+            if room > 0 and self.block_template.add_txs(new_txs[:room]):
+                # The proofs-of-work must commit to the added transactions
+                self.current_block_changed_flag = True
@@ -0,0 +1,63 @@
+import math
+
+
+class Histogram:
+    """
+    A histogram of positive values (e.g. durations) in power of 2 buckets
+    Observing a value is O(1) and the histogram's size is bounded by the range of the values
+    Percentiles are estimated by the upper bound of the bucket they fall in
+    """
+
+    def __init__(self):
+        # Mapping of bucket index to the number of values observed in it
+        # Bucket i holds the values in [2^(i-1), 2^i)
+        self.buckets = {}
+
+        # Number, sum and extremes of the observed values
+        self.count = 0
+        self.total = 0.0
+        self.min = None
+        self.max = None
+
+    def observe(self, value):
+        bucket = math.frexp(value)[1] if value > 0 else None
+        self.buckets[bucket] = self.buckets.get(bucket, 0) + 1
+        self.count += 1
+        self.total += value
+        if self.min is None or value < self.min:
+            self.min = value
+        if self.max is None or value > self.max:
+            self.max = value
+
+    def get_mean(self):
+        return self.total / self.count if self.count else None
+
+    def get_percentile(self, percentile):
+        """
+        Returns an upper bound of the percentile of the observed values (None if there are none)
+        :param percentile:
+        :return:
+        """
+        if not self.count:
+            return None
+
+        rank = percentile / 100.0 * self.count
+        seen = 0
+        for bucket in sorted(self.buckets, key=lambda index: -1e9 if index is None else index):
+            seen += self.buckets[bucket]
+            if seen >= rank:
+                return 0.0 if bucket is None else min(math.ldexp(1.0, bucket), self.max)
+
+        return self.max
+
+    def snapshot(self):
+        return {
+            'count': self.count,
+            'total': self.total,
+            'mean': self.get_mean(),
+            'min': self.min,
+            'max': self.max,
+            'p50': self.get_percentile(50),
+            'p90': self.get_percentile(90),
+            'p99': self.get_percentile(99),
+        }
@@ -0,0 +1,85 @@
+import json
+import time
+from threading import Lock
+
+from Metrics.Histogram import Histogram
+from Metrics.Timer import Timer
+
+
+class MetricsRegistry:
+    """
+    Named counters, histograms and gauges of a running miner
+    Counters and histograms are updated in O(1) on the hot paths, gauges are functions read only on a snapshot
+    Updates may come from several threads (e.g. block ingestion and transaction dispatching), so they take a lock
+    """
+
+    # Whether updating the metrics does anything (see NullMetrics)
+    enabled = True
+
+    def __init__(self):
+        # Mapping of name to count
+        self.counters = {}
+
+        # Mapping of name to Histogram (timers observe seconds)
+        self.histograms = {}
+
+        # Mapping of name to a function returning the current value
+        self.gauges = {}
+
+        # The time the registry was created, counter rates are per second since
+        self.start_ts = time.time()
+
+        self.lock = Lock()
+
+    def add(self, name, count=1):
+        with self.lock:
+            self.counters[name] = self.counters.get(name, 0) + count
+
+    def observe(self, name, value):
+        with self.lock:
+            histogram = self.histograms.get(name)
+            if histogram is None:
+                histogram = self.histograms[name] = Histogram()
+
+            histogram.observe(value)
+
+    def timer(self, name):
+        """
+        Returns a context manager timing its block into the histogram of the given name
+        :param name:
+        :return:
+        """
+        return Timer(self, name)
+
+    def set_gauge(self, name, func):
+        self.gauges[name] = func
+
+    def get_counter(self, name):
+        return self.counters.get(name, 0)
+
+    def get_histogram(self, name):
+        return self.histograms.get(name)
+
+    def snapshot(self):
+        """
+        Returns the current metrics as a JSON serializable dictionary
+        :return:
+        """
+        with self.lock:
+            uptime = time.time() - self.start_ts
+            return {
+                'uptime_seconds': uptime,
+                'counters': dict(self.counters),
+                'rates': dict((name, count / uptime if uptime > 0 else None) for name, count in self.counters.items()),
+                'histograms': dict((name, histogram.snapshot()) for name, histogram in self.histograms.items()),
+                'gauges': dict((name, func()) for name, func in self.gauges.items()),
+            }
+
+    def dump(self, path):
+        """
+        Writes a snapshot of the metrics to a JSON file
+        :param path:
+        :return:
+        """
+        with open(path, 'w') as dump_file:
+            json.dump(self.snapshot(), dump_file, indent=2, sort_keys=True)
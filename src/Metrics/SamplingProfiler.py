@@ -0,0 +1,100 @@
+import sys
+import threading
+import time
+from collections import Counter
+
+
+class SamplingProfiler:
+    """
+    An opt-in statistical profiler for a running process
+    A background thread periodically samples the stacks of the profiled threads (all other threads by default)
+    and counts the functions found in them, so the profiled code itself runs unmodified
+    Each function is counted once per sample it appears in (its cumulative share) and separately when it's the
+    innermost frame (its own share)
+    """
+
+    def __init__(self, interval_seconds=0.005, thread_ids=None, max_depth=64):
+        # Seconds between two samples
+        self.interval_seconds = interval_seconds
+
+        # Ids of the profiled threads (None profiles every thread but the sampling one)
+        self.thread_ids = thread_ids
+
+        # Stack frames deeper than this are not counted
+        self.max_depth = max_depth
+
+        # Number of samples taken and the counts of (file, line, function) locations in them
+        self.samples = 0
+        self.cumulative_counts = Counter()
+        self.own_counts = Counter()
+
+        self.thread = None
+        self.stopped = threading.Event()
+
+    def start(self):
+        self.stopped.clear()
+        self.thread = threading.Thread(target=self.sample_loop)
+        self.thread.daemon = True
+        self.thread.start()
+
+    def stop(self):
+        if self.thread is not None:
+            self.stopped.set()
+            self.thread.join()
+            self.thread = None
+
+    def sample_loop(self):
+        while not self.stopped.wait(self.interval_seconds):
+            self.sample()
+
+    def sample(self):
+        """
+        Counts the functions on the profiled threads' current stacks
+        :return:
+        """
+        own_thread_id = threading.current_thread().ident
+        for thread_id, frame in sys._current_frames().items():
+            if thread_id == own_thread_id or (self.thread_ids is not None and thread_id not in self.thread_ids):
+                continue
+
+            self.samples += 1
+            self.own_counts[self.get_location(frame, True)] += 1
+            functions = set()
+            depth = 0
+            while frame is not None and depth < self.max_depth:
+                functions.add(self.get_location(frame, False))
+                frame = frame.f_back
+                depth += 1
+
+            self.cumulative_counts.update(functions)
+
+    @staticmethod
+    def get_location(frame, with_line):
+        code = frame.f_code
+        return code.co_filename, frame.f_lineno if with_line else code.co_firstlineno, code.co_name
+
+    def get_top(self, count=20, cumulative=True):
+        """
+        Returns the most sampled locations as (share of the samples, file, line, function) tuples
+        :param count:
+        :param cumulative: count the functions anywhere on the stack rather than only the innermost frames
+        :return:
+        """
+        counts = self.cumulative_counts if cumulative else self.own_counts
+        return [(location_count / float(self.samples), file_name, line, function)
+                for (file_name, line, function), location_count in counts.most_common(count)]
+
+    def dump(self, path, count=50):
+        """
+        Writes the most sampled locations to a text file
+        :param path:
+        :param count:
+        :return:
+        """
+        with open(path, 'w') as dump_file:
+            dump_file.write("%d samples every %.3f seconds at %s\n" % (self.samples, self.interval_seconds,
+                                                                      time.strftime('%Y-%m-%d %H:%M:%S')))
+            for title, cumulative in (("cumulative", True), ("own", False)):
+                dump_file.write("\n%s:\n" % title)
+                for share, file_name, line, function in self.get_top(count, cumulative):
+                    dump_file.write("%6.2f%%  %s (%s:%d)\n" % (100 * share, function, file_name, line))
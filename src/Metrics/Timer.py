@@ -0,0 +1,20 @@
+from timeit import default_timer
+
+
+class Timer:
+    """
+    A context manager observing the seconds spent in its block in a registry's histogram
+    """
+
+    def __init__(self, registry, name):
+        self.registry = registry
+        self.name = name
+        self.start = None
+
+    def __enter__(self):
+        self.start = default_timer()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.registry.observe(self.name, default_timer() - self.start)
+        return False
@@ -0,0 +1,90 @@
+from collections import deque
+
+
+class DifficultyController:
+    """
+    Schedules the difficulty (the expected number of tries per block) the blocks of every layer must be mined at,
+    retargeting it toward a target number of blocks per layer
+    The schedule is derived from the mesh's contents alone, so every miner expects the same difficulty for a layer
+    and validators reject blocks mined below it (see PoWProtocol.get_layer_difficulty)
+    A layer closes once it holds tmin blocks, the blocks beyond that were mined while its blocks propagated,
+    so the work (blocks times difficulty) per layer over a window of layers estimates the network's hash rate
+    and the difficulty is set such that it finds the target number of blocks per layer
+    A layer's blocks are counted by the blocks of the next layer pointing them (see Mesh.get_pointed_block_count),
+    which is part of the next layer's content, so a block arriving late (e.g. after a miner scheduled the layers
+    following it) or loaded from the store on a restart counts the same for every miner
+    The window of layer L ends lag layers before it, once the blocks of the layers following it settled
+    Every layer's difficulty is computed once, sliding the window's work by a single layer (O(1) per layer)
+    """
+
+    def __init__(self, base_difficulty, target_blocks_per_layer=None, window=16, lag=8, max_adjustment=4.0):
+        # The difficulty of the layers preceding the first full window
+        self.base_difficulty = base_difficulty
+
+        # The targeted number of blocks in a layer (twice the mesh's tmin if None), must be over tmin
+        self.target_blocks_per_layer = target_blocks_per_layer
+
+        # Number of layers the work is summed over
+        self.window = window
+
+        # Number of layers between a window's last layer and the layer it schedules
+        self.lag = lag
+
+        # The difficulty changes at most by this factor (up or down) between consecutive layers
+        self.max_adjustment = max_adjustment
+
+        # The difficulties of the layers scheduled so far, indexed by layer id
+        self.difficulties = []
+
+        # The work of the window's layers, oldest first, and its sum
+        self.window_work = deque()
+        self.total_work = 0
+
+    def get_difficulty(self, mesh, layer_id):
+        """
+        Returns the difficulty the blocks of a layer must be mined at
+        Returns None if the window of the layer isn't complete in the mesh yet
+        :param mesh:
+        :param layer_id:
+        :return:
+        """
+        while len(self.difficulties) <= layer_id:
+            difficulty = self.get_next_difficulty(mesh)
+            if difficulty is None:
+                return None
+
+            self.difficulties.append(difficulty)
+
+        return self.difficulties[layer_id]
+
+    def get_next_difficulty(self, mesh):
+        """
+        Slides the window to the layer following the last scheduled layer and returns its difficulty
+        (None if the layer following the one entering the window isn't complete in the mesh yet)
+        :param mesh:
+        :return:
+        """
+        layer_id = len(self.difficulties)
+        if layer_id == 0:
+            return self.base_difficulty
+
+        entering_layer_id = layer_id - self.lag - 1
+        if entering_layer_id >= 1:
+            if entering_layer_id + 1 > mesh.get_last_valid_layer():
+                return None
+
+            work = mesh.get_pointed_block_count(entering_layer_id) * self.difficulties[entering_layer_id]
+            self.window_work.append(work)
+            self.total_work += work
+            if len(self.window_work) > self.window:
+                self.total_work -= self.window_work.popleft()
+
+        if len(self.window_work) < self.window:
+            return self.base_difficulty
+
+        target_blocks_per_layer = self.target_blocks_per_layer or 2 * mesh.tmin
+        target_difficulty = self.total_work / float(self.window * target_blocks_per_layer)
+        prev_difficulty = self.difficulties[layer_id - 1]
+        target_difficulty = min(max(target_difficulty, prev_difficulty / self.max_adjustment),
+                                prev_difficulty * self.max_adjustment)
+        return max(int(round(target_difficulty)), 1)
@@ -0,0 +1,180 @@
+import hashlib
+import struct
+
+from PoW.DifficultyController import DifficultyController
+from PoW.PowProtocol import PoWProtocol
+
+# Header layout: layer id, difficulty and a digest of the rest of the block's content
+HEADER_FORMAT = '>QQ32s'
+HEADER_SIZE = struct.calcsize(HEADER_FORMAT)
+
+# Proofs are the header followed by the nonce
+NONCE_FORMAT = '>Q'
+PROOF_SIZE = HEADER_SIZE + struct.calcsize(NONCE_FORMAT)
+
+
+def get_target(difficulty):
+    """
+    Returns the (big endian) bytes a proof's hash must be lower than, such that a single nonce succeeds w.p. 1/difficulty
+    :param difficulty:
+    :return:
+    """
+    target = min((1 << 256) // difficulty, (1 << 256) - 1)
+    return b''.join([struct.pack('>Q', (target >> shift) & 0xFFFFFFFFFFFFFFFF) for shift in (192, 128, 64, 0)])
+
+
+class HashPoWProtocol(PoWProtocol):
+    """
+    A SHA-256 proofs-of-work: a nonce is valid if the hash of the block header followed by the nonce is below the target
+    A proof is the header followed by the nonce, so it's verified by a single hash and without any other state
+    """
+
+    def __init__(self, difficulty=5000, minimal_difficulty=None):
+        PoWProtocol.__init__(self)
+        self.difficulty = difficulty
+
+        # Proofs claiming a lower difficulty are rejected (the initial difficulty if None)
+        self.minimal_difficulty = minimal_difficulty or difficulty
+
+        # The difficulty of every layer is scheduled starting from the initial difficulty
+        self.difficulty_controller = DifficultyController(difficulty)
+
+        # The hashing state after the header of the current challenge, copied for every tried nonce
+        self.midstate = None
+
+        # The target of the current challenge
+        self.target = None
+
+    def get_block_header(self, block):
+        """
+        Returns the header of a block for the current difficulty
+        The header commits to the content of the block excluding its proofs-of-work
+        :param block: a Block, or a BlockTemplate keeping the content digest up to date
+        :return:
+        """
+        return struct.pack(HEADER_FORMAT, block.layerId, self.difficulty, block.get_content_digest())
+
+    def set_challenge(self, challenge):
+        """
+        Sets the challenge to the header of a block, the search restarts only if the header changed
+        :param challenge:
+        :return:
+        """
+        header = self.get_block_header(challenge)
+        if header != self.challenge:
+            self.challenge = header
+            self.lastNonce = 0
+            self.midstate = hashlib.sha256(header)
+            self.target = get_target(self.difficulty)
+
+    def get_challenge_header(self):
+        return self.challenge
+
+    def try_single_nonce(self):
+        """
+        Tries a single nonce
+        Returns a tuple of (status, result) where status is True if the nonce is valid and result contains the proof.
+        :return:
+        """
+        self.lastNonce += 1
+        nonce_bytes = struct.pack(NONCE_FORMAT, self.lastNonce)
+        nonce_hash = self.midstate.copy()
+        nonce_hash.update(nonce_bytes)
+        if nonce_hash.digest() < self.target:
+            return True, self.get_proof(self.challenge, self.lastNonce)
+
+        return False, None
+
+    def search_nonces(self, header, first_nonce, nonce_count):
+        """
+        Returns the first valid nonce in [first_nonce, first_nonce + nonce_count) or None if there's none
+        The header is hashed once, every nonce only hashes its own 8 bytes on top of a copy of the header's midstate
+        :param header:
+        :param first_nonce:
+        :param nonce_count:
+        :return:
+        """
+        midstate = hashlib.sha256(header)
+        target = get_target(struct.unpack_from(HEADER_FORMAT, header)[1])
+        copy = midstate.copy
+        pack = struct.Struct(NONCE_FORMAT).pack
+        for nonce in range(first_nonce, first_nonce + nonce_count):
+            nonce_hash = copy()
+            nonce_hash.update(pack(nonce))
+            if nonce_hash.digest() < target:
+                return nonce
+
+        return None
+
+    def is_valid_nonce(self, header, nonce):
+        return self.verify_pow(self.get_proof(header, nonce))
+
+    def get_proof(self, header, nonce):
+        return header + struct.pack(NONCE_FORMAT, nonce)
+
+    def verify_pow(self, proof, block=None, difficulty=None):
+        """
+        Return the whether the proofs-of-work is valid w.r.t the difficulty it claims
+        The claimed difficulty must be at least the minimal difficulty (and the given difficulty)
+        :param proof:
+        :param block: if given, the proof's header must be for this block's layer and content
+        :param difficulty: the difficulty expected for the proof (e.g. get_layer_difficulty of the block's layer)
+        :return:
+        """
+        return self.verify_pows([proof], [block], difficulty)[0]
+
+    def verify_pows(self, proofs, blocks=None, difficulty=None):
+        """
+        Returns a list of the verification results of the proofs
+        Targets are computed once per distinct difficulty
+        :param proofs:
+        :param blocks: if given, the blocks (or block views) each proof's header must be for
+        :param difficulty: an optional difficulty every proof must be for
+        :return:
+        """
+        if blocks is None:
+            blocks = [None] * len(proofs)
+
+        minimal_difficulty = max(self.minimal_difficulty, difficulty or 0)
+        targets = {}
+        sha256 = hashlib.sha256
+        unpack_from = struct.Struct(HEADER_FORMAT).unpack_from
+        results = []
+        for proof, block in zip(proofs, blocks):
+            if not isinstance(proof, bytes) or len(proof) != PROOF_SIZE:
+                results.append(False)
+                continue
+
+            layer_id, proof_difficulty, content_digest = unpack_from(proof)
+            if proof_difficulty < minimal_difficulty:
+                results.append(False)
+                continue
+
+            if proof_difficulty not in targets:
+                targets[proof_difficulty] = get_target(proof_difficulty)
+
+            if sha256(proof).digest() >= targets[proof_difficulty]:
+                results.append(False)
+                continue
+
+            # The proof must commit to the block carrying it, or it could be reused for any content
+            results.append(block is None or (layer_id == block.layerId and
+                                             content_digest == block.get_content_digest()))
+
+        return results
+
+    def get_proof_difficulty(self, proof):
+        if not isinstance(proof, bytes) or len(proof) != PROOF_SIZE:
+            return None
+
+        return struct.unpack_from(HEADER_FORMAT, proof)[1]
+
+    def get_layer_difficulty(self, mesh, layer_id):
+        """
+        Returns the difficulty the blocks of a layer must be mined at, as scheduled from the mesh's contents
+        (never below the minimal difficulty, which is all that's required while the layer's schedule isn't known)
+        :param mesh:
+        :param layer_id:
+        :return:
+        """
+        return max(PoWProtocol.get_layer_difficulty(self, mesh, layer_id) or 0, self.minimal_difficulty)
@@ -1,4 +1,4 @@
-import PoWProtocol
+from PoW.PowProtocol import PoWProtocol
 
 
 class NaivePoWProtocol(PoWProtocol):
@@ -7,6 +7,7 @@ class NaivePoWProtocol(PoWProtocol):
     """
 
     def __init__(self):
+        PoWProtocol.__init__(self)
         self.difficulty = 5000
 
     def try_single_nonce(self):
@@ -22,7 +23,16 @@ class NaivePoWProtocol(PoWProtocol):
         else:
             return False, self.lastNonce
 
-    def verify_pow(self, proof):
+    def is_valid_nonce(self, header, nonce):
+        """
+        Returns True if the nonce reached the difficulty (regardless of the challenge)
+        :param header:
+        :param nonce:
+        :return:
+        """
+        return nonce == self.difficulty
+
+    def verify_pow(self, proof, block=None, difficulty=None):
         """
         Return the whether the block's proofs-of-work is valid w.r.t difficulty and the current challenge
         :param proof:
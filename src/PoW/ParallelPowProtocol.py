@@ -0,0 +1,226 @@
+import time
+from multiprocessing import Process, Queue, Value, cpu_count
+
+from PoW.PowProtocol import PoWProtocol
+
+try:
+    from queue import Empty
+except ImportError:
+    from Queue import Empty
+
+
+def search_worker(pow_protocol, worker_index, workers_count, batch_size, generation, tried_nonces, jobs, results):
+    """
+    The main loop of a nonce search process
+    Worker i searches the nonce batches i, i + workers_count, i + 2 * workers_count... of the latest challenge
+    (counted from the job's first nonce)
+    and checks between batches whether the challenge was replaced
+    Reports (generation, worker index, nonce, timestamp) on results, where nonce is None if the challenge was abandoned
+    :param pow_protocol: the searched protocol (a copy of it lives in each worker)
+    :param worker_index:
+    :param workers_count:
+    :param batch_size: number of nonces tested between two checks of the challenge generation
+    :param generation: shared counter of the latest challenge
+    :param tried_nonces: shared counter of tested nonces
+    :param jobs: queue of (generation, challenge header, difficulty, first nonce) tuples, None stops the worker
+    :param results:
+    :return:
+    """
+    while True:
+        job = jobs.get()
+        if job is None:
+            return
+
+        job_generation, header, difficulty, start_nonce = job
+        if job_generation != generation.value:
+            # A newer challenge is already waiting in the queue
+            continue
+
+        pow_protocol.difficulty = difficulty
+
+        first_nonce = start_nonce + worker_index * batch_size
+        while True:
+            if job_generation != generation.value:
+                results.put((job_generation, worker_index, None, time.time()))
+                break
+
+            nonce = pow_protocol.search_nonces(header, first_nonce, batch_size)
+            with tried_nonces.get_lock():
+                tried_nonces.value += batch_size if nonce is None else nonce - first_nonce + 1
+
+            if nonce is not None:
+                results.put((job_generation, worker_index, nonce, time.time()))
+                break
+
+            first_nonce += workers_count * batch_size
+
+
+class ParallelPoWProtocol(PoWProtocol):
+    """
+    Splits the nonce search of another proofs-of-work protocol across a pool of processes
+    Validation and difficulty adjustment are delegated to the wrapped protocol
+    The wrapped protocol is copied into every worker, its difficulty is sent along with every challenge
+    """
+
+    def __init__(self, pow_protocol, workers_count=None, batch_size=10000, poll_seconds=0.05):
+        PoWProtocol.__init__(self)
+
+        # The wrapped protocol, defining which nonces are valid
+        self.pow_protocol = pow_protocol
+        self.difficulty = pow_protocol.difficulty
+
+        # Number of search processes (one per core by default)
+        self.workers_count = workers_count or cpu_count()
+
+        # Number of nonces a worker tests between two checks for a new challenge
+        # Larger batches have less overhead but take longer to abandon a stale challenge
+        self.batch_size = batch_size
+
+        # Maximal time try_single_nonce waits for a solution before returning
+        self.poll_seconds = poll_seconds
+
+        # Shared counter of the latest challenge, workers abandon a search once it changes
+        self.generation = Value('i', 0)
+
+        # Shared counter of nonces tested by all workers
+        self.tried_nonces = Value('d', 0)
+
+        # A queue of challenges per worker and a single queue of their results
+        self.jobs = [Queue() for i in range(self.workers_count)]
+        self.results = Queue()
+
+        # The header of the current challenge, as searched by the workers
+        self.header = None
+
+        # Search processes, started with the first challenge
+        self.workers = []
+
+        # Timestamp of the time the pool started
+        self.start_ts = None
+
+        # Timestamp of the time the previous challenge was replaced
+        self.challenge_ts = None
+
+        # Seconds between a challenge being replaced and the last worker abandoning it (for the last replaced challenge)
+        self.abandon_seconds = None
+
+    def start(self):
+        """
+        Starts the search processes
+        :return:
+        """
+        self.start_ts = time.time()
+        for worker_index in range(self.workers_count):
+            worker = Process(target=search_worker,
+                             args=(self.pow_protocol, worker_index, self.workers_count, self.batch_size,
+                                   self.generation, self.tried_nonces, self.jobs[worker_index], self.results))
+            worker.daemon = True
+            worker.start()
+            self.workers.append(worker)
+
+    def stop(self):
+        """
+        Stops the search processes
+        :return:
+        """
+        self.cancel()
+        for jobs in self.jobs:
+            jobs.put(None)
+
+        for worker in self.workers:
+            worker.join()
+
+        self.workers = []
+
+    def set_challenge(self, challenge):
+        """
+        Sets the challenge and re-seeds the workers with it
+        :param challenge:
+        :return:
+        """
+        if not self.workers:
+            # Workers get a copy of the wrapped protocol, so start them before it holds the challenge
+            self.start()
+
+        self.pow_protocol.set_challenge(challenge)
+        header = self.pow_protocol.get_challenge_header()
+        if challenge == self.challenge and header == self.header:
+            return
+
+        self.challenge = challenge
+        self.header = header
+        self.lastNonce = 0
+        self.seed_workers(0)
+
+    def seed_workers(self, first_nonce):
+        """
+        Makes the workers search the current challenge from first_nonce on
+        :param first_nonce:
+        :return:
+        """
+        generation = self.cancel()
+        for jobs in self.jobs:
+            jobs.put((generation, self.header, self.pow_protocol.difficulty, first_nonce))
+
+    def cancel(self):
+        """
+        Makes the workers abandon the current challenge (within one batch)
+        Returns the new challenge generation
+        :return:
+        """
+        self.challenge_ts = time.time()
+        self.abandon_seconds = None
+        with self.generation.get_lock():
+            self.generation.value += 1
+            return self.generation.value
+
+    def try_single_nonce(self):
+        """
+        Waits up to poll_seconds for a worker to find a solution for the current challenge
+        Returns a tuple of (status, result) where status is True if a valid nonce was found and result contains its proof.
+        :return:
+        """
+        deadline = time.time() + self.poll_seconds
+        while True:
+            try:
+                result_generation, worker_index, nonce, result_ts = self.results.get(
+                    timeout=max(deadline - time.time(), 0))
+            except Empty:
+                return False, None
+
+            if nonce is None or result_generation != self.generation.value:
+                # A worker abandoned (or solved) a stale challenge
+                if result_generation == self.generation.value - 1:
+                    self.abandon_seconds = max(self.abandon_seconds or 0, result_ts - self.challenge_ts)
+                continue
+
+            # Move the rest of the workers past the solution, they keep searching the challenge until it's replaced
+            self.lastNonce = nonce
+            self.seed_workers(nonce + 1)
+            return True, self.pow_protocol.get_proof(self.header, nonce)
+
+    def get_hashrate(self):
+        """
+        Returns the average number of nonces tested per second since the pool started
+        :return:
+        """
+        if self.start_ts is None:
+            return 0
+
+        return self.tried_nonces.value / (time.time() - self.start_ts)
+
+    def verify_pow(self, proof, block=None, difficulty=None):
+        return self.pow_protocol.verify_pow(proof, block, difficulty)
+
+    def verify_pows(self, proofs, blocks=None, difficulty=None):
+        return self.pow_protocol.verify_pows(proofs, blocks, difficulty)
+
+    def get_proof_difficulty(self, proof):
+        return self.pow_protocol.get_proof_difficulty(proof)
+
+    def get_layer_difficulty(self, mesh, layer_id):
+        return self.pow_protocol.get_layer_difficulty(mesh, layer_id)
+
+    def adjust_difficulty(self, mesh):
+        self.pow_protocol.adjust_difficulty(mesh)
+        self.difficulty = self.pow_protocol.difficulty
@@ -13,6 +13,9 @@ class PoWProtocol:
         # Last attempted nonce
         self.lastNonce = 0
 
+        # Schedules the difficulty of every layer from the mesh's contents (None keeps the difficulty fixed)
+        self.difficulty_controller = None
+
     def set_challenge(self, challenge):
         """
         Sets the challenge
@@ -35,13 +38,104 @@ class PoWProtocol:
         self.lastNonce += 1
         return True, self.lastNonce
 
-    def verify_pow(self, proof):
+    def get_challenge_header(self):
+        """
+        Returns the current challenge in the (picklable) form searched by search_nonces
+        Protocols whose solutions depend on the challenge must override this
+        :return:
+        """
+        return None
+
+    def search_nonces(self, header, first_nonce, nonce_count):
+        """
+        Returns the first valid nonce in [first_nonce, first_nonce + nonce_count) or None if there's none
+        This reads no search state, so nonce ranges can be searched concurrently (e.g. by other processes)
+        :param header: the challenge as returned by get_challenge_header
+        :param first_nonce:
+        :param nonce_count:
+        :return:
+        """
+        for nonce in range(first_nonce, first_nonce + nonce_count):
+            if self.is_valid_nonce(header, nonce):
+                return nonce
+
+        return None
+
+    def is_valid_nonce(self, header, nonce):
+        """
+        Returns True if the nonce is a proofs-of-work solution for the challenge header
+        :param header:
+        :param nonce:
+        :return:
+        """
+        return True
+
+    def get_proof(self, header, nonce):
+        """
+        Returns the proof of a nonce found for the challenge header
+        :param header:
+        :param nonce:
+        :return:
+        """
+        return nonce
+
+    def get_hashrate(self):
+        """
+        Returns the average number of nonces tested per second (None if the protocol doesn't measure it)
+        :return:
+        """
+        return None
+
+    def verify_pow(self, proof, block=None, difficulty=None):
         """
         Return the whether the block's proofs-of-work is valid w.r.t difficulty and the current challenge
         :param proof:
+        :param block: if given, the proof must have been found for this block's content (see Block.get_content_digest)
+        :param difficulty: if given, the proof must be for at least this difficulty (see get_layer_difficulty)
         :return:
         """
         return True
 
+    def verify_pows(self, proofs, blocks=None, difficulty=None):
+        """
+        Returns a list of the verification results of the proofs
+        :param proofs:
+        :param blocks: if given, the blocks (or block views) each proof must have been found for
+        :param difficulty: an optional difficulty every proof must be for
+        :return:
+        """
+        if blocks is None:
+            blocks = [None] * len(proofs)
+
+        return [self.verify_pow(proof, block, difficulty) for proof, block in zip(proofs, blocks)]
+
+    def get_proof_difficulty(self, proof):
+        """
+        Returns the difficulty a proof was found for (None if the protocol's proofs don't tell)
+        :param proof:
+        :return:
+        """
+        return None
+
+    def get_layer_difficulty(self, mesh, layer_id):
+        """
+        Returns the difficulty the blocks of a layer must be mined at (None if the protocol doesn't require one)
+        :param mesh:
+        :param layer_id:
+        :return:
+        """
+        if self.difficulty_controller is None or mesh is None:
+            return None
+
+        return self.difficulty_controller.get_difficulty(mesh, layer_id)
+
     def adjust_difficulty(self, mesh):
-        pass
+        """
+        Sets the difficulty to the one of the layer following the last valid layer, the layer being mined
+        (this is called for every arriving block)
+        :param mesh:
+        :return:
+        """
+        difficulty = self.get_layer_difficulty(mesh, mesh.get_last_valid_layer() + 1)
+        if difficulty is not None:
+            self.difficulty = difficulty
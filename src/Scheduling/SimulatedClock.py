@@ -0,0 +1,19 @@
+class SimulatedClock:
+    """
+    A clock whose time only moves when it's advanced (by a TimerScheduler running a simulation)
+    """
+
+    def __init__(self, start_ts=0.0):
+        # The current simulated time in seconds
+        self.now = start_ts
+
+    def time(self):
+        return self.now
+
+    def advance_to(self, ts):
+        """
+        Moves the time forward to ts (the time never moves backwards)
+        :param ts:
+        :return:
+        """
+        self.now = max(self.now, ts)
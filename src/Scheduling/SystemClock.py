@@ -0,0 +1,18 @@
+import time
+
+
+class SystemClock:
+    """
+    The wall clock
+    """
+
+    def time(self):
+        return time.time()
+
+    def advance_to(self, ts):
+        """
+        The wall clock can't be advanced, waiting for it is left to the scheduler's thread
+        :param ts:
+        :return:
+        """
+        raise NotImplementedError("The system clock can't be advanced")
@@ -0,0 +1,176 @@
+import heapq
+import threading
+
+from Scheduling.SystemClock import SystemClock
+
+
+class TimerScheduler:
+    """
+    Owns deadlines of callbacks, kept in a heap by deadline (and scheduling order among equal deadlines)
+    Cancelled deadlines stay in the heap and are skipped once they reach its top
+    With the system clock, the callbacks are run by a single thread sleeping until the next deadline
+    With a simulated clock, run_until jumps the clock from deadline to deadline, so simulations run faster than real time
+    """
+
+    def __init__(self, clock=None):
+        self.clock = clock or SystemClock()
+
+        # Heap of (deadline, handle, callback, args) of the scheduled callbacks
+        self.deadlines = []
+
+        # Handles of the scheduled callbacks which didn't run and weren't cancelled
+        self.pending = set()
+
+        # Number of callbacks scheduled so far, used as handles
+        self.scheduled = 0
+
+        # Guards the heap, notified whenever it changes (so the running thread re-checks the next deadline)
+        self.changed = threading.Condition()
+
+        # The thread running the callbacks (None unless started, and never used with a simulated clock)
+        self.thread = None
+        self.stopped = False
+
+    def schedule(self, delay_seconds, callback, *args):
+        """
+        Schedules callback(*args) delay_seconds from now
+        Returns a handle of the scheduled callback, used to cancel it
+        :param delay_seconds:
+        :param callback:
+        :param args:
+        :return:
+        """
+        with self.changed:
+            self.scheduled += 1
+            heapq.heappush(self.deadlines, (self.clock.time() + delay_seconds, self.scheduled, callback, args))
+            self.pending.add(self.scheduled)
+            self.changed.notify()
+            return self.scheduled
+
+    def cancel(self, handle):
+        """
+        Cancels a scheduled callback (callbacks which already ran and None handles are ignored)
+        :param handle:
+        :return:
+        """
+        with self.changed:
+            self.pending.discard(handle)
+
+    def reschedule(self, handle, delay_seconds, callback, *args):
+        """
+        Cancels a scheduled callback and schedules callback(*args) delay_seconds from now instead
+        Returns the new handle
+        :param handle:
+        :param delay_seconds:
+        :param callback:
+        :param args:
+        :return:
+        """
+        self.cancel(handle)
+        return self.schedule(delay_seconds, callback, *args)
+
+    def get_next_deadline(self):
+        """
+        Returns the earliest deadline of a pending callback (None if there's none)
+        :return:
+        """
+        with self.changed:
+            while self.deadlines and self.deadlines[0][1] not in self.pending:
+                heapq.heappop(self.deadlines)
+
+            return self.deadlines[0][0] if self.deadlines else None
+
+    def pop_due(self, ts):
+        """
+        Removes and returns the earliest pending callback and its arguments if its deadline is at most ts
+        :param ts:
+        :return:
+        """
+        with self.changed:
+            next_deadline = self.get_next_deadline()
+            if next_deadline is None or next_deadline > ts:
+                return None
+
+            deadline, handle, callback, args = heapq.heappop(self.deadlines)
+            self.pending.discard(handle)
+            return callback, args
+
+    def run_due(self):
+        """
+        Runs the callbacks whose deadline passed, in deadline order
+        Returns the number of callbacks run
+        :return:
+        """
+        callbacks_run = 0
+        due = self.pop_due(self.clock.time())
+        while due is not None:
+            callback, args = due
+            callback(*args)
+            callbacks_run += 1
+            due = self.pop_due(self.clock.time())
+
+        return callbacks_run
+
+    def run_until(self, condition, max_seconds=None):
+        """
+        Runs the callbacks in deadline order, advancing the (simulated) clock to each deadline,
+        until condition() is True, no callbacks are left or the next deadline is after max_seconds
+        Returns the number of callbacks run
+        :param condition:
+        :param max_seconds:
+        :return:
+        """
+        callbacks_run = 0
+        while not condition():
+            next_deadline = self.get_next_deadline()
+            if next_deadline is None or (max_seconds is not None and next_deadline > max_seconds):
+                break
+
+            self.clock.advance_to(next_deadline)
+            callback, args = self.pop_due(next_deadline)
+            callback(*args)
+            callbacks_run += 1
+
+        return callbacks_run
+
+    def start(self):
+        """
+        Starts the thread running the callbacks as their deadlines pass on the clock
+        :return:
+        """
+        if self.thread is None:
+            self.stopped = False
+            self.thread = threading.Thread(target=self.run_deadlines)
+            self.thread.daemon = True
+            self.thread.start()
+
+    def stop(self):
+        if self.thread is not None:
+            with self.changed:
+                self.stopped = True
+                self.changed.notify()
+
+            self.thread.join()
+            self.thread = None
+
+    def run_deadlines(self):
+        """
+        The main loop of the scheduler's thread, sleeping until the next deadline (or until the deadlines change)
+        :return:
+        """
+        while True:
+            with self.changed:
+                if self.stopped:
+                    return
+
+                next_deadline = self.get_next_deadline()
+                if next_deadline is None:
+                    self.changed.wait()
+                    continue
+
+                wait_seconds = next_deadline - self.clock.time()
+                if wait_seconds > 0:
+                    self.changed.wait(wait_seconds)
+                    continue
+
+            self.run_due()
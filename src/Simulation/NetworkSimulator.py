@@ -0,0 +1,240 @@
+import random
+import resource
+from timeit import default_timer
+
+from DataSturcutres.Block import Block
+from DataSturcutres.BlockView import BlockView
+from DataSturcutres.Mesh import Mesh
+from MeshcashMiner import MeshcashMiner
+from Scheduling.SimulatedClock import SimulatedClock
+from Scheduling.TimerScheduler import TimerScheduler
+from Simulation.SimulatedPowProtocol import SimulatedPoWProtocol
+
+
+def get_percentile(sorted_values, percentile):
+    if not sorted_values:
+        return None
+
+    return sorted_values[min(int(len(sorted_values) * percentile / 100.0), len(sorted_values) - 1)]
+
+
+class NetworkSimulator:
+    """
+    Runs a network of miners in a single process, on a seeded simulated clock
+    The network's events and the miners' deadlines are all run by a single scheduler jumping the clock between them
+    Every miner finds blocks at random times (a Poisson process), running its mining loop's steps (resetting the
+    challenge and taking a copy of its currently mined block with the found proof), and the block is then published:
+    it's sent encoded to every other miner with a random delay, and lost sends are retransmitted
+    Received blocks are decoded into the receiver's own mesh once the blocks they point are known and are received
+    by its mesh, whose ingestion pipeline delivers them to the miner (on the simulation's thread)
+    A layer is agreed on once the valid recent blocks (the hare protocol's output) of every miner agree about it
+    The network is deterministic for a seed, only the measured (wall clock) handling times vary
+    An optional MetricsRegistry is shared by all miners, adding up their hot path metrics
+    """
+
+    def __init__(self, miners_count=10, tmin=10, blocks_per_second=1.0, network_delay_seconds=0.5,
+                 delay_jitter_seconds=0.5, loss_rate=0.0, retransmit_seconds=2.0, delta_seconds=30,
+                 delta_coin_seconds=120, seed=0, metrics=None):
+        # The simulation's random generator, everything random in the network is drawn from it
+        self.rand = random.Random(seed)
+        self.clock = SimulatedClock()
+        self.scheduler = TimerScheduler(self.clock)
+
+        # Mean number of blocks found by the whole network per simulated second
+        self.blocks_per_second = blocks_per_second
+
+        # A send takes network_delay_seconds plus an exponentially distributed jitter (of mean delay_jitter_seconds)
+        self.network_delay_seconds = network_delay_seconds
+        self.delay_jitter_seconds = delay_jitter_seconds
+
+        # Probability of a send being lost, lost sends are retried retransmit_seconds later
+        self.loss_rate = loss_rate
+        self.retransmit_seconds = retransmit_seconds
+
+        peak_memory = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        self.miners = []
+        for miner_index in range(miners_count):
+            miner = MeshcashMiner('miner-%d' % miner_index, Mesh(tmin=tmin, clock=self.clock),
+                                  pow_protocol=SimulatedPoWProtocol(self.rand), scheduler=self.scheduler,
+                                  metrics=metrics)
+            miner.delta_seconds = delta_seconds
+            miner.delta_coin_seconds = delta_coin_seconds
+            miner.load_view()
+            miner.mesh.arriving_blocks.register(miner.handle_arriving_blocks, start_thread=False)
+            self.miners.append(miner)
+
+        # Per miner, the ids of the blocks it received and the blocks waiting for a pointed block
+        # (mapping of the missing block id to the waiting blocks' encodings and ids)
+        self.received = [set() for miner in self.miners]
+        self.orphans = [{} for miner in self.miners]
+
+        # Mapping of published block id to its layer id and publishing time
+        self.published = {}
+
+        # Per miner, a mapping of layer id to the ids of the layer's blocks among the miner's valid recent blocks
+        # and the time they last changed
+        self.valid_blocks = [{} for miner in self.miners]
+
+        # Whether miners keep finding blocks (cleared once the network reached the simulated layer)
+        self.mining = True
+
+        # Wall clock seconds spent handling every received block
+        self.handle_seconds = []
+
+        # Peak resident memory of the process (in KB) before creating the miners
+        self.start_peak_memory = peak_memory
+
+    def run(self, layers_count, max_simulated_seconds=None):
+        """
+        Runs the network until every miner reached layers_count (or the simulated time is over)
+        then stops finding blocks and delivers the blocks which are still on the way
+        Returns the simulation's statistics
+        :param layers_count:
+        :param max_simulated_seconds:
+        :return:
+        """
+        for miner_index in range(len(self.miners)):
+            self.schedule_block(miner_index)
+
+        start = default_timer()
+        self.scheduler.run_until(lambda: min(miner.layer_counter for miner in self.miners) > layers_count,
+                                 max_simulated_seconds)
+        self.mining = False
+        self.scheduler.run_until(lambda: False)
+        return self.get_stats(default_timer() - start)
+
+    def schedule_block(self, miner_index):
+        """
+        Schedules the next block found by a miner
+        :param miner_index:
+        :return:
+        """
+        miner_rate = self.blocks_per_second / len(self.miners)
+        self.scheduler.schedule(self.rand.expovariate(miner_rate), self.publish_block, miner_index)
+
+    def publish_block(self, miner_index):
+        """
+        Publishes a copy of the miner's currently mined block along with a proof and sends it to every miner
+        :param miner_index:
+        :return:
+        """
+        if not self.mining:
+            return
+
+        miner = self.miners[miner_index]
+        miner.reset_challenge()
+        success, proof = miner.pow_protocol.try_single_nonce()
+        block = miner.get_mined_block(proof)
+        data = block.serialize()
+        block_id = block.generate_block_id()
+        self.published[block_id] = (block.layerId, self.clock.time())
+
+        for receiver_index in range(len(self.miners)):
+            if receiver_index == miner_index:
+                self.receive_block(receiver_index, data, block_id)
+            else:
+                self.send_block(receiver_index, data, block_id)
+
+        self.schedule_block(miner_index)
+
+    def send_block(self, receiver_index, data, block_id):
+        delay = self.network_delay_seconds + self.rand.expovariate(1.0 / self.delay_jitter_seconds)
+        if self.rand.random() < self.loss_rate:
+            self.scheduler.schedule(self.retransmit_seconds, self.send_block, receiver_index, data, block_id)
+        else:
+            self.scheduler.schedule(delay, self.receive_block, receiver_index, data, block_id)
+
+    def receive_block(self, receiver_index, data, block_id):
+        """
+        Decodes a received block and hands it to the miner's mesh, or keeps it until the blocks it points arrive
+        :param receiver_index:
+        :param data:
+        :param block_id:
+        :return:
+        """
+        if block_id in self.received[receiver_index]:
+            return
+
+        miner = self.miners[receiver_index]
+        view = BlockView(data)
+        for pointed_block_id in view.get_view_head_ids() + view.get_valid_recent_block_ids():
+            pointed_block_id = pointed_block_id.tobytes()
+            if pointed_block_id not in miner.mesh.blocks:
+                self.orphans[receiver_index].setdefault(pointed_block_id, []).append((data, block_id))
+                return
+
+        self.received[receiver_index].add(block_id)
+        block = Block.deserialize(data, miner.mesh.blocks)
+
+        start = default_timer()
+        miner.mesh.receive_block(block)
+        miner.mesh.arriving_blocks.deliver_pending_blocks()
+        self.handle_seconds.append(default_timer() - start)
+        self.update_valid_blocks(receiver_index)
+
+        for waiting_data, waiting_block_id in self.orphans[receiver_index].pop(block_id, []):
+            self.receive_block(receiver_index, waiting_data, waiting_block_id)
+
+    def update_valid_blocks(self, miner_index):
+        """
+        Records the changes in a miner's valid recent blocks, per layer
+        A layer's valid blocks are kept as they were last decided once it leaves the hare protocol's consensus interval
+        :param miner_index:
+        :return:
+        """
+        layers = {}
+        for block in self.miners[miner_index].voting_edges:
+            layers.setdefault(block.layerId, set()).add(block.generate_block_id())
+
+        miner_valid_blocks = self.valid_blocks[miner_index]
+        for layer_id, block_ids in layers.items():
+            if layer_id not in miner_valid_blocks or miner_valid_blocks[layer_id][0] != block_ids:
+                miner_valid_blocks[layer_id] = (block_ids, self.clock.time())
+
+    def get_layer_agreement_seconds(self):
+        """
+        Returns a mapping of every completed layer to the simulated seconds from its first block's publishing
+        until the valid blocks of all miners were the same for it (from then on, they didn't change)
+        None if the miners ended up with different valid blocks for the layer
+        :return:
+        """
+        first_published_ts = {}
+        for block_id, (layer_id, published_ts) in self.published.items():
+            first_published_ts[layer_id] = min(first_published_ts.get(layer_id, published_ts), published_ts)
+
+        agreement_seconds = {}
+        for layer_id in range(1, min(miner.layer_counter for miner in self.miners)):
+            decisions = [miner_valid_blocks.get(layer_id) for miner_valid_blocks in self.valid_blocks]
+            if layer_id not in first_published_ts or None in decisions or \
+                    any(block_ids != decisions[0][0] for block_ids, decided_ts in decisions):
+                agreement_seconds[layer_id] = None
+                continue
+
+            agreement_seconds[layer_id] = max(decided_ts for block_ids, decided_ts in decisions) - \
+                first_published_ts[layer_id]
+
+        return agreement_seconds
+
+    def get_stats(self, wall_seconds):
+        handle_seconds = sorted(self.handle_seconds)
+        agreement_seconds = self.get_layer_agreement_seconds()
+        agreed_seconds = sorted(seconds for seconds in agreement_seconds.values() if seconds is not None)
+        peak_memory = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return {
+            'miners': len(self.miners),
+            'published_blocks': len(self.published),
+            'handled_blocks': len(handle_seconds),
+            'simulated_seconds': self.clock.time(),
+            'wall_seconds': wall_seconds,
+            'blocks_per_second': len(handle_seconds) / wall_seconds if wall_seconds else None,
+            'handle_ms_p50': 1000 * get_percentile(handle_seconds, 50) if handle_seconds else None,
+            'handle_ms_p90': 1000 * get_percentile(handle_seconds, 90) if handle_seconds else None,
+            'handle_ms_p99': 1000 * get_percentile(handle_seconds, 99) if handle_seconds else None,
+            # Not a measurement of a single miner: the growth of the whole process's peak resident memory
+            # (including the simulator's own state) divided by the number of miners
+            'peak_rss_kb_per_miner': (peak_memory - self.start_peak_memory) / float(len(self.miners)),
+            'layers_agreed': len(agreed_seconds),
+            'layers_disagreed': len(agreement_seconds) - len(agreed_seconds),
+            'agreement_seconds_p50': get_percentile(agreed_seconds, 50),
+            'agreement_seconds_max': agreed_seconds[-1] if agreed_seconds else None,
+        }
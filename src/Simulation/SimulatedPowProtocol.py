@@ -0,0 +1,33 @@
+import struct
+
+from PoW.PowProtocol import PoWProtocol
+
+# Simulated proofs are random 64 bit values
+PROOF_FORMAT = '>Q'
+PROOF_SIZE = struct.calcsize(PROOF_FORMAT)
+
+
+class SimulatedPoWProtocol(PoWProtocol):
+    """
+    Proofs-of-work for simulations, in which the time to find a block is drawn by the simulator instead of searched
+    A proof is a random value (so the weak coin remains random), any proof of the right size is valid
+    """
+
+    def __init__(self, rand):
+        PoWProtocol.__init__(self)
+
+        # The simulation's seeded random generator
+        self.rand = rand
+
+    def try_single_nonce(self):
+        """
+        The simulator draws the times at which blocks are found, so every try succeeds
+        :return:
+        """
+        return True, self.get_proof(None, None)
+
+    def get_proof(self, header, nonce):
+        return struct.pack(PROOF_FORMAT, self.rand.getrandbits(64))
+
+    def verify_pow(self, proof, block=None, difficulty=None):
+        return isinstance(proof, bytes) and len(proof) == PROOF_SIZE
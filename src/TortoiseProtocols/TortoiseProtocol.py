@@ -0,0 +1,161 @@
+from itertools import chain
+
+from TortoiseProtocols.TortoiseTally import TortoiseTally
+
+
+class TortoiseProtocol:
+    """
+    A slow but safe consensus protocol over the old layers of the mesh
+    Every block votes for the blocks of earlier layers in its view and against the rest
+    Votes are counted once, when the voter's layer closes, into running per-layer tallies
+    so confirming a block is a lookup of its margin instead of a recount over all of its descendants
+    A voter's view of the voted layers is merged from the views of the blocks it points (kept for the horizon's layers),
+    so closing a layer costs a bitset union per edge and layer instead of resolving each voter's view anew
+    """
+
+    def __init__(self, horizon=50):
+        # Number of layers below a closing layer whose tallies are updated by its votes
+        # Tallies of older layers are frozen (their margins no longer change)
+        self.horizon = horizon
+
+        # The mesh the opinions are about
+        self.mesh = None
+
+        # The mesh's reachability index, setting the positions of the blocks in the tallies
+        self.reachability = None
+
+        # Mapping of layer id to the views of its blocks within the horizon (block -> layer id -> positions bitset)
+        # Only the views of the last horizon closed layers are kept, older blocks' views are below any voted layer
+        self.views = {}
+
+        # Mapping of closed layer ids to the votes about their blocks
+        self.layerTallies = {}
+
+        # The id of the last closed layer (-1 if no layer was closed)
+        self.lastClosedLayer = -1
+
+    def set_block_opinions(self, mesh, current_layer):
+        """
+        Counts the votes of the mesh's layers preceding the current layer, layer by layer
+        :param mesh:
+        :param current_layer:
+        :return:
+        """
+        self.mesh = mesh
+        self.reachability = mesh.reachability
+        self.layerTallies = {}
+        self.views = {}
+        self.lastClosedLayer = -1
+
+        for layer_id in range(current_layer):
+            self.close_layer(layer_id)
+
+    def close_layer(self, layer_id):
+        """
+        Counts the votes of a layer's blocks about the blocks of the previous layers (within the horizon)
+        and starts counting votes about the layer's blocks
+        Blocks arriving to a layer after it was closed don't vote
+        :param layer_id:
+        :return:
+        """
+        if layer_id <= self.lastClosedLayer:
+            return
+
+        layer = self.mesh.get_layer(layer_id)
+        layer_blocks = layer.blocks if layer is not None else []
+        first_voted_layer_id = max(layer_id - self.horizon, 0)
+        voter_views = [self.get_view(block) for block in layer_blocks]
+        for voted_layer_id in range(first_voted_layer_id, layer_id):
+            tally = self.layerTallies.get(voted_layer_id)
+            if tally is None:
+                continue
+
+            for view in voter_views:
+                tally.add_voter(view.get(voted_layer_id, 0))
+
+        self.layerTallies[layer_id] = TortoiseTally(layer_id)
+        self.lastClosedLayer = layer_id
+
+        # Blocks of later layers only vote about layers above first_voted_layer_id
+        self.drop_views(first_voted_layer_id + 1)
+
+    def get_view(self, block):
+        """
+        Returns the positions of the blocks in a block's view, by layer, for the layers within the horizon below it
+        The view is merged from the (memoized) views of the blocks it points
+        :param block:
+        :return:
+        """
+        layer_views = self.views.setdefault(block.layerId, {})
+        if block in layer_views:
+            return layer_views[block]
+
+        first_layer_id = max(block.layerId - self.horizon, 0)
+        positions = self.reachability.positions
+        view = {}
+        for pointed_block in set(chain(block.viewHeads, block.validRecentBlocks)):
+            if pointed_block.layerId < first_layer_id or pointed_block not in positions:
+                # Below the horizon, or compacted out of the mesh
+                continue
+
+            view[pointed_block.layerId] = view.get(pointed_block.layerId, 0) | 1 << positions[pointed_block]
+            for layer_id, bits in self.get_view(pointed_block).items():
+                if layer_id >= first_layer_id:
+                    view[layer_id] = view.get(layer_id, 0) | bits
+
+        layer_views[block] = view
+        return view
+
+    def forget_layers(self, layer_id):
+        """
+        Drops the tallies of the layers below layer_id (whose blocks were compacted out of the mesh)
+        :param layer_id:
+        :return:
+        """
+        for tally_layer_id in [tally_layer_id for tally_layer_id in self.layerTallies if tally_layer_id < layer_id]:
+            del self.layerTallies[tally_layer_id]
+
+        self.drop_views(layer_id)
+
+    def drop_views(self, layer_id):
+        """
+        Drops the memoized views of the blocks of the layers below layer_id
+        :param layer_id:
+        :return:
+        """
+        for view_layer_id in [view_layer_id for view_layer_id in self.views if view_layer_id < layer_id]:
+            del self.views[view_layer_id]
+
+    def get_margin(self, block):
+        """
+        Returns the sum of votes for and against a block of a closed layer
+        :param block:
+        :return:
+        """
+        return self.layerTallies[block.layerId].get_margin(self.reachability.positions[block])
+
+    def is_confirmed(self, block, margin):
+        """
+        Returns True if the block is in a closed layer and its margin is at least margin
+        :param block:
+        :param margin:
+        :return:
+        """
+        if block.layerId not in self.layerTallies or block not in self.reachability.positions:
+            return False
+
+        return self.get_margin(block) >= margin
+
+    def get_confirmed_blocks(self, layer_id, margin):
+        """
+        Returns the blocks of a closed layer whose margin is at least margin
+        :param layer_id:
+        :param margin:
+        :return:
+        """
+        if layer_id not in self.layerTallies:
+            return []
+
+        tally = self.layerTallies[layer_id]
+        return [block for position, block in enumerate(self.reachability.layer_blocks.get(layer_id, []))
+                if tally.get_margin(position) >= margin]
@@ -0,0 +1,52 @@
+class TortoiseTally:
+    """
+    Running votes about the blocks of a single layer that were decided by the tortoise protocol
+    Every voter votes for the blocks in its view and against the rest, so only the votes for are counted per block
+    and a block's margin is twice its votes for minus the number of voters
+    The votes for are kept as bit-sliced counters: plane i holds bit i of every block's count (by reachability position),
+    so the votes of a voter are added with a few bitset operations regardless of the number of blocks it points
+    """
+
+    def __init__(self, layer_id):
+        self.layerId = layer_id
+
+        # Number of blocks that voted about this layer's blocks
+        self.voters = 0
+
+        # The bit planes of the votes for counters (least significant first)
+        self.planes = []
+
+    def add_voter(self, bits):
+        """
+        Counts the votes of a voter
+        :param bits: the bitset of the layer's block positions in the voter's view
+        :return:
+        """
+        self.voters += 1
+
+        # Ripple carry addition of a single bit to every counter
+        plane_index = 0
+        while bits:
+            if plane_index == len(self.planes):
+                self.planes.append(0)
+
+            plane = self.planes[plane_index]
+            self.planes[plane_index] = plane ^ bits
+            bits &= plane
+            plane_index += 1
+
+    def get_votes_for(self, position):
+        """
+        Returns the number of voters which had the block at position in their view
+        :param position:
+        :return:
+        """
+        return sum([((plane >> position) & 1) << plane_index for plane_index, plane in enumerate(self.planes)])
+
+    def get_margin(self, position):
+        """
+        Returns the sum of votes for and against the block at position
+        :param position:
+        :return:
+        """
+        return 2 * self.get_votes_for(position) - self.voters
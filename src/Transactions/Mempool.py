@@ -0,0 +1,144 @@
+import heapq
+from collections import OrderedDict
+from itertools import islice
+
+
+class Mempool:
+    """
+    Pending and confirmed transactions, indexed by transaction id
+    Pending transactions are kept in admission order (so expiring and picking the oldest transactions is O(1) each)
+    along with a heap of their fees, used to evict the cheapest transaction when the pool is full
+    Removed transactions are left in the heap and skipped when they reach its top (the heap is compacted when they pile up)
+    """
+
+    def __init__(self, max_pending=100000):
+        # Maximal number of pending transactions
+        self.max_pending = max_pending
+
+        # Mapping of pending transaction id to (transaction, fee, admission layer id, admission sequence number)
+        self.pending = OrderedDict()
+
+        # Heap of (fee, admission sequence number, transaction id) of pending transactions (and of removed ones)
+        self.fees = []
+
+        # Mapping of confirmed transaction id to the first layer id in which it was included (in confirmation order)
+        self.confirmed = OrderedDict()
+
+        # An optional function returning True for the ids of transactions confirmed in forgotten layers
+        # (see forget_confirmed)
+        self.is_archived = None
+
+        # Number of transactions admitted so far, used as admission sequence numbers
+        self.admitted = 0
+
+    def add_transaction(self, tx, layer_id, fee=0):
+        """
+        Admits a transaction to the pending transactions
+        Returns False if it's already pending or confirmed, or if the pool is full and its fee is lower than the lowest
+        (otherwise the oldest of the cheapest transactions is evicted, so a full pool of equal fees keeps the newest)
+        :param tx:
+        :param layer_id: the layer in which the transaction was received
+        :param fee:
+        :return:
+        """
+        tx_id = tx.generate_tx_id()
+        if self.contains_id(tx_id):
+            return False
+
+        if len(self.pending) >= self.max_pending:
+            lowest_fee, lowest_tx_id = self.get_lowest_fee()
+            if fee < lowest_fee:
+                return False
+
+            self.remove_transaction(lowest_tx_id)
+
+        self.pending[tx_id] = (tx, fee, layer_id, self.admitted)
+        heapq.heappush(self.fees, (fee, self.admitted, tx_id))
+        self.admitted += 1
+        return True
+
+    def remove_transaction(self, tx_id):
+        """
+        Removes a pending transaction (its heap entry is discarded lazily)
+        :param tx_id:
+        :return:
+        """
+        if self.pending.pop(tx_id, None) is not None and len(self.fees) > 2 * len(self.pending) + 64:
+            self.fees = [(fee, sequence, fee_tx_id) for fee, sequence, fee_tx_id in self.fees
+                         if self.is_pending(fee_tx_id, sequence)]
+            heapq.heapify(self.fees)
+
+    def is_pending(self, tx_id, sequence):
+        entry = self.pending.get(tx_id)
+        return entry is not None and entry[3] == sequence
+
+    def get_lowest_fee(self):
+        """
+        Returns the lowest fee of a pending transaction and the transaction's id (the oldest among equal fees)
+        :return:
+        """
+        while not self.is_pending(self.fees[0][2], self.fees[0][1]):
+            heapq.heappop(self.fees)
+
+        fee, sequence, tx_id = self.fees[0]
+        return fee, tx_id
+
+    def contains(self, tx):
+        return self.contains_id(tx.generate_tx_id())
+
+    def contains_id(self, tx_id):
+        return tx_id in self.pending or self.is_confirmed_id(tx_id)
+
+    def is_confirmed(self, tx):
+        return self.is_confirmed_id(tx.generate_tx_id())
+
+    def is_confirmed_id(self, tx_id):
+        return tx_id in self.confirmed or (self.is_archived is not None and self.is_archived(tx_id))
+
+    def confirm_transactions(self, txs, layer_id):
+        """
+        Marks transactions as confirmed in a layer and evicts them from the pending transactions
+        :param txs:
+        :param layer_id:
+        :return:
+        """
+        for tx in txs:
+            tx_id = tx.generate_tx_id()
+            self.confirmed.setdefault(tx_id, layer_id)
+            self.remove_transaction(tx_id)
+
+    def forget_confirmed(self, layer_id):
+        """
+        Forgets the transactions confirmed before layer_id (these are then only known through is_archived)
+        Layers are confirmed in order, so only the forgotten transactions are visited
+        :param layer_id:
+        :return:
+        """
+        while self.confirmed:
+            tx_id = next(iter(self.confirmed))
+            if self.confirmed[tx_id] >= layer_id:
+                break
+
+            del self.confirmed[tx_id]
+
+    def evict_expired(self, layer_id):
+        """
+        Evicts pending transactions received before layer_id
+        :param layer_id:
+        :return:
+        """
+        while self.pending:
+            tx_id = next(iter(self.pending))
+            if self.pending[tx_id][2] >= layer_id:
+                break
+
+            self.remove_transaction(tx_id)
+
+    def get_block_txs(self, max_count):
+        """
+        Returns up to max_count pending transactions to include in a block, the oldest first
+        Only the returned transactions are visited
+        :param max_count:
+        :return:
+        """
+        return [self.pending[tx_id][0] for tx_id in islice(self.pending, max_count)]
@@ -1,6 +1,11 @@
+import hashlib
+
+
 class Transaction:
-    def __init__(self):
-        pass
+    def __init__(self, payload=b''):
+        # The encoded content of the transaction
+        # Its structure is opaque to the mesh, which only stores and hashes it
+        self.payload = payload
 
     def is_syntactically_valid(self):
         """
@@ -10,3 +15,26 @@ class Transaction:
 
         # Not implemented at the moment
         return True
+
+    def serialize(self):
+        """
+        Returns the binary encoding of the transaction
+        :return:
+        """
+        return bytes(self.payload)
+
+    @staticmethod
+    def deserialize(data):
+        """
+        Returns the transaction encoded in data
+        :param data: bytes (or a memoryview over them)
+        :return:
+        """
+        return Transaction(bytes(data))
+
+    def generate_tx_id(self):
+        """
+        Return the transaction's id based on its content
+        :return:
+        """
+        return hashlib.sha256(self.serialize()).digest()
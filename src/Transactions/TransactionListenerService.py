@@ -1,18 +1,193 @@
+import threading
+from multiprocessing import Pool, cpu_count
+
+from Ingestion.DuplicateFilter import DuplicateFilter
+from Transactions.Transaction import Transaction
+
+try:
+    from queue import Queue, Empty, Full
+except ImportError:
+    from Queue import Queue, Empty, Full
+
+
+def validate_transactions(payloads):
+    """
+    Returns the validity of each of the encoded transactions (runs on the validation workers)
+    :param payloads:
+    :return:
+    """
+    return [Transaction.deserialize(payload).is_syntactically_valid() for payload in payloads]
+
+
 class TransactionListenerService:
     """
     Pub/Sub service for transactions
+    Arriving transactions are queued (through a bounded queue) and handled by a dispatching thread:
+    duplicates and known transactions are dropped, the rest are validated in batches by a pool of worker processes
+    Duplicates are caught by a rotating filter of recently seen ids, confirmed against the known transactions
+    and the valid ones are delivered to the subscribers in chunks
+    Validation runs outside the miner's process, so a flood of transactions doesn't take its CPU time
     """
 
-    def __init__(self):
-        pass
+    def __init__(self, workers_count=None, is_known=None, validate_func=validate_transactions,
+                 max_pending_txs=100000, max_batch_size=4096, tx_filter=None):
+        # Number of validation processes (one per core by default, 0 validates on the dispatching thread)
+        self.workers_count = cpu_count() if workers_count is None else workers_count
+
+        # An optional function returning True for ids of transactions that were already confirmed (or are pending)
+        # These transactions are neither validated nor delivered
+        self.is_known = is_known
+
+        # A function returning the validity of each of a list of encoded transactions
+        # It's called on the validation workers, so it must be defined at a module's top level
+        self.validate_func = validate_func
+
+        # Arriving transactions waiting to be dispatched
+        self.pending_txs = Queue(maxsize=max_pending_txs)
+
+        # Maximal number of transactions validated (and delivered) together
+        self.max_batch_size = max_batch_size
+
+        # Ids of recently dispatched transactions, used to drop duplicates without looking them up
+        # (a DuplicateFilter, rotated by the layers of whoever knows them)
+        self.tx_filter = tx_filter or DuplicateFilter(self.is_known_id)
 
-    def register_for_new_arriving_transactions(self, handle_new_transaction):
+        # Functions called with every chunk of valid arriving transactions
+        self.subscribers = []
+
+        # The dispatching thread and the validation workers, started with the first subscriber
+        self.thread = None
+        self.pool = None
+
+        # Number of transactions validated and number of these found valid
+        self.validated_count = 0
+        self.valid_count = 0
+
+    def register_for_new_arriving_transactions(self, handle_new_transactions):
+        """
+        Adds handle_new_transactions to the subscribers list
+         so that it'll be called back with every chunk (list) of new arriving valid transactions
+        :param handle_new_transactions:
+        :return:
+        """
+        self.subscribers.append(handle_new_transactions)
+        if self.thread is None:
+            self.start()
+
+    def start(self):
+        if self.workers_count > 0:
+            self.pool = Pool(self.workers_count)
+
+        self.thread = threading.Thread(target=self.dispatch_transactions)
+        self.thread.daemon = True
+        self.thread.start()
+
+    def stop(self):
         """
-        Adds handle_new_transaction to the subscribers list
-         so that it'll be called back upon every new arriving transaction
-        :param handle_new_transaction:
+        Stops the dispatching thread and the workers once the already queued transactions are delivered
         :return:
         """
+        if self.thread is not None:
+            self.pending_txs.put(None)
+            self.thread.join()
+            self.thread = None
+
+        if self.pool is not None:
+            self.pool.close()
+            self.pool.join()
+            self.pool = None
+
+    def submit_transaction(self, tx, timeout=None):
+        """
+        Queues an arriving transaction, waiting up to timeout seconds (forever if None) while the queue is full
+        Returns False if the transaction wasn't queued
+        :param tx:
+        :param timeout:
+        :return:
+        """
+        try:
+            self.pending_txs.put(tx, timeout=timeout)
+        except Full:
+            return False
+
+        return True
+
+    def dispatch_transactions(self):
+        """
+        The main loop of the dispatching thread
+        Waits for a transaction to arrive, then takes along the rest of the queued transactions (up to the batch size)
+        :return:
+        """
+        while True:
+            tx = self.pending_txs.get()
+            if tx is None:
+                return
+
+            batch = [tx]
+            stop = False
+            while len(batch) < self.max_batch_size:
+                try:
+                    next_tx = self.pending_txs.get_nowait()
+                except Empty:
+                    break
+
+                if next_tx is None:
+                    stop = True
+                    break
+
+                batch.append(next_tx)
+
+            valid_txs = self.validate_batch(self.filter_new_transactions(batch))
+            if valid_txs:
+                for callback_func in self.subscribers:
+                    callback_func(valid_txs)
+
+            if stop:
+                return
+
+    def filter_new_transactions(self, txs):
+        """
+        Returns the transactions which weren't seen before and aren't known to the subscribers
+        :param txs:
+        :return:
+        """
+        new_txs = []
+        batch_tx_ids = set()
+        for tx in txs:
+            tx_id = tx.generate_tx_id()
+            if tx_id in batch_tx_ids or self.tx_filter.is_duplicate(tx_id):
+                continue
+
+            batch_tx_ids.add(tx_id)
+            if not self.is_known_id(tx_id):
+                new_txs.append(tx)
+
+        return new_txs
+
+    def is_known_id(self, tx_id):
+        return self.is_known is not None and self.is_known(tx_id)
+
+    def validate_batch(self, txs):
+        """
+        Returns the valid transactions, the batch is split evenly across the validation workers
+        :param txs:
+        :return:
+        """
+        if not txs:
+            return []
+
+        payloads = [tx.serialize() for tx in txs]
+        if self.pool is None:
+            results = self.validate_func(payloads)
+        else:
+            chunk_size = -(-len(payloads) // self.workers_count)
+            results = []
+            for chunk_results in self.pool.map(self.validate_func,
+                                               [payloads[i:i + chunk_size]
+                                                for i in range(0, len(payloads), chunk_size)]):
+                results.extend(chunk_results)
 
-        # Remains unimplemented at this point
-        pass
+        valid_txs = [tx for tx, valid in zip(txs, results) if valid]
+        self.validated_count += len(txs)
+        self.valid_count += len(valid_txs)
+        return valid_txs
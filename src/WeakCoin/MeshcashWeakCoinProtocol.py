@@ -1,10 +1,25 @@
-from WeakCoinProtocol import WeakCoinProtocol
+import hashlib
+
+from WeakCoin.WeakCoinProtocol import WeakCoinProtocol
 
 
 class MeshcashWeakCoinProtocol(WeakCoinProtocol):
+    """
+    The weak coin is the LSB of the minimal proofs-of-work of the freshly-generated blocks
+    Hash based proofs are ranked by their hash rather than by their bytes, which start with the difficulty
+    and end with the nonce the miner picked, so neither a claimed difficulty nor a chosen nonce sets the coin
+    Fresh blocks can be observed one by one as they arrive, keeping the minimal proofs-of-work (and the coin) at hand
+    """
+
     def __init__(self):
         WeakCoinProtocol.__init__(self)
 
+        # The rank of the minimal proofs-of-work of the observed blocks (None if no block was observed)
+        self.min_pow = None
+
+        # The coin based on the minimal proofs-of-work
+        self.coin = None
+
     def output_coin(self, fresh_blocks):
         """
         Output the coin based on the LSB of the minimal freshly-generated blocks
@@ -14,4 +29,58 @@ class MeshcashWeakCoinProtocol(WeakCoinProtocol):
         if len(fresh_blocks) == 0:
             raise Exception("No fresh blocks! Cannot compute the value of the weak coin")
 
-        return True if min([block.pow for block in fresh_blocks]) & 1 == 1 else 0
+        return self.get_pow_coin(min([self.get_pow_rank(block.pow) for block in fresh_blocks]))
+
+    def observe_block(self, block):
+        """
+        Consumes a freshly-generated block, updating the coin if its proofs-of-work is the new minimum
+        :param block:
+        :return:
+        """
+        pow_rank = self.get_pow_rank(block.pow)
+        if self.min_pow is None or pow_rank < self.min_pow:
+            self.min_pow = pow_rank
+            self.coin = self.get_pow_coin(pow_rank)
+
+    def observe_blocks(self, blocks):
+        """
+        Consumes a batch of freshly-generated blocks (e.g. a layer replayed from storage)
+        :param blocks:
+        :return:
+        """
+        if blocks:
+            self.observe_block(min(blocks, key=lambda block: self.get_pow_rank(block.pow)))
+
+    def reset(self):
+        self.min_pow = None
+        self.coin = None
+
+    def get_coin(self):
+        """
+        Returns the coin based on the observed blocks, same as output_coin over them
+        :return:
+        """
+        if self.min_pow is None:
+            raise Exception("No fresh blocks! Cannot compute the value of the weak coin")
+
+        return self.coin
+
+    @staticmethod
+    def get_pow_rank(proof):
+        """
+        Returns the value proofs-of-work are ordered by: the hash of a hash based proof, other proofs as they are
+        :param proof:
+        :return:
+        """
+        if isinstance(proof, bytes):
+            return hashlib.sha256(proof).digest()
+
+        return proof
+
+    @staticmethod
+    def get_pow_coin(min_pow_rank):
+        if isinstance(min_pow_rank, bytes):
+            # Hashes are big endian bytes
+            min_pow_rank = bytearray(min_pow_rank)[-1]
+
+        return True if min_pow_rank & 1 == 1 else 0
@@ -4,3 +4,34 @@ class WeakCoinProtocol:
 
     def output_coin(self, fresh_blocks):
         return True
+
+    def observe_block(self, block):
+        """
+        Consumes a freshly-generated block of the current layer
+        :param block:
+        :return:
+        """
+        pass
+
+    def observe_blocks(self, blocks):
+        """
+        Consumes a batch of freshly-generated blocks (e.g. a layer replayed from storage)
+        :param blocks:
+        :return:
+        """
+        for block in blocks:
+            self.observe_block(block)
+
+    def reset(self):
+        """
+        Forgets the observed blocks, called at the start of every layer
+        :return:
+        """
+        pass
+
+    def get_coin(self):
+        """
+        Returns the coin based on the observed blocks
+        :return:
+        """
+        return True
@@ -0,0 +1,49 @@
+import os
+import random
+import sys
+
+# Modules are imported from the src directory, as when running from it
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from DataSturcutres.Block import Block
+from DataSturcutres.Mesh import Mesh
+from PoW.HashPowProtocol import HashPoWProtocol
+
+
+def build_history(layer_count, blocks_per_layer, tmin, invalid_ratio, seed=0):
+    """
+    Builds a mesh of layers whose blocks have proofs-of-work and point tmin + 1 random valid blocks of the previous layer
+    (all of them for the genesis layer)
+    Some blocks have a forged proof, these are pointed by no other block
+    :param layer_count:
+    :param blocks_per_layer:
+    :param tmin:
+    :param invalid_ratio:
+    :param seed:
+    :return:
+    """
+    rand = random.Random(seed)
+    pow_protocol = HashPoWProtocol(difficulty=4)
+    mesh = Mesh(tmin=tmin)
+    forged_blocks = set()
+    for layer_id in range(1, layer_count + 1):
+        prev_layer_blocks = [block for block in mesh.layers[layer_id - 1].blocks if block not in forged_blocks]
+        for i in range(blocks_per_layer):
+            block = Block()
+            block.layerId = layer_id
+            block.minerPk = 'miner-%d' % i
+            block.viewHeads = rand.sample(prev_layer_blocks, min(tmin + 1, len(prev_layer_blocks)))
+            if rand.random() < invalid_ratio:
+                block.pow = pow_protocol.get_proof(pow_protocol.get_block_header(block), 0)[:-1] + b'\xff'
+                forged_blocks.add(block)
+            else:
+                pow_protocol.set_challenge(block)
+                success, proof = pow_protocol.try_single_nonce()
+                while not success:
+                    success, proof = pow_protocol.try_single_nonce()
+
+                block.pow = proof
+
+            mesh.add_block(block)
+
+    return mesh
@@ -0,0 +1,35 @@
+import random
+
+from DataSturcutres.Block import Block
+from DataSturcutres.BlockTemplate import BlockTemplate
+from Transactions.Transaction import Transaction
+
+
+def build_blocks(count):
+    blocks = []
+    for i in range(count):
+        block = Block()
+        block.layerId = 1
+        block.minerPk = 'miner-%d' % i
+        block.pow = b'%d' % i
+        blocks.append(block)
+
+    return blocks
+
+
+def test_content_digest_follows_edge_changes():
+    rand = random.Random(0)
+    # The last block is another block with the first block's id
+    blocks = build_blocks(30) + build_blocks(1)
+    template = BlockTemplate()
+    template.set_field('layerId', 2)
+    template.add_txs([Transaction(b'tx')])
+
+    for i in range(200):
+        name = rand.choice(['viewHeads', 'validRecentBlocks'])
+        edges = rand.sample(blocks, rand.randrange(len(blocks)))
+
+        # Pointing the same block twice encodes its id once
+        edges += rand.sample(edges, min(len(edges), 2))
+        template.set_field(name, edges)
+        assert template.get_content_digest() == template.block.get_content_digest()
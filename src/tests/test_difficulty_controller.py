@@ -0,0 +1,87 @@
+from DataSturcutres.Block import Block
+from DataSturcutres.Mesh import Mesh
+from DataSturcutres.MeshStore import MeshStore
+from PoW.HashPowProtocol import HashPoWProtocol
+
+
+def build_mesh(blocks_per_layer, layer_count, tmin=2, store=None):
+    mesh = Mesh(tmin=tmin, store=store)
+    mesh.initialize()
+    for layer_id in range(1, layer_count + 1):
+        for i in range(blocks_per_layer):
+            add_block(mesh, layer_id, 'miner-%d' % i)
+
+    return mesh
+
+
+def add_block(mesh, layer_id, miner_pk):
+    block = Block()
+    block.layerId = layer_id
+    block.minerPk = miner_pk
+    block.viewHeads = list(mesh.layers[layer_id - 1].blocks)
+    block.pow = miner_pk.encode('utf-8')
+    mesh.add_block(block)
+
+
+def test_schedule_is_the_same_for_every_miner():
+    mesh = build_mesh(blocks_per_layer=8, layer_count=60)
+    early_pow_protocol = HashPoWProtocol(difficulty=100)
+    late_pow_protocol = HashPoWProtocol(difficulty=100)
+
+    # One miner schedules the layers as they're added, the other once all of them were
+    early_difficulties = [early_pow_protocol.get_layer_difficulty(build_mesh(8, layer_id - 1), layer_id)
+                          for layer_id in range(1, 61)]
+    late_difficulties = [late_pow_protocol.get_layer_difficulty(mesh, layer_id) for layer_id in range(1, 61)]
+
+    assert early_difficulties == late_difficulties
+
+
+def test_crowded_layers_raise_the_difficulty():
+    pow_protocol = HashPoWProtocol(difficulty=100)
+    mesh = build_mesh(blocks_per_layer=8, layer_count=60)
+    difficulties = [pow_protocol.get_layer_difficulty(mesh, layer_id) for layer_id in range(1, 61)]
+
+    # Twice the targeted 4 blocks per layer doubles the difficulty, once the first window is full
+    assert difficulties[:24] == [100] * 24
+    assert difficulties[24] == 200
+    assert difficulties == sorted(difficulties)
+
+    pow_protocol.adjust_difficulty(mesh)
+    assert pow_protocol.difficulty == pow_protocol.get_layer_difficulty(mesh, 61) > 200
+
+
+def test_unknown_window_requires_the_minimal_difficulty():
+    pow_protocol = HashPoWProtocol(difficulty=100, minimal_difficulty=10)
+    mesh = build_mesh(blocks_per_layer=8, layer_count=30)
+
+    assert pow_protocol.get_layer_difficulty(mesh, 60) == 10
+    assert pow_protocol.get_layer_difficulty(mesh, 20) == 100
+
+
+def test_late_blocks_dont_change_the_schedule():
+    mesh = build_mesh(blocks_per_layer=8, layer_count=60)
+    on_time_pow_protocol = HashPoWProtocol(difficulty=100)
+    on_time_difficulties = [on_time_pow_protocol.get_layer_difficulty(mesh, layer_id) for layer_id in range(1, 61)]
+
+    # A block of an old layer arrives after the miner scheduled the layers following it
+    add_block(mesh, 10, 'late')
+    late_pow_protocol = HashPoWProtocol(difficulty=100)
+    late_difficulties = [late_pow_protocol.get_layer_difficulty(mesh, layer_id) for layer_id in range(1, 61)]
+
+    assert late_difficulties == on_time_difficulties
+
+
+def test_restart_keeps_the_schedule(tmp_path):
+    mesh = build_mesh(blocks_per_layer=8, layer_count=60, store=MeshStore(str(tmp_path)))
+    pow_protocol = HashPoWProtocol(difficulty=100)
+    difficulties = [pow_protocol.get_layer_difficulty(mesh, layer_id) for layer_id in range(1, 61)]
+    add_block(mesh, 10, 'late')
+    mesh.store.close()
+
+    # The restarted mesh summarizes the stored layers before the last 10, including the late block's layer
+    restarted_mesh = Mesh(tmin=2, store=MeshStore(str(tmp_path)))
+    restarted_mesh.initialize(retained_layers=10)
+    restarted_pow_protocol = HashPoWProtocol(difficulty=100)
+
+    assert [restarted_pow_protocol.get_layer_difficulty(restarted_mesh, layer_id)
+            for layer_id in range(1, 61)] == difficulties
@@ -0,0 +1,44 @@
+from DataSturcutres.Block import Block
+from DataSturcutres.Mesh import Mesh
+from Ingestion.MeshSync import get_mesh_layers
+from MeshcashMiner import MeshcashMiner
+from PoW.HashPowProtocol import HashPoWProtocol
+
+from conftest import build_history
+
+
+def build_miner(tmin):
+    miner = MeshcashMiner('miner', Mesh(tmin=tmin), pow_protocol=HashPoWProtocol(difficulty=4))
+    miner.load_view()
+    return miner
+
+
+def get_state(miner):
+    """
+    Returns the validity verdicts, the hare protocol's valid blocks, the mesh's layers and the mined block of a miner
+    :param miner:
+    :return:
+    """
+    hare_valid_blocks = dict((layer_id, sorted(block.generate_block_id() for block in tally.valid_blocks))
+                             for layer_id, tally in miner.hare_protocol.layerTallies.items())
+    layers = [[block.generate_block_id() for block in layer.blocks] for layer in miner.mesh.layers]
+    return dict(miner.mesh.validity), hare_valid_blocks, layers, miner.current_mined_block.serialize()
+
+
+def test_batches_match_sequential_processing():
+    tmin = 3
+    history = build_history(layer_count=12, blocks_per_layer=6, tmin=tmin, invalid_ratio=0.1)
+    layers = list(get_mesh_layers(history))
+
+    sequential_miner = build_miner(tmin)
+    batched_miner = build_miner(tmin)
+    for layer_id, datas in layers:
+        for data in datas:
+            sequential_miner.handle_new_block(Block.deserialize(data, sequential_miner.mesh.blocks))
+
+        # Blocks only point blocks of earlier layers, so a layer's blocks can be decoded before handling them
+        batched_miner.handle_new_blocks([Block.deserialize(data, batched_miner.mesh.blocks) for data in datas])
+
+    assert sequential_miner.layer_counter == batched_miner.layer_counter > 10
+    assert False in sequential_miner.mesh.validity.values()
+    assert get_state(sequential_miner) == get_state(batched_miner)
@@ -0,0 +1,52 @@
+import pytest
+
+from DataSturcutres.Block import Block
+from DataSturcutres.Mesh import Mesh
+from HareProtocols.MatrixHareProtocol import MatrixHareProtocol
+from HareProtocols.TrivialHareProtocol import TrivialHareProtocol
+from Ingestion.MeshSync import MeshSync, get_mesh_layers
+from MeshcashMiner import MeshcashMiner
+from PoW.HashPowProtocol import HashPoWProtocol
+
+from conftest import build_history
+
+
+def build_miner(mesh, hare_protocol_class):
+    miner = MeshcashMiner('miner', mesh, pow_protocol=HashPoWProtocol(difficulty=4))
+    miner.hare_protocol = hare_protocol_class()
+    miner.load_view()
+    return miner
+
+
+def get_margins(hare_protocol):
+    """
+    Returns the margins of the hare protocol's candidates, by block id
+    :param hare_protocol:
+    :return:
+    """
+    if isinstance(hare_protocol, TrivialHareProtocol):
+        candidates = [block for tally in hare_protocol.layerTallies.values() for block in tally.scores]
+    else:
+        candidates = hare_protocol.candidates
+
+    return dict((block.generate_block_id(), hare_protocol.get_margin(block)) for block in candidates)
+
+
+@pytest.mark.parametrize('hare_protocol_class', [TrivialHareProtocol, MatrixHareProtocol])
+def test_restarted_miner_has_the_same_opinions(hare_protocol_class):
+    tmin = 3
+    history = build_history(layer_count=10, blocks_per_layer=6, tmin=tmin, invalid_ratio=0)
+    layers = list(get_mesh_layers(history))
+
+    # Blocks beyond tmin arrive after their layer closed, they're late candidates which mustn't vote about their peers
+    running_miner = build_miner(Mesh(tmin=tmin), hare_protocol_class)
+    for layer_id, datas in layers:
+        for data in datas:
+            running_miner.handle_new_block(Block.deserialize(data, running_miner.mesh.blocks))
+
+    mesh = Mesh(tmin=tmin)
+    MeshSync(mesh, HashPoWProtocol(difficulty=4), workers_count=0).sync(layers)
+    restarted_miner = build_miner(mesh, hare_protocol_class)
+
+    assert running_miner.layer_counter == restarted_miner.layer_counter
+    assert get_margins(running_miner.hare_protocol) == get_margins(restarted_miner.hare_protocol)
@@ -0,0 +1,60 @@
+import struct
+
+from DataSturcutres.Block import Block
+from DataSturcutres.BlockView import BlockView
+from DataSturcutres.Mesh import Mesh
+from PoW.HashPowProtocol import HashPoWProtocol, HEADER_FORMAT, NONCE_FORMAT
+
+
+def build_block(mesh, miner_pk='miner'):
+    block = Block()
+    block.layerId = 1
+    block.minerPk = miner_pk
+    block.viewHeads = list(mesh.layers[0].blocks)
+    return block
+
+
+def mine(pow_protocol, block):
+    pow_protocol.set_challenge(block)
+    success, proof = pow_protocol.try_single_nonce()
+    while not success:
+        success, proof = pow_protocol.try_single_nonce()
+
+    return proof
+
+
+def test_mined_block_is_valid():
+    mesh = Mesh(tmin=2)
+    pow_protocol = HashPoWProtocol(difficulty=16)
+    block = build_block(mesh)
+    block.pow = mine(pow_protocol, block)
+
+    assert block.is_syntactically_valid(pow_protocol, mesh.tmin, mesh.validity, mesh)
+    assert pow_protocol.verify_pow(block.pow, BlockView(block.serialize()))
+
+
+def test_forged_header_is_rejected():
+    mesh = Mesh(tmin=2)
+    pow_protocol = HashPoWProtocol(difficulty=16)
+    block = build_block(mesh)
+    block.pow = struct.pack(HEADER_FORMAT, 999, 1, b'\0' * 32) + struct.pack(NONCE_FORMAT, 7)
+
+    assert not block.is_syntactically_valid(pow_protocol, mesh.tmin, mesh.validity, mesh)
+
+
+def test_proof_of_another_block_is_rejected():
+    mesh = Mesh(tmin=2)
+    pow_protocol = HashPoWProtocol(difficulty=16)
+    proof = mine(pow_protocol, build_block(mesh))
+    other_block = build_block(mesh, 'other miner')
+    other_block.pow = proof
+
+    assert not other_block.is_syntactically_valid(pow_protocol, mesh.tmin, mesh.validity, mesh)
+
+
+def test_proof_below_layer_difficulty_is_rejected():
+    mesh = Mesh(tmin=2)
+    block = build_block(mesh)
+    block.pow = mine(HashPoWProtocol(difficulty=2), block)
+
+    assert not block.is_syntactically_valid(HashPoWProtocol(difficulty=1 << 20), mesh.tmin, mesh.validity, mesh)
@@ -0,0 +1,35 @@
+from Transactions.Mempool import Mempool
+from Transactions.Transaction import Transaction
+
+
+def build_txs(count):
+    return [Transaction(b'tx-%d' % i) for i in range(count)]
+
+
+def test_full_pool_of_equal_fees_evicts_the_oldest():
+    mempool = Mempool(max_pending=3)
+    txs = build_txs(5)
+    assert all(mempool.add_transaction(tx, 1) for tx in txs)
+
+    assert mempool.get_block_txs(10) == txs[2:]
+
+
+def test_full_pool_rejects_lower_fees():
+    mempool = Mempool(max_pending=2)
+    txs = build_txs(3)
+    mempool.add_transaction(txs[0], 1, fee=5)
+    mempool.add_transaction(txs[1], 1, fee=5)
+
+    assert not mempool.add_transaction(txs[2], 1, fee=4)
+    assert mempool.get_block_txs(10) == txs[:2]
+
+
+def test_expired_transactions_are_evicted():
+    mempool = Mempool()
+    txs = build_txs(4)
+    for layer_id, tx in enumerate(txs):
+        mempool.add_transaction(tx, layer_id)
+
+    mempool.evict_expired(2)
+    assert mempool.get_block_txs(10) == txs[2:]
+    assert mempool.add_transaction(txs[0], 4)
@@ -0,0 +1,101 @@
+from DataSturcutres.Block import Block
+from DataSturcutres.Mesh import Mesh
+from Ingestion.MeshSync import get_mesh_layers
+from MeshcashMiner import MeshcashMiner
+from PoW.HashPowProtocol import HashPoWProtocol
+
+from conftest import build_history
+
+
+def build_mesh(layer_count, blocks_per_layer=3, tmin=2):
+    mesh = Mesh(tmin=tmin)
+    for layer_id in range(1, layer_count + 1):
+        for i in range(blocks_per_layer):
+            block = Block()
+            block.layerId = layer_id
+            block.minerPk = 'miner-%d' % i
+            block.viewHeads = list(mesh.layers[layer_id - 1].blocks)
+            block.pow = b'%d' % i
+            mesh.add_block(block)
+            mesh.validity[block.generate_block_id()] = True
+
+    return mesh
+
+
+def test_compaction_drops_only_the_compacted_layers_verdicts():
+    mesh = build_mesh(6)
+    mesh.add_invalid_block(b'old', 1)
+    mesh.add_invalid_block(b'recent', 5)
+    compacted_block_ids = [block.generate_block_id() for layer in mesh.layers[1:3] for block in layer.blocks]
+    recent_block_ids = [block.generate_block_id() for block in mesh.layers[4].blocks]
+
+    mesh.compact_layers(3)
+
+    assert b'old' not in mesh.validity
+    assert mesh.validity[b'recent'] is False
+    assert all(mesh.validity[block_id] for block_id in recent_block_ids)
+    assert not any(block_id in mesh.validity for block_id in compacted_block_ids)
+    assert len(mesh.validity) == 3 * 4 + 1
+
+
+def build_compacting_miner(tmin, layer_count, invalid_ratio):
+    """
+    Returns a miner which handled a history of layers, retaining only its last 3 layers, and the history's mesh
+    :param tmin:
+    :param layer_count:
+    :param invalid_ratio:
+    :return:
+    """
+    miner = MeshcashMiner('miner', Mesh(tmin=tmin), pow_protocol=HashPoWProtocol(difficulty=4))
+    miner.retained_layers = 3
+    miner.load_view()
+    history = build_history(layer_count=layer_count, blocks_per_layer=6, tmin=tmin, invalid_ratio=invalid_ratio)
+    for layer_id, datas in get_mesh_layers(history):
+        miner.handle_new_blocks([Block.deserialize(data, miner.mesh.blocks) for data in datas])
+
+    return miner, history
+
+
+def mine_block(pow_protocol, layer_id, view_heads):
+    block = Block()
+    block.layerId = layer_id
+    block.minerPk = 'late'
+    block.viewHeads = list(view_heads)
+    pow_protocol.set_challenge(block)
+    success, proof = pow_protocol.try_single_nonce()
+    while not success:
+        success, proof = pow_protocol.try_single_nonce()
+
+    block.pow = proof
+    return block
+
+
+def test_late_block_of_a_compacted_layer_is_rejected():
+    miner, history = build_compacting_miner(tmin=3, layer_count=12, invalid_ratio=0)
+    assert miner.mesh.compacted_layer_count > 1
+    late_block = mine_block(miner.pow_protocol, 1, history.layers[0].blocks)
+    fresh_blocks = list(miner.fresh_blocks)
+    validity = dict(miner.mesh.validity)
+
+    miner.handle_new_block(late_block)
+
+    assert late_block.generate_block_id() not in miner.mesh.blocks
+    assert miner.fresh_blocks == fresh_blocks
+    assert miner.mesh.validity == validity
+
+
+def test_verdicts_of_validated_blocks_are_dropped_with_their_layers():
+    miner, history = build_compacting_miner(tmin=3, layer_count=12, invalid_ratio=0.2)
+    mesh = miner.mesh
+    assert min(mesh.invalid_block_ids) >= mesh.compacted_layer_count
+    retained_block_ids = [block.generate_block_id() for layer in mesh.layers[mesh.compacted_layer_count:]
+                          for block in layer.blocks]
+    invalid_block_ids = [block_id for block_ids in mesh.invalid_block_ids.values() for block_id in block_ids]
+    assert invalid_block_ids
+    assert sorted(mesh.validity) == sorted(retained_block_ids + invalid_block_ids)
+
+    # Blocks of the first retained layer are valid by the compacted blocks they point
+    first_block = mesh.layers[mesh.compacted_layer_count].blocks[0]
+    late_block = mine_block(miner.pow_protocol, first_block.layerId, first_block.viewHeads)
+    assert late_block.is_syntactically_valid(miner.pow_protocol, mesh.tmin, mesh.validity, mesh)
+    assert len(mesh.validity) == len(retained_block_ids) + len(invalid_block_ids) + 1
@@ -0,0 +1,52 @@
+from DataSturcutres.LayerSummary import LayerSummary
+from DataSturcutres.Mesh import Mesh
+from DataSturcutres.MeshStore import MeshStore
+from Ingestion.MeshSync import MeshSync, get_mesh_layers
+from MeshcashMiner import MeshcashMiner
+from PoW.HashPowProtocol import HashPoWProtocol
+
+from conftest import build_history
+
+
+def test_restart_decodes_only_the_retained_layers(tmp_path):
+    tmin = 2
+    history = build_history(layer_count=70, blocks_per_layer=4, tmin=tmin, invalid_ratio=0)
+    mesh = Mesh(tmin=tmin, store=MeshStore(str(tmp_path)))
+    mesh.initialize()
+    MeshSync(mesh, HashPoWProtocol(difficulty=4), workers_count=0).sync(get_mesh_layers(history))
+    mesh.store.close()
+
+    miner = MeshcashMiner('miner', Mesh(tmin=tmin, store=MeshStore(str(tmp_path))),
+                          pow_protocol=HashPoWProtocol(difficulty=4))
+    miner.load_view()
+
+    full_miner = MeshcashMiner('miner', Mesh(tmin=tmin, store=MeshStore(str(tmp_path))),
+                               pow_protocol=HashPoWProtocol(difficulty=4))
+    full_miner.retained_layers = None
+    full_miner.load_view()
+
+    first_layer_id = miner.layer_counter - miner.retained_layers
+    assert all(isinstance(layer, LayerSummary) for layer in miner.mesh.layers[:first_layer_id])
+    assert len(miner.mesh.blocks) == 4 * (len(miner.mesh.layers) - first_layer_id)
+
+    assert miner.layer_counter == full_miner.layer_counter == 71
+    assert miner.mesh.get_layer_block_count(1) == 4
+    assert miner.current_mined_block.serialize() == full_miner.current_mined_block.serialize()
+
+
+def test_sync_after_restart_with_summarized_layers(tmp_path):
+    tmin = 2
+    layers = list(get_mesh_layers(build_history(layer_count=80, blocks_per_layer=4, tmin=tmin, invalid_ratio=0)))
+    mesh = Mesh(tmin=tmin, store=MeshStore(str(tmp_path)))
+    mesh.initialize()
+    MeshSync(mesh, HashPoWProtocol(difficulty=4), workers_count=0).sync(layers[:70])
+    mesh.store.close()
+
+    restarted_mesh = Mesh(tmin=tmin, store=MeshStore(str(tmp_path)))
+    restarted_mesh.initialize(retained_layers=20)
+    mesh_sync = MeshSync(restarted_mesh, HashPoWProtocol(difficulty=4), workers_count=0)
+    mesh_sync.sync(layers)
+
+    assert restarted_mesh.compacted_layer_count == 50
+    assert (mesh_sync.added_count, mesh_sync.rejected_count) == (40, 0)
+    assert restarted_mesh.get_last_valid_layer() == 80
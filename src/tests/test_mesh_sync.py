@@ -0,0 +1,60 @@
+from DataSturcutres.BlockView import BlockView
+from DataSturcutres.Mesh import Mesh
+from DataSturcutres.MeshStore import MeshStore
+from Ingestion.MeshSync import MeshSync, get_mesh_layers
+from PoW.HashPowProtocol import HashPoWProtocol
+
+from conftest import build_history
+
+
+def test_sync_after_restart_from_store(tmp_path):
+    history = build_history(layer_count=8, blocks_per_layer=5, tmin=2, invalid_ratio=0)
+    layers = list(get_mesh_layers(history))
+
+    mesh = Mesh(tmin=2, store=MeshStore(str(tmp_path)))
+    mesh.initialize()
+    MeshSync(mesh, HashPoWProtocol(difficulty=4), workers_count=0).sync(layers[:4])
+    mesh.store.close()
+
+    restarted_mesh = Mesh(tmin=2, store=MeshStore(str(tmp_path)))
+    restarted_mesh.initialize()
+    mesh_sync = MeshSync(restarted_mesh, HashPoWProtocol(difficulty=4), workers_count=0)
+    mesh_sync.sync(layers)
+
+    assert (mesh_sync.added_count, mesh_sync.rejected_count) == (20, 0)
+    assert restarted_mesh.get_last_valid_layer() == 8
+
+
+def reorder_view_heads(pow_protocol, data):
+    """
+    Returns a non-canonical encoding of a block, with its view heads reversed and a proof mined for that encoding
+    :param pow_protocol:
+    :param data:
+    :return:
+    """
+    view = BlockView(data)
+    view_head_ids = [block_id.tobytes() for block_id in view.get_view_head_ids()]
+    data = data[:view.parent_ids_offset] + b''.join(reversed(view_head_ids)) + \
+        data[view.parent_ids_offset + len(view_head_ids) * len(view_head_ids[0]):]
+
+    pow_protocol.set_challenge(BlockView(data))
+    success, proof = pow_protocol.try_single_nonce()
+    while not success:
+        success, proof = pow_protocol.try_single_nonce()
+
+    return data[:view.pow_offset] + proof + data[view.miner_pk_offset:]
+
+
+def test_malformed_and_non_canonical_blocks_are_rejected():
+    history = build_history(layer_count=6, blocks_per_layer=5, tmin=2, invalid_ratio=0)
+    layers = list(get_mesh_layers(history))
+    data = layers[2][1][0]
+    non_canonical_data = reorder_view_heads(HashPoWProtocol(difficulty=4), data)
+    layers[2][1].extend([non_canonical_data, data[:10], data[:-3]])
+
+    mesh = Mesh(tmin=2)
+    mesh_sync = MeshSync(mesh, HashPoWProtocol(difficulty=4), workers_count=0)
+    mesh_sync.sync(layers)
+
+    assert (mesh_sync.added_count, mesh_sync.rejected_count) == (30, 3)
+    assert BlockView(non_canonical_data).generate_block_id() not in mesh.blocks
@@ -0,0 +1,11 @@
+from Simulation.NetworkSimulator import NetworkSimulator
+
+
+def test_every_miner_handles_every_block_and_agrees():
+    simulator = NetworkSimulator(miners_count=5, tmin=3, blocks_per_second=1.0, loss_rate=0.1, seed=1)
+    stats = simulator.run(layers_count=5)
+
+    assert stats['handled_blocks'] == 5 * stats['published_blocks']
+    assert all(len(miner.mesh.blocks) >= stats['published_blocks'] for miner in simulator.miners)
+    assert stats['layers_agreed'] + stats['layers_disagreed'] >= 5
+    assert stats['layers_agreed'] > 0
@@ -0,0 +1,48 @@
+import random
+
+from DataSturcutres.Block import Block
+from DataSturcutres.Mesh import Mesh
+from TortoiseProtocols.TortoiseProtocol import TortoiseProtocol
+
+
+def build_mesh(layer_count, blocks_per_layer, edges_per_block, seed=0):
+    """
+    Builds a mesh whose blocks point random blocks of the previous layer and, now and then, a block of an older layer
+    :param layer_count:
+    :param blocks_per_layer:
+    :param edges_per_block:
+    :param seed:
+    :return:
+    """
+    rand = random.Random(seed)
+    mesh = Mesh(tmin=2)
+    for layer_id in range(1, layer_count + 1):
+        for i in range(blocks_per_layer):
+            block = Block()
+            block.layerId = layer_id
+            block.minerPk = 'miner-%d' % i
+            prev_layer_blocks = mesh.layers[layer_id - 1].blocks
+            block.viewHeads = rand.sample(prev_layer_blocks, min(edges_per_block, len(prev_layer_blocks)))
+            if layer_id > 3 and rand.random() < 0.3:
+                block.viewHeads.append(rand.choice(mesh.layers[rand.randrange(layer_id - 3)].blocks))
+            block.pow = b'%d' % i
+            mesh.add_block(block)
+
+    return mesh
+
+
+def test_margins_match_recounting_the_votes():
+    horizon = 6
+    mesh = build_mesh(layer_count=20, blocks_per_layer=8, edges_per_block=3)
+    tortoise_protocol = TortoiseProtocol(horizon=horizon)
+    tortoise_protocol.set_block_opinions(mesh, 21)
+
+    for layer in mesh.layers:
+        voters = [voter for voter_layer in mesh.layers[layer.id + 1:layer.id + horizon + 1]
+                  for voter in voter_layer.blocks]
+        for block in layer.blocks:
+            votes_for = sum([voter.has_in_view(block) for voter in voters])
+            assert tortoise_protocol.get_margin(block) == 2 * votes_for - len(voters)
+
+    # Only the views of the blocks later layers may point within the horizon are kept
+    assert sorted(tortoise_protocol.views) == list(range(21 - horizon, 21))
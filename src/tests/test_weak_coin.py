@@ -0,0 +1,58 @@
+import random
+import struct
+
+from DataSturcutres.Block import Block
+from WeakCoin.MeshcashWeakCoinProtocol import MeshcashWeakCoinProtocol
+
+
+def build_blocks(rand, count, hashed_proofs):
+    blocks = []
+    for i in range(count):
+        block = Block()
+        if hashed_proofs:
+            block.pow = struct.pack('>Q', rand.getrandbits(64)) + bytes(bytearray(rand.getrandbits(8) for j in range(48)))
+        else:
+            block.pow = rand.randint(0, 1000)
+        blocks.append(block)
+
+    return blocks
+
+
+def test_streaming_coin_matches_output_coin():
+    rand = random.Random(0)
+    weak_coin_protocol = MeshcashWeakCoinProtocol()
+    for trial in range(500):
+        blocks = build_blocks(rand, rand.randint(1, 50), hashed_proofs=trial % 2 == 0)
+        expected_coin = weak_coin_protocol.output_coin(blocks)
+
+        # Observed one by one, the coin matches output_coin over the blocks observed so far
+        weak_coin_protocol.reset()
+        for count, block in enumerate(blocks, 1):
+            weak_coin_protocol.observe_block(block)
+            assert weak_coin_protocol.get_coin() == weak_coin_protocol.output_coin(blocks[:count])
+
+        assert weak_coin_protocol.get_coin() == expected_coin
+
+        # Replayed in batches, in any order
+        weak_coin_protocol.reset()
+        rand.shuffle(blocks)
+        split = rand.randint(0, len(blocks))
+        weak_coin_protocol.observe_blocks(blocks[:split])
+        weak_coin_protocol.observe_blocks(blocks[split:])
+        assert weak_coin_protocol.get_coin() == expected_coin
+
+
+def test_integer_proofs_keep_the_original_coin():
+    rand = random.Random(1)
+    weak_coin_protocol = MeshcashWeakCoinProtocol()
+    for trial in range(200):
+        blocks = build_blocks(rand, rand.randint(1, 50), hashed_proofs=False)
+
+        # The coin as the protocol originally computed it (defined for integer proofs only)
+        original_coin = True if min([block.pow for block in blocks]) & 1 == 1 else 0
+
+        weak_coin_protocol.reset()
+        for block in blocks:
+            weak_coin_protocol.observe_block(block)
+
+        assert weak_coin_protocol.output_coin(blocks) == weak_coin_protocol.get_coin() == original_coin